@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+PiCar-X アクチュエータスケジューラ
+受信側（MQTT など）は最新の目標値を置くだけにし、制御スレッドが固定周期で反映する
+（latest-command-wins、量子化した値が変わらなければ I2C 書き込みを省略）
+走行コマンドが途絶えた場合・ブローカー切断時はデッドマン監視で速度を 0 まで滑らかに落とす
+"""
+
+import math
+import threading
+import time
+
+from latency import wall_ms
+from runtime_log import get_logger
+
+log = get_logger("actuator")
+
+# ステアリング角度の最大値（度）
+DIR_SERVO_MAX_ANGLE = 30
+
+# カメラ角度の範囲（度）
+PAN_MIN, PAN_MAX = -90, 90
+TILT_MIN, TILT_MAX = -35, 65
+
+
+def quantize_drive(throttle: float, steer: float):
+    """throttle/steer (-1..1) → (符号付き速度 -100..100, ステアリング角度)"""
+    # ステアリング角度 (-30〜+30度)
+    steer_angle = int(steer * DIR_SERVO_MAX_ANGLE)
+    steer_angle = max(-DIR_SERVO_MAX_ANGLE, min(DIR_SERVO_MAX_ANGLE, steer_angle))
+
+    # 速度 (0〜100)、符号で前進/後退、不感帯内は停止
+    speed = max(0, min(100, int(abs(throttle) * 100)))
+    if throttle > 0.01:
+        return speed, steer_angle
+    if throttle < -0.01:
+        return -speed, steer_angle
+    return 0, steer_angle
+
+
+def quantize_camera(pan_deg: float, tilt_deg: float, step=1):
+    """pan/tilt（度）をクランプして step 度単位に丸める"""
+    pan = max(PAN_MIN, min(PAN_MAX, pan_deg))
+    tilt = max(TILT_MIN, min(TILT_MAX, tilt_deg))
+    return int(round(pan / step) * step), int(round(tilt / step) * step)
+
+
+class ActuatorScheduler:
+    """最新の走行・カメラ目標値を固定周期で PiCar-X に反映するクラス
+
+    set_drive() / set_camera() はロックして値を置くだけなので、MQTT のネットワークスレッドから
+    何回呼んでもバックログは溜まらない。tick() が1回分の制御を行う（テスト・リプレイ用に公開）。
+
+    デッドマン監視: 最後の走行コマンドから command_timeout 秒経過、または failsafe() が
+    呼ばれたら、走行中の速度を stop_ramp 秒かけて 0 まで下げる（ステアリングは維持）。
+
+    latency（LatencyStats）を渡すと、受信→反映（"command_age"）と、送信時刻 sent_ms
+    付きのコマンドについて操作側の送信→サーボ反映（"control_apply"）を記録する。
+
+    planner（servo_planner.ServoPlanner）を渡すと、カメラ・ステアリングは受信値へ直接飛ばさず、
+    毎 tick 軌道計画の位置を書き込む（量子化値が変わった軸だけ書く）。
+    """
+    def __init__(self, px, rate_hz=50.0, camera_step=1, clock=time.monotonic, report_interval=10.0,
+                 command_timeout=0.3, stop_ramp=0.2, latency=None, planner=None, wall_clock=wall_ms):
+        self.px = px
+        self.interval = 1.0 / rate_hz
+        self.camera_step = camera_step
+        self.clock = clock
+        self.wall_clock = wall_clock   # 送信時刻 sent_ms と比べる壁時計（ms）
+        self.report_interval = report_interval
+        self.command_timeout = command_timeout
+        self.stop_ramp = stop_ramp
+        self.latency = latency
+        self.planner = planner
+
+        self._lock = threading.Lock()
+        self._drive_target = None   # (throttle, steer, 受信時刻, 送信時刻 ms or None)
+        self._camera_target = None  # (pan, tilt, 受信時刻, 送信時刻 ms or None)
+        self._last_drive_time = None
+        self._failsafe_reason = None
+        self._ramp_step = None      # 停止ランプ中の1tickあたりの減速量
+
+        # 最後に書き込んだ量子化値
+        self.applied_speed = None
+        self.applied_steer = None
+        self.applied_pan = None
+        self.applied_tilt = None
+
+        # 統計
+        self.commands_received = 0
+        self.commands_applied = 0
+        self.commands_superseded = 0  # 反映前に新しい値で上書きされた数
+        self.writes = 0
+        self.writes_skipped = 0
+        self.last_command_age = 0.0
+        self.max_command_age = 0.0
+        self.watchdog_trips = 0
+        # 制御ループの時間（tick の処理時間と、周期に間に合わなかった回数）
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        self.overruns = 0
+
+        self._running = False
+        self._thread = None
+
+    # ---- 受信側 ----
+    def set_drive(self, throttle: float, steer: float, sent_ms=None):
+        with self._lock:
+            if self._drive_target is not None:
+                self.commands_superseded += 1
+            now = self.clock()
+            self._drive_target = (throttle, steer, now, sent_ms)
+            self._last_drive_time = now
+            self._failsafe_reason = None
+            self.commands_received += 1
+
+    def set_camera(self, pan_deg: float, tilt_deg: float, sent_ms=None):
+        with self._lock:
+            if self._camera_target is not None:
+                self.commands_superseded += 1
+            self._camera_target = (pan_deg, tilt_deg, self.clock(), sent_ms)
+            self.commands_received += 1
+
+    def failsafe(self, reason: str):
+        """コマンド待ちを打ち切って停止ランプを開始する（ブローカー切断・操作側 LWT 受信時）"""
+        with self._lock:
+            self._drive_target = None
+            self._failsafe_reason = reason
+        log.warning("failsafe: %s", reason)
+
+    # ---- 制御側 ----
+    def tick(self):
+        """保留中の最新目標値を反映する"""
+        with self._lock:
+            drive, self._drive_target = self._drive_target, None
+            camera, self._camera_target = self._camera_target, None
+
+        now = self.clock()
+        if drive is not None:
+            self._ramp_step = None
+            speed, angle = quantize_drive(drive[0], drive[1])
+            if self.planner is not None:
+                self.planner.command_steer(angle, now)
+                angle = self._planned_steer(now)
+            self._apply_drive(speed, angle)
+            self._record_age(drive[2], drive[3])
+        elif self._drive_expired():
+            self._ramp_down()
+        elif self.planner is not None and self.applied_steer is not None:
+            angle = self._planned_steer(now)
+            if angle != self.applied_steer:
+                self._apply_drive(self.applied_speed, angle)
+        if camera is not None:
+            if self.planner is not None:
+                self.planner.command_camera(camera[0], camera[1], now)
+            else:
+                pan, tilt = quantize_camera(camera[0], camera[1], self.camera_step)
+                self._apply_camera(pan, tilt)
+            self._record_age(camera[2], camera[3])
+        if self.planner is not None:
+            planned = self.planner.step_camera(now)
+            if planned is not None:
+                # 軌道計画が書かないと決めた軸（None）は今の角度のまま
+                pan, tilt = quantize_camera(*(0 if v is None else v for v in planned), self.camera_step)
+                self._apply_camera(self.applied_pan if planned[0] is None else pan,
+                                   self.applied_tilt if planned[1] is None else tilt)
+
+    def _planned_steer(self, now: float) -> int:
+        self.planner.step_steer(now)
+        return int(round(self.planner.steer.position))
+
+    def _drive_expired(self) -> bool:
+        """走行中なのにコマンドが途絶えている（または failsafe 中）か"""
+        if not self.applied_speed:
+            return False
+        if self._failsafe_reason is not None:
+            return True
+        return (self._last_drive_time is None
+                or self.clock() - self._last_drive_time > self.command_timeout)
+
+    def _ramp_down(self):
+        """速度を stop_ramp 秒で 0 になるよう1tick分だけ下げる"""
+        if self._ramp_step is None:
+            self.watchdog_trips += 1
+            ticks = max(1, math.ceil(self.stop_ramp / self.interval))
+            self._ramp_step = max(1, math.ceil(abs(self.applied_speed) / ticks))
+            log.warning("watchdog: no drive command, stopping from speed %d (%s)",
+                        self.applied_speed, self._failsafe_reason or "timeout")
+        speed = self.applied_speed
+        if speed > 0:
+            speed = max(0, speed - self._ramp_step)
+        else:
+            speed = min(0, speed + self._ramp_step)
+        self._apply_drive(speed, self.applied_steer)
+        if speed == 0:
+            self._ramp_step = None
+
+    def _record_age(self, received_at: float, sent_ms=None):
+        age = self.clock() - received_at
+        self.last_command_age = age
+        self.max_command_age = max(self.max_command_age, age)
+        self.commands_applied += 1
+        if self.latency is not None:
+            self.latency.record("command_age", age * 1000)
+            if sent_ms is not None:
+                self.latency.record("control_apply", self.wall_clock() - sent_ms)
+
+    def _apply_drive(self, speed: int, angle: int):
+        try:
+            if angle != self.applied_steer:
+                log.debug("set_dir_servo_angle(%d)", angle)
+                self.px.set_dir_servo_angle(angle)
+                self.applied_steer = angle
+                self.writes += 1
+            else:
+                self.writes_skipped += 1
+
+            if speed != self.applied_speed:
+                if speed > 0:
+                    log.debug("forward(%d)", speed)
+                    self.px.forward(speed)
+                elif speed < 0:
+                    log.debug("backward(%d)", -speed)
+                    self.px.backward(-speed)
+                else:
+                    log.debug("stop()")
+                    self.px.stop()
+                self.applied_speed = speed
+                self.writes += 1
+            else:
+                self.writes_skipped += 1
+        except Exception as e:
+            log.error("drive: %s", e)
+
+    def _apply_camera(self, pan: int, tilt: int):
+        try:
+            if pan != self.applied_pan:
+                log.debug("set_cam_pan_angle(%d)", pan)
+                self.px.set_cam_pan_angle(pan)
+                self.applied_pan = pan
+                self.writes += 1
+            else:
+                self.writes_skipped += 1
+
+            if tilt != self.applied_tilt:
+                log.debug("set_cam_tilt_angle(%d)", tilt)
+                self.px.set_cam_tilt_angle(tilt)
+                self.applied_tilt = tilt
+                self.writes += 1
+            else:
+                self.writes_skipped += 1
+        except Exception as e:
+            log.error("camera_move: %s", e)
+
+    def loop_stats(self) -> dict:
+        """制御ループの時間（tick_max_ms は前回の呼び出しからの最大値）"""
+        stats = {"tick_ms": self.last_tick_ms, "tick_max_ms": self.max_tick_ms, "overruns": self.overruns}
+        self.max_tick_ms = self.last_tick_ms
+        return stats
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="actuator", daemon=True)
+        self._thread.start()
+        log.info("Control loop started: %.0f Hz", 1.0 / self.interval)
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        next_report = next_tick + self.report_interval
+        while self._running:
+            start = time.monotonic()
+            self.tick()
+
+            now = time.monotonic()
+            self.last_tick_ms = (now - start) * 1000
+            self.max_tick_ms = max(self.max_tick_ms, self.last_tick_ms)
+            if now >= next_report:
+                next_report = now + self.report_interval
+                log.info("received %d | applied %d | superseded %d | writes %d (skipped %d) | "
+                         "age last %.1f ms, max %.1f ms | watchdog trips %d",
+                         self.commands_received, self.commands_applied, self.commands_superseded,
+                         self.writes, self.writes_skipped,
+                         self.last_command_age * 1000, self.max_command_age * 1000,
+                         self.watchdog_trips)
+
+            # 絶対時刻基準で周期を維持
+            next_tick += self.interval
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                self.overruns += 1
+                next_tick = time.monotonic()
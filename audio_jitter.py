@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+受信音声のジッタバッファ（再生は sounddevice のコールバック側で取り出す）
+- 直近 window_s 秒の相対到着遅延の分位点（既定 p99）から目標バッファ量を決める
+  （到着間隔の揺らぎは RFC 3550 と同じ指数平均でメトリクスとして出す）
+- 取り出し時に不足したら直前のブロックを減衰させて繰り返し（PLC）、それ以降は無音
+- 溜まりすぎたら古いサンプルを目標量まで捨てて遅延を戻す
+"""
+
+import collections
+import time
+
+import numpy as np
+
+
+class JitterBuffer:
+    """int16 サンプルの SPSC リングバッファ + 適応的な再生開始量
+
+    push() は受信側（asyncio）、pull() は再生コールバック（PortAudio スレッド）から呼ぶ。
+    生産者は _head、消費者は _tail だけを書き換える（audio_ring.AudioRing と同じ方式）。
+    """
+    def __init__(self, sample_rate=48000, channels=1, min_ms=20.0, max_ms=200.0,
+                 capacity_ms=1000.0, window_s=5.0, quantile=99, plc_ms=40.0, block=480,
+                 clock=time.monotonic):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.quantile = quantile
+        self.clock = clock
+
+        self.capacity = int(sample_rate * capacity_ms / 1000)
+        self._buf = np.zeros((self.capacity, channels), dtype=np.int16)
+        self._head = 0   # 書き込んだ通算サンプル数（生産者のみ更新）
+        self._tail = 0   # 読み出した通算サンプル数（消費者のみ更新）
+
+        # 到着揺らぎ（生産者側で更新）
+        self._received = 0       # 受信した通算サンプル数（メディア時刻）
+        self._last_arrival = None
+        self._delays = collections.deque(maxlen=int(window_s * 100))  # 相対到着遅延（秒）
+        self.jitter_ms = 0.0
+        self.target_ms = min_ms
+
+        # 再生側の状態
+        self._buffering = True   # 目標量まで溜まるのを待っている
+        # 直前に再生したブロック（再生コールバックで確保しないよう block サンプルで先に確保し、
+        # ブロックの大きさが変わったときだけ確保し直す）
+        self._plc = np.zeros((block, channels), dtype=np.int16)
+        self._plc_valid = False
+        self._plc_samples = int(sample_rate * plc_ms / 1000)
+        self._concealing = 0     # 連続して補間したサンプル数
+
+        # メトリクス
+        self.underruns = 0
+        self.overflows = 0         # 満杯で捨てた受信サンプル数
+        self.shed_samples = 0      # 遅延を戻すために捨てたサンプル数
+        self.concealed_samples = 0
+        self.silence_samples = 0
+        self.added_latency_ms = 0.0  # 取り出し時点のバッファ量（指数平均）
+
+    # ---- 受信側 ----
+    def push(self, samples: np.ndarray):
+        """受信した int16 サンプル（インターリーブ）を積む"""
+        block = samples.reshape(-1, self.channels)
+        n = block.shape[0]
+        self._update_jitter(n)
+
+        head = self._head
+        free = self.capacity - (head - self._tail)
+        if n > free:
+            self.overflows += n - free
+            block = block[:free]
+            n = free
+        start = head % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = block[:first]
+        self._buf[:n - first] = block[first:]
+        self._head = head + n
+
+    def _update_jitter(self, n: int):
+        now = self.clock()
+        if self._last_arrival is not None:
+            expected = n / self.sample_rate
+            deviation_ms = abs((now - self._last_arrival) - expected) * 1000
+            self.jitter_ms += (deviation_ms - self.jitter_ms) / 16
+        self._last_arrival = now
+
+        # 到着時刻 - メディア時刻。窓内の最小値からの差が、そのフレームの遅れ
+        self._delays.append(now - self._received / self.sample_rate)
+        self._received += n
+        if self._received // n % 5 == 0:  # 分位点の計算は5フレームに1回
+            delays = np.fromiter(self._delays, dtype=np.float64, count=len(self._delays))
+            spread_ms = (np.percentile(delays, self.quantile) - delays.min()) * 1000
+            frame_ms = n * 1000 / self.sample_rate
+            self.target_ms = max(self.min_ms, min(self.max_ms, frame_ms + spread_ms))
+
+    # ---- 再生側 ----
+    @property
+    def depth_ms(self) -> float:
+        return (self._head - self._tail) * 1000 / self.sample_rate
+
+    def pull(self, out: np.ndarray):
+        """out（frames × channels の int16）を埋める。再生コールバックから呼ぶ"""
+        n = out.shape[0]
+        depth = self._head - self._tail
+        target = int(self.target_ms * self.sample_rate / 1000)
+        self.added_latency_ms += (depth * 1000 / self.sample_rate - self.added_latency_ms) / 16
+
+        if self._buffering:
+            if depth < max(target, n):
+                self._conceal(out)
+                return
+            self._buffering = False
+
+        # 目標の2倍（+1ブロック）を超えて溜まったら古い方を捨てて目標量に戻す
+        if depth > 2 * target + n:
+            skip = depth - target
+            self._tail += skip
+            self.shed_samples += skip
+            depth = target
+
+        if depth >= n:
+            self._read(out, n)
+            self._concealing = 0
+            if self._plc.shape != out.shape:
+                self._plc = np.empty_like(out)
+            np.copyto(self._plc, out)
+            self._plc_valid = True
+            return
+
+        # 不足: あるだけ再生して残りを補間し、目標量まで溜め直す
+        self.underruns += 1
+        self._read(out[:depth], depth)
+        self._conceal(out[depth:])
+        self._buffering = True
+
+    def _read(self, out: np.ndarray, n: int):
+        tail = self._tail
+        start = tail % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        out[first:n] = self._buf[:n - first]
+        self._tail = tail + n
+
+    def _conceal(self, out: np.ndarray):
+        """直前のブロックを半分ずつ減衰させて繰り返す（plc_ms まで）。以降は無音"""
+        n = out.shape[0]
+        if self._concealing < self._plc_samples and self._plc_valid:
+            repeats = self._concealing // len(self._plc) + 1
+            src = self._plc if self._plc.shape == out.shape else np.resize(self._plc, out.shape)
+            np.floor_divide(src, 2 ** repeats, out=out, casting="unsafe")
+            self.concealed_samples += n
+        else:
+            out[:] = 0
+            self.silence_samples += n
+        self._concealing += n
+
+    def stats(self) -> dict:
+        ms = 1000 / self.sample_rate
+        return {
+            "depth_ms": self.depth_ms,
+            "target_ms": self.target_ms,
+            "jitter_ms": self.jitter_ms,
+            "added_latency_ms": self.added_latency_ms,
+            "underruns": self.underruns,
+            "concealed_ms": self.concealed_samples * ms,
+            "silence_ms": self.silence_samples * ms,
+            "shed_ms": self.shed_samples * ms,
+            "overflow_ms": self.overflows * ms,
+        }
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+音声ブロックの SPSC（単一生産者・単一消費者）リングバッファ
+sounddevice のコールバック（PortAudio スレッド）が事前確保したスロットへコピーし、
+asyncio 側は call_soon_threadsafe で起こされて取り出す（ポーリングなし・ロックなし）
+"""
+
+import asyncio
+
+import numpy as np
+
+
+class AudioRing:
+    """固定長 int16 ブロックのリングバッファ
+
+    スロットは事前確保した (samples, channels) の int16 配列。rtc.AudioFrame の data を
+    スロットとして渡せば、コールバックでのコピー1回だけで送信用フレームが埋まる。
+
+    生産者は _head、消費者は _tail だけを書き換える（GIL 下で int の代入は原子的）。
+    満杯時は新しいブロックを破棄（overruns）し、消費側で max_backlog を超えた分は
+    古い順に読み飛ばす（dropped）。
+    """
+    def __init__(self, slots, max_backlog=None):
+        if len(slots) < 2:
+            raise ValueError("need at least 2 slots")
+        self.slots = slots
+        self.capacity = len(slots)
+        self.max_backlog = max_backlog or self.capacity - 1
+        self.samples = slots[0].shape[0]
+
+        self._head = 0   # 次に書き込む通し番号（生産者のみ更新）
+        self._tail = 0   # 次に読む通し番号（消費者のみ更新）
+        self._waiting = False
+        self._closed = False
+        self._loop = None
+        self._event = None
+
+        # カウンタ
+        self.overruns = 0   # 満杯で破棄したブロック数（生産者側）
+        self.dropped = 0    # 遅延を抑えるため読み飛ばしたブロック数（消費者側）
+        self.wakeups = 0    # 消費者が起こされた回数
+
+    @classmethod
+    def allocate(cls, capacity: int, samples: int, channels=1, max_backlog=None):
+        slots = [np.zeros((samples, channels), dtype=np.int16) for _ in range(capacity)]
+        return cls(slots, max_backlog)
+
+    def attach(self, loop=None):
+        """消費側のイベントループを登録する（get() より前に呼ぶ）"""
+        self._loop = loop or asyncio.get_running_loop()
+        self._event = asyncio.Event()
+
+    @property
+    def backlog(self) -> int:
+        return self._head - self._tail
+
+    # ---- 生産者（PortAudio スレッド） ----
+    def push(self, block: np.ndarray) -> bool:
+        """ブロックをコピーして積む。満杯・サイズ不一致なら False"""
+        head = self._head
+        if head - self._tail >= self.capacity or block.shape[0] != self.samples:
+            self.overruns += 1
+            return False
+        np.copyto(self.slots[head % self.capacity], block, casting="unsafe")
+        self._head = head + 1
+        if self._waiting:
+            self._notify()
+        return True
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # ループ終了後
+
+    def close(self):
+        self._closed = True
+        if self._loop is not None:
+            self._notify()
+
+    # ---- 消費者（asyncio） ----
+    async def get(self):
+        """次のスロット番号を返す（閉じられたら None）。使い終わったら release() を呼ぶ"""
+        while True:
+            backlog = self._head - self._tail
+            if backlog > self.max_backlog:
+                skip = backlog - self.max_backlog
+                self._tail += skip
+                self.dropped += skip
+                backlog = self.max_backlog
+            if backlog:
+                return self._tail % self.capacity
+            if self._closed:
+                return None
+            # _waiting を立ててから再確認し、その間に積まれた分を取りこぼさない
+            self._event.clear()
+            self._waiting = True
+            if self._head == self._tail and not self._closed:
+                await self._event.wait()
+                self.wakeups += 1
+            self._waiting = False
+
+    def release(self):
+        """get() で返したスロットを生産者に返す"""
+        self._tail += 1
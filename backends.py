@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+実機依存ライブラリの選択（Picamera2 / Picarx / sounddevice / LiveKit rtc / paho-mqtt）
+スクリプトはこのモジュール経由で取得する。環境変数 PICARX_BACKEND=replay のときは録画を再生する
+代替（replay_backend.py）を返すので、main() や on_message はそのまま実機・サーバーなしで動く
+
+    PICARX_BACKEND        "hardware"（既定）/ "replay"
+    PICARX_REPLAY_DIR     録画ディレクトリ（record_session.py の出力）
+    PICARX_REPLAY_SPEED   1.0 = 実時間（既定）、0 = 待たずに次を出す（最大速度）
+"""
+
+import os
+
+BACKEND = os.environ.get("PICARX_BACKEND", "hardware")
+
+
+def replaying() -> bool:
+    return BACKEND == "replay"
+
+
+def load_rtc():
+    """livekit.rtc 互換のモジュール"""
+    if replaying():
+        from replay_backend import rtc
+        return rtc
+    from livekit import rtc
+    return rtc
+
+
+def load_camera():
+    """Picamera2 互換のクラス"""
+    if replaying():
+        from replay_backend import Picamera2
+        return Picamera2
+    from picamera2 import Picamera2
+    return Picamera2
+
+
+def load_car():
+    """Picarx 互換のクラス"""
+    if replaying():
+        from replay_backend import Picarx
+        return Picarx
+    from picarx import Picarx
+    return Picarx
+
+
+def load_sounddevice():
+    """sounddevice 互換のモジュール（実機側で未インストールなら ImportError）"""
+    if replaying():
+        from replay_backend import sounddevice
+        return sounddevice
+    import sounddevice
+    return sounddevice
+
+
+def load_mqtt():
+    """paho.mqtt.client 互換のモジュール"""
+    if replaying():
+        from replay_backend import mqtt
+        return mqtt
+    import paho.mqtt.client as mqtt
+    return mqtt
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+上り帯域に応じた映像エンコード設定の切り替え（stream_stereo_livekit.py 用）
+LiveKit の接続品質（connection_quality_changed）と送信側統計（推定可能帯域・送信ビットレート・
+損失率・RTT・quality_limitation_reason）から最大ビットレート/fps の段を選び、
+その段で画質を保てる解像度・fps の上限（QualityController の天井）を決める
+"""
+
+import time
+from collections import namedtuple
+
+from runtime_log import get_logger
+
+log = get_logger("bandwidth")
+
+Encoding = namedtuple("Encoding", "name max_bitrate max_fps")
+
+# ビットレートの昇順に並べる
+DEFAULT_ENCODINGS = [
+    Encoding("0.8M", 800_000, 15),
+    Encoding("1.5M", 1_500_000, 24),
+    Encoding("3M", 3_000_000, 24),
+    Encoding("5M", 5_000_000, 30),
+    Encoding("8M", 8_000_000, 30),
+]
+
+LinkStats = namedtuple("LinkStats", "available_bps sent_bps loss rtt_ms bandwidth_limited")
+
+# livekit proto の ConnectionQuality（QUALITY_POOR=0, GOOD=1, EXCELLENT=2, LOST=3）
+_QUALITY_POOR = 0
+_QUALITY_LOST = 3
+# livekit proto の QualityLimitationReason（LIMITATION_BANDWIDTH=2）
+_LIMITATION_BANDWIDTH = 2
+
+
+def parse_link_stats(stats_list, previous=None):
+    """LocalVideoTrack.get_stats() の結果から上りの状態を取り出す（なければ None）
+
+    previous は前回の (bytes_sent, timestamp_ms)。送信ビットレートはその差分から求める。
+    戻り値: (LinkStats または None, 次回に渡す previous)
+    """
+    available = 0.0
+    rtt_ms = 0.0
+    loss = 0.0
+    outbound = None
+    for stats in stats_list:
+        kind = stats.WhichOneof("stats")
+        if kind == "candidate_pair":
+            pair = stats.candidate_pair.candidate_pair
+            if pair.available_outgoing_bitrate > 0:
+                available = pair.available_outgoing_bitrate
+                rtt_ms = pair.current_round_trip_time * 1000
+        elif kind == "remote_inbound_rtp":
+            remote = stats.remote_inbound_rtp.remote_inbound
+            loss = max(loss, remote.fraction_lost)
+            rtt_ms = rtt_ms or remote.round_trip_time * 1000
+        elif kind == "outbound_rtp":
+            outbound = stats.outbound_rtp
+    if outbound is None:
+        return None, previous
+
+    current = (outbound.sent.bytes_sent, outbound.rtc.timestamp)
+    sent_bps = 0.0
+    if previous is not None and current[1] > previous[1]:
+        sent_bps = (current[0] - previous[0]) * 8 / ((current[1] - previous[1]) / 1000)
+    reason = outbound.outbound.quality_limitation_reason
+    limited = reason.lower() == "bandwidth" if isinstance(reason, str) else reason == _LIMITATION_BANDWIDTH
+    return LinkStats(available, sent_bps, loss, rtt_ms, limited), current
+
+
+def pixel_rate(profile) -> float:
+    """Side-by-Side 出力の画素数/秒"""
+    return profile.width * 2 * profile.height * profile.fps
+
+
+class BandwidthController:
+    """エンコード段の上げ下げを判断するクラス（publish のやり直しは呼び出し側が行う）
+
+    下げる: 損失率 > max_loss、接続品質 POOR/LOST、推定可能帯域 < 現在の段 × down_margin
+            のいずれかが down_samples 回連続。推定可能帯域 × target_ratio に収まる段まで一気に下げる。
+    上げる: 損失率 < 1%、接続品質が POOR でない、推定可能帯域 > 次の段 × up_ratio が up_samples 回連続。
+    下げた直後の段には backoff 秒（失敗のたびに倍、最大 max_backoff）戻らない。
+    """
+    def __init__(self, encodings=None, start=None, min_bpp=0.05, max_loss=0.05,
+                 down_margin=0.9, target_ratio=0.85, up_ratio=1.3, down_samples=2, up_samples=5,
+                 backoff=20.0, max_backoff=300.0, clock=time.monotonic):
+        self.encodings = list(encodings or DEFAULT_ENCODINGS)
+        self.index = self.encodings.index(start) if start in self.encodings else len(self.encodings) - 1
+        self.min_bpp = min_bpp
+        self.max_loss = max_loss
+        self.down_margin = down_margin
+        self.target_ratio = target_ratio
+        self.up_ratio = up_ratio
+        self.down_samples = down_samples
+        self.up_samples = up_samples
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+
+        self.quality = None
+        self.link = None
+        self._bad = 0
+        self._good = 0
+        self._blocked_until = {}
+        self._failures = {}
+        self.switches = 0
+        self.last_reason = ""
+
+    @property
+    def encoding(self) -> Encoding:
+        return self.encodings[self.index]
+
+    def profile_ceiling(self, profiles) -> int:
+        """現在の段で min_bpp 以上を保てる最上位のプロファイル番号（最低でも 0）"""
+        budget = self.encoding.max_bitrate / self.min_bpp
+        ceiling = 0
+        for i, profile in enumerate(profiles):
+            if pixel_rate(profile) <= budget and profile.fps <= self.encoding.max_fps:
+                ceiling = i
+        return ceiling
+
+    # ---- 観測 ----
+    def observe_quality(self, quality):
+        """ローカル参加者の connection_quality_changed"""
+        self.quality = int(quality)
+
+    def observe_link(self, link: LinkStats):
+        self.link = link
+
+    # ---- 判断 ----
+    def update(self):
+        """統計の取得ごとに呼ぶ。切り替えるべきなら新しい Encoding、そうでなければ None"""
+        link = self.link
+        if link is None:
+            return None
+        self.link = None
+        current = self.encoding
+
+        reason = None
+        if link.loss > self.max_loss:
+            reason = f"loss {link.loss:.0%}"
+        elif self.quality in (_QUALITY_POOR, _QUALITY_LOST):
+            reason = "connection quality poor"
+        elif 0 < link.available_bps < current.max_bitrate * self.down_margin:
+            reason = f"available {link.available_bps / 1e6:.1f} Mbps"
+        log.debug("%s: available %.2f Mbps | sent %.2f Mbps | loss %.1f%% | rtt %.0f ms | limited %s",
+                  current.name, link.available_bps / 1e6, link.sent_bps / 1e6, link.loss * 100,
+                  link.rtt_ms, link.bandwidth_limited)
+
+        if reason is not None:
+            self._good = 0
+            self._bad += 1
+            if self._bad < self.down_samples or self.index == 0:
+                return None
+            self._bad = 0
+            target = self.index - 1
+            if link.available_bps > 0:
+                fits = [i for i, e in enumerate(self.encodings)
+                        if e.max_bitrate <= link.available_bps * self.target_ratio]
+                target = min(target, fits[-1] if fits else 0)
+            return self._switch(target, reason, failed=self.index)
+
+        self._bad = 0
+        if self.index + 1 >= len(self.encodings):
+            return None
+        upper = self.encodings[self.index + 1]
+        if link.loss < 0.01 and link.available_bps > upper.max_bitrate * self.up_ratio:
+            self._good += 1
+        else:
+            self._good = 0
+        if self._good < self.up_samples or self.clock() < self._blocked_until.get(self.index + 1, 0):
+            return None
+        self._good = 0
+        return self._switch(self.index + 1, f"available {link.available_bps / 1e6:.1f} Mbps")
+
+    def _switch(self, index: int, reason: str, failed=None):
+        if failed is not None:
+            count = self._failures.get(failed, 0) + 1
+            self._failures[failed] = count
+            wait = min(self.max_backoff, self.backoff * 2 ** (count - 1))
+            self._blocked_until[failed] = self.clock() + wait
+        old = self.encoding
+        self.index = index
+        self.switches += 1
+        self.last_reason = reason
+        log.info("encoding %s → %s (%s)", old.name, self.encoding.name, reason)
+        return self.encoding
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+アクチュエータスケジューラ（actuator.py）のデッドマン監視のベンチマーク（擬似 Picarx と仮想時計、実時間は待たない）
+操作側が 100ms ごとに走行コマンドを再送し、途中で止まる（タブの凍結・回線断）場面を 50Hz の tick で再生して、
+最後のコマンドから停止（stop()）までの時間と I2C 書き込み数を表示する。
+--check で停止ランプ・failsafe の期待値（タイムアウト前は止めない、ランプで単調に 0 まで、
+新しいコマンドでランプ解除、failsafe で即ランプ開始）を検証する
+"""
+
+import argparse
+import math
+
+from actuator import ActuatorScheduler
+from replay_backend import Picarx
+
+RATE_HZ = 50
+
+
+class Rig:
+    """仮想時計・書き込みログ付きの擬似 Picarx とスケジューラ（tick は n / RATE_HZ 秒で刻む）"""
+    def __init__(self, command_timeout=0.3, stop_ramp=0.2):
+        self.n = 0
+        self.log = []
+        px = Picarx(i2c_ms=0, log=self.log, clock=self.now)
+        self.actuator = ActuatorScheduler(px, rate_hz=RATE_HZ, clock=self.now,
+                                          command_timeout=command_timeout, stop_ramp=stop_ramp)
+
+    def now(self) -> float:
+        return self.n / RATE_HZ
+
+    def tick(self):
+        """1 tick 進めて、その tick の書き込みを返す"""
+        start = len(self.log)
+        self.actuator.tick()
+        writes = self.log[start:]
+        self.n += 1
+        return writes
+
+    def ramp(self, wait=1):
+        """タイムアウト・failsafe 後、止まるまで tick して各 tick の速度を返す（開始前の書き込みなしの tick は wait まで）"""
+        speeds = []
+        waited = 0
+        for _ in range(RATE_HZ):
+            writes = self.tick()
+            if not speeds and not writes:
+                # タイムアウトちょうどの tick（経過 == timeout はまだ止めない）
+                waited += 1
+                assert waited <= wait, "ramp did not start"
+                continue
+            assert all(w[1] != "set_dir_servo_angle" for w in writes), f"steering changed while ramping: {writes}"
+            speeds.append(self.actuator.applied_speed)
+            if self.actuator.applied_speed == 0:
+                assert writes[-1][1] == "stop", writes
+                return speeds
+        raise AssertionError(f"did not stop: {speeds}")
+
+
+def check():
+    timeout, stop_ramp = 0.3, 0.2
+    ramp_ticks = math.ceil(stop_ramp * RATE_HZ)
+    # コマンドの次の tick から、経過が timeout 未満の tick の数（境界の浮動小数点の比較は避ける）
+    hold_ticks = round(timeout * RATE_HZ) - 1
+
+    # (1) command_timeout までは止めない
+    rig = Rig(timeout, stop_ramp)
+    rig.actuator.set_drive(0.5, 0.5)
+    assert [w[1] for w in rig.tick()] == ["set_dir_servo_angle", "forward"]
+    steer = rig.actuator.applied_steer
+    for _ in range(hold_ticks):
+        assert rig.tick() == [], f"write before the timeout at {rig.now():.2f} s"
+    assert rig.actuator.applied_speed == 50 and rig.actuator.watchdog_trips == 0
+
+    # (2) stop_ramp 秒かけて単調に 0 へ（ステアリングはそのまま）
+    speeds = rig.ramp()
+    assert all(b < a for a, b in zip([50] + speeds, speeds)), speeds
+    assert len(speeds) <= ramp_ticks, f"ramp took {len(speeds)} ticks (> {ramp_ticks}): {speeds}"
+    assert rig.actuator.applied_steer == steer
+    assert rig.actuator.watchdog_trips == 1
+    assert rig.tick() == [], "write after stopping"
+
+    # (3) ランプ中の新しいコマンドでランプを解除する
+    rig = Rig(timeout, stop_ramp)
+    rig.actuator.set_drive(-0.8, 0.0)
+    for _ in range(1 + hold_ticks + 4):
+        rig.tick()
+    assert -80 < rig.actuator.applied_speed < 0, rig.actuator.applied_speed
+    rig.actuator.set_drive(-0.8, 0.0)
+    assert [w[1:] for w in rig.tick()] == [("backward", 80)]
+    for _ in range(hold_ticks):
+        assert rig.tick() == [], f"still ramping after a new command at {rig.now():.2f} s"
+    assert rig.actuator.applied_speed == -80
+
+    # (4) failsafe() はタイムアウトを待たずにランプを始め、回数を数える
+    rig = Rig(timeout, stop_ramp)
+    rig.actuator.set_drive(0.6, -0.3)
+    rig.tick()
+    rig.tick()
+    trips = rig.actuator.watchdog_trips
+    rig.actuator.failsafe("check")
+    speeds = rig.ramp(wait=0)
+    assert speeds[0] < 60, speeds
+    assert len(speeds) <= ramp_ticks, speeds
+    assert rig.actuator.watchdog_trips == trips + 1
+    print("check ok")
+
+
+def simulate(duration: float, stall_at: float, resend: float, timeout: float, stop_ramp: float):
+    """resend 秒ごとに走行コマンドを送り、stall_at 秒で送信が止まる"""
+    rig = Rig(timeout, stop_ramp)
+    next_send = 0.0
+    last_sent = stopped_at = None
+    while rig.now() < duration:
+        if rig.now() >= next_send and rig.now() < stall_at:
+            rig.actuator.set_drive(0.6, 0.2)
+            last_sent = rig.now()
+            next_send += resend
+        for entry in rig.tick():
+            if entry[1] == "stop" and stopped_at is None:
+                stopped_at = entry[0]
+    return {
+        "stop_after_ms": None if stopped_at is None else (stopped_at - last_sent) * 1000,
+        "writes": len(rig.log),
+        "trips": rig.actuator.watchdog_trips,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actuator dead-man watchdog benchmark (fake clock)")
+    parser.add_argument("--check", action="store_true", help="停止ランプ・failsafe の期待値を検証して終了")
+    parser.add_argument("--timeout", type=float, default=0.3, help="command_timeout（秒）")
+    parser.add_argument("--ramp", type=float, default=0.2, help="stop_ramp（秒）")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return 0
+
+    print(f"{'resend':>7s} {'stop after last cmd':>20s} {'writes':>7s} {'trips':>6s}")
+    for resend in (0.05, 0.1, 0.2, 0.4):
+        r = simulate(3.0, 2.0, resend, args.timeout, args.ramp)
+        stop = "-" if r["stop_after_ms"] is None else f"{r['stop_after_ms']:.0f} ms"
+        print(f"{resend * 1000:5.0f}ms {stop:>20s} {r['writes']:7d} {r['trips']:6d}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
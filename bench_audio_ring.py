@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+マイク受け渡しのベンチマーク（合成した生産者スレッド使用、マイク / LiveKit 不要）
+旧方式（PortAudio スレッドから asyncio.Queue.put_nowait + 20ms タイムアウトのポーリング）と
+AudioRing（call_soon_threadsafe で起床）の、積んでから取り出すまでの遅延・消費側の起床回数を比較する
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from audio_ring import AudioRing
+from latency import LatencyHistogram
+
+
+class SyntheticMic:
+    """period_ms ごとに (samples, 1) の int16 ブロックを callback に渡すスレッド
+
+    ブロック先頭のサンプルに通し番号を入れ、積んだ時刻を pushed_at に残す。
+    """
+    def __init__(self, callback, count, samples=480, period_ms=10.0, jitter_ms=1.0, seed=0):
+        self.callback = callback
+        self.count = count
+        self.period = period_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.block = np.zeros((samples, 1), dtype=np.int16)
+        self.pushed_at = [0.0] * count
+        self._random = np.random.default_rng(seed)
+        self._thread = threading.Thread(target=self._run, name="synthetic-mic", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def join(self):
+        self._thread.join()
+
+    def _run(self):
+        next_time = time.perf_counter()
+        for seq in range(self.count):
+            # PortAudio のコールバック到着の揺らぎを模擬
+            next_time += self.period
+            delay = next_time + self._random.uniform(0, self.jitter) - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.block[0, 0] = seq
+            self.pushed_at[seq] = time.perf_counter()
+            self.callback(self.block)
+
+
+async def send_frame(data):
+    """audio_source.capture_frame の代わり（イベントループに1回譲る）"""
+    await asyncio.sleep(0)
+
+
+async def bench_queue(count):
+    """旧 MicrophoneCapture の受け渡し（比較用の再現）"""
+    queue = asyncio.Queue(maxsize=50)
+    hist = LatencyHistogram(window=count)
+    wakeups = 0
+
+    def callback(block):
+        try:
+            queue.put_nowait(block.copy())
+        except asyncio.QueueFull:
+            pass
+
+    mic = SyntheticMic(callback, count)
+    mic.start()
+    received = 0
+    while received < count:
+        while queue.qsize() > 10:
+            queue.get_nowait()
+            received += 1
+        wakeups += 1
+        try:
+            data = await asyncio.wait_for(queue.get(), timeout=0.02)
+        except asyncio.TimeoutError:
+            await asyncio.sleep(0)
+            if not mic._thread.is_alive() and queue.empty():
+                break
+            continue
+        hist.record((time.perf_counter() - mic.pushed_at[int(data[0, 0])]) * 1000)
+        data = data.flatten().astype(np.int16)
+        await send_frame(data.tobytes())
+        received += 1
+    mic.join()
+    return hist, wakeups
+
+
+async def bench_ring(count, max_backlog):
+    ring = AudioRing.allocate(16, 480, 1, max_backlog=max_backlog)
+    ring.attach()
+    hist = LatencyHistogram(window=count)
+
+    mic = SyntheticMic(ring.push, count)
+    mic.start()
+    threading.Thread(target=lambda: (mic.join(), ring.close()), daemon=True).start()
+    while True:
+        index = await ring.get()
+        if index is None:
+            break
+        slot = ring.slots[index]
+        hist.record((time.perf_counter() - mic.pushed_at[int(slot[0, 0])]) * 1000)
+        await send_frame(slot)
+        ring.release()
+    return hist, ring.wakeups, ring
+
+
+async def idle_wakeups(seconds):
+    """データが来ない間の消費側の起床回数（旧方式はタイムアウトごとに起きる）"""
+    queue = asyncio.Queue(maxsize=50)
+    polls = 0
+
+    async def poll():
+        nonlocal polls
+        while True:
+            polls += 1
+            try:
+                await asyncio.wait_for(queue.get(), timeout=0.02)
+            except asyncio.TimeoutError:
+                await asyncio.sleep(0)
+
+    ring = AudioRing.allocate(16, 480, 1)
+    ring.attach()
+    tasks = [asyncio.create_task(poll()), asyncio.create_task(ring.get())]
+    await asyncio.sleep(seconds)
+    for task in tasks:
+        task.cancel()
+    return polls / seconds, ring.wakeups / seconds
+
+
+def report(name, hist, wakeups, seconds):
+    values = hist.percentiles()
+    print(f"  {name:6s} latency p50 {values[50]:6.2f} | p95 {values[95]:6.2f} | "
+          f"p99 {values[99]:6.2f} ms | consumer wakeups {wakeups / seconds:6.1f}/s (n={hist.count})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microphone handoff benchmark (synthetic producer)")
+    parser.add_argument("--count", type=int, default=300, help="10ms ブロック数")
+    parser.add_argument("--max-backlog", type=int, default=5)
+    args = parser.parse_args()
+
+    seconds = args.count / 100
+    print(f"Synthetic mic: {args.count} blocks of 10 ms ({seconds:.1f}s)")
+    report("queue", *asyncio.run(bench_queue(args.count)), seconds)
+    hist, wakeups, ring = asyncio.run(bench_ring(args.count, args.max_backlog))
+    report("ring", hist, wakeups, seconds)
+    print(f"  ring overruns {ring.overruns}, dropped {ring.dropped}")
+    queue_idle, ring_idle = asyncio.run(idle_wakeups(1.0))
+    print(f"  idle consumer wakeups: queue {queue_idle:.1f}/s, ring {ring_idle:.1f}/s")
+
+
+if __name__ == "__main__":
+    main()
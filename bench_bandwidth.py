@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+帯域適応のシミュレーション（擬似の送信統計、LiveKit サーバー不要）
+上り容量を時間で変化させ、帯域推定（GCC 相当: 損失で下げ、徐々に上げる）と
+エンコーダ（最大ビットレートで頭打ち、解像度・fps に応じた下限を割れない）を単純化して模擬する。
+固定 8 Mbps（従来）と BandwidthController の フリーズ時間・送信ビットレート・画素あたりビット数 を比較する
+--check で「フリーズが大きく減る」「切り替え回数が有限」「回復後に最上段へ戻る」を検証する
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from bandwidth_controller import DEFAULT_ENCODINGS, BandwidthController, LinkStats, pixel_rate
+from quality_controller import DEFAULT_PROFILES
+
+STEP = 2.0          # 統計の取得周期（stream_stereo_livekit.py と同じ）
+FLOOR_BPP = 0.02    # これ未満にはエンコーダが絞りきれない（超過分は損失になる）
+FREEZE_LOSS = 0.10  # この損失率以上の区間をフリーズとみなす
+REPUBLISH_S = 1.0   # publish し直しによる映像の途切れ
+
+# (この時刻まで s, 上り容量 bps)
+DEFAULT_TRACE = [(60, 12e6), (120, 2.5e6), (180, 0.9e6), (240, 4e6), (420, 12e6)]
+
+
+def capacity_at(trace, t):
+    for until, bps in trace:
+        if t < until:
+            return bps
+    return trace[-1][1]
+
+
+def connection_quality(loss):
+    """LiveKit の ConnectionQuality 相当（POOR=0, GOOD=1, EXCELLENT=2）"""
+    return 0 if loss > 0.05 else 1 if loss > 0.01 else 2
+
+
+def simulate(trace, start_profile, adaptive=True, seed=0):
+    rng = np.random.default_rng(seed)
+    profiles = DEFAULT_PROFILES
+    cpu_index = profiles.index(start_profile)  # CPU 側で持続できる段（ここでは一定とする）
+    t = 0.0
+    controller = BandwidthController(DEFAULT_ENCODINGS, clock=lambda: t)
+    encoding = controller.encoding
+    profile = start_profile
+    estimate = capacity_at(trace, 0)
+
+    frozen = 0.0
+    sent_total = delivered_total = 0.0
+    bpp = []
+    timeline = [(0.0, encoding.name, profile.name, "start")]
+    end = trace[-1][0]
+    while t < end:
+        capacity = capacity_at(trace, t) * rng.uniform(0.95, 1.05)
+        target = min(encoding.max_bitrate, estimate)
+        sent = max(target, pixel_rate(profile) * FLOOR_BPP)
+        loss = max(0.0, sent - capacity) / sent
+        delivered = min(sent, capacity)
+        if loss >= FREEZE_LOSS:
+            frozen += STEP
+        sent_total += sent * STEP
+        delivered_total += delivered * STEP
+        bpp.append(delivered / pixel_rate(profile))
+
+        # 帯域推定: 損失があれば実効値の 85% へ、なければ 15%/周期で上げる（容量は超えない）
+        estimate = delivered * 0.85 if loss > 0.02 else min(estimate * 1.15, capacity)
+
+        if adaptive:
+            controller.observe_quality(connection_quality(loss))
+            controller.observe_link(LinkStats(estimate, sent, loss, 50.0, encoding.max_bitrate > estimate))
+            new_encoding = controller.update()
+            if new_encoding is not None:
+                encoding = new_encoding
+                profile = profiles[min(cpu_index, controller.profile_ceiling(profiles))]
+                frozen += REPUBLISH_S
+                timeline.append((t, encoding.name, profile.name, controller.last_reason))
+        t += STEP
+
+    return {
+        "frozen_s": frozen,
+        "sent_mbps": sent_total / end / 1e6,
+        "delivered_mbps": delivered_total / end / 1e6,
+        "bpp": float(np.mean(bpp)),
+        "switches": controller.switches,
+        "final": controller.encoding,
+        "timeline": timeline,
+    }
+
+
+def check():
+    start = next(p for p in DEFAULT_PROFILES if p.name == "mid")
+    fixed = simulate(DEFAULT_TRACE, start, adaptive=False)
+    adaptive = simulate(DEFAULT_TRACE, start)
+    assert fixed["frozen_s"] >= 50, fixed["frozen_s"]
+    assert adaptive["frozen_s"] < fixed["frozen_s"] / 3, (adaptive["frozen_s"], fixed["frozen_s"])
+    assert adaptive["switches"] <= 8, adaptive["timeline"]
+    assert adaptive["final"] == DEFAULT_ENCODINGS[-1], adaptive["timeline"]
+
+    # 容量が一定で十分なら切り替えない
+    steady = simulate([(300, 12e6)], start)
+    assert steady["switches"] == 0, steady["timeline"]
+    print("check ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bandwidth adaptation simulation (stand-in stats feed)")
+    parser.add_argument("--start", default="mid", help="開始プロファイル名（CPU 側で持続できる上限）")
+    parser.add_argument("--check", action="store_true", help="期待する挙動を検証して終了")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return 0
+
+    start = next(p for p in DEFAULT_PROFILES if p.name == args.start)
+    print("uplink trace: " + ", ".join(f"{bps / 1e6:g} Mbps until {until}s" for until, bps in DEFAULT_TRACE))
+    for name, adaptive in (("fixed 8M", False), ("adaptive", True)):
+        r = simulate(DEFAULT_TRACE, start, adaptive=adaptive)
+        print(f"  {name:9s} frozen {r['frozen_s']:5.0f} s | sent {r['sent_mbps']:5.2f} Mbps | "
+              f"delivered {r['delivered_mbps']:5.2f} Mbps | {r['bpp']:.3f} bit/px | {r['switches']} switches")
+        if adaptive:
+            for t, encoding, profile, reason in r["timeline"]:
+                print(f"    {t:6.1f}s  {encoding:5s} {profile:7s} ({reason})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
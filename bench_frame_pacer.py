@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+フレームペーサーのベンチマーク（擬似時計、実時間で待たない）
+旧方式（sleep(interval - elapsed)、遅れたら sleep(0)）と FramePacer の
+公開間隔の揺らぎ・実効 fps・予定からのずれを、処理時間に周期的な遅延スパイクを入れて比較する
+--check で擬似時計上の期待値（締め切り・スキップ数）を検証する
+"""
+
+import argparse
+import asyncio
+import sys
+
+import numpy as np
+
+from frame_pacer import FramePacer
+
+
+class FakeClock:
+    """sleep() で時刻を進めるだけの擬似時計"""
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.now += max(0.0, seconds)
+
+    def work(self, seconds):
+        self.now += seconds
+
+
+def work_times(count, fps, base_ratio, spike_every, spike_ratio, seed=0):
+    """各フレームの処理時間（秒）。基本は interval * base_ratio、spike_every ごとにスパイク"""
+    rng = np.random.default_rng(seed)
+    interval = 1.0 / fps
+    times = interval * base_ratio * rng.uniform(0.8, 1.2, count)
+    if spike_every:
+        times[spike_every - 1::spike_every] = interval * spike_ratio
+    return times
+
+
+async def run_legacy(clock, fps, works):
+    interval = 1.0 / fps
+    published = []
+    for work in works:
+        start = clock()
+        clock.work(work)
+        published.append(clock())
+        elapsed = clock() - start
+        if elapsed < interval:
+            await clock.sleep(interval - elapsed)
+        else:
+            await clock.sleep(0)
+    return published, None
+
+
+async def run_pacer(clock, fps, works):
+    pacer = FramePacer(fps, clock=clock, sleep=clock.sleep)
+    pacer.start()
+    published = []
+    for work in works:
+        clock.work(work)
+        published.append(clock())
+        await pacer.wait()
+    return published, pacer
+
+
+def report(name, published, fps, pacer):
+    published = np.array(published)
+    gaps = np.diff(published) * 1000
+    duration = published[-1] - published[0]
+    # 予定の格子（開始時刻 + n * interval）からの、各フレーム開始のずれ（最後のフレーム）
+    drift = (duration - (len(published) - 1) / fps) * 1000
+    line = (f"  {name:7s} fps {(len(published) - 1) / duration:5.2f} | "
+            f"gap mean {gaps.mean():5.1f} ms, std {gaps.std():5.1f} ms | drift {drift:8.1f} ms")
+    if pacer is not None:
+        line += f" | {pacer.summary()}"
+    print(line)
+
+
+def check():
+    """擬似時計で締め切りとカウンタを検証する"""
+    async def scenario():
+        clock = FakeClock()
+        pacer = FramePacer(10, clock=clock, sleep=clock.sleep)  # 100ms 周期
+        pacer.start()
+
+        clock.work(0.030)                 # 間に合う → 0.100 まで待つ
+        await pacer.wait()
+        assert abs(clock() - 0.100) < 1e-9, clock()
+        clock.work(0.150)                 # 0.250: 締め切り 0.200 に 50ms 遅れ（1周期未満）
+        await pacer.wait()
+        assert pacer.late == 1 and pacer.skipped == 0
+        assert abs(pacer.next_deadline - 0.300) < 1e-9, pacer.next_deadline
+        clock.work(0.010)                 # 0.260 → 0.300 まで待って格子に戻る
+        await pacer.wait()
+        assert abs(clock() - 0.300) < 1e-9, clock()
+        clock.work(0.350)                 # 0.650: 締め切り 0.400 から 250ms → 0.500, 0.600 を飛ばす
+        await pacer.wait()
+        assert pacer.skipped == 2 and pacer.late == 2, pacer.summary()
+        assert abs(pacer.next_deadline - 0.700) < 1e-9, pacer.next_deadline
+        clock.work(0.010)
+        await pacer.wait()
+        assert abs(clock() - 0.700) < 1e-9, clock()
+        assert pacer.on_time == 3, pacer.summary()
+        assert abs(pacer.max_lateness - 0.250) < 1e-9
+
+    asyncio.run(scenario())
+
+    # 長時間: 使った枠数と経過時間の差が1周期未満（遅延スパイクがあっても格子からずれない）
+    async def long_run():
+        clock = FakeClock()
+        works = work_times(2400, 24, 0.5, 48, 2.5)  # スパイクごとに1枠スキップ
+        pacer = FramePacer(24, clock=clock, sleep=clock.sleep)
+        pacer.start()
+        for work in works:
+            clock.work(work)
+            await pacer.wait()
+        slots = pacer.on_time + pacer.late + pacer.skipped
+        assert slots == pacer._index, pacer.summary()
+        assert abs(clock() - slots / 24) < 1 / 24, (clock(), slots / 24)
+        assert pacer.skipped == 2400 // 48, pacer.summary()
+
+    asyncio.run(long_run())
+    print("check ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Frame pacer benchmark (fake clock)")
+    parser.add_argument("--fps", type=float, default=24)
+    parser.add_argument("--count", type=int, default=2400)
+    parser.add_argument("--base", type=float, default=0.6, help="通常の処理時間（周期に対する比）")
+    parser.add_argument("--spike-every", type=int, default=24, help="スパイクの間隔（フレーム数、0 で無効）")
+    parser.add_argument("--spike", type=float, default=1.8, help="スパイク時の処理時間（周期に対する比）")
+    parser.add_argument("--check", action="store_true", help="擬似時計での期待値を検証して終了")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return 0
+
+    works = work_times(args.count, args.fps, args.base, args.spike_every, args.spike)
+    print(f"{args.count} frames @ {args.fps} fps, work {args.base:.0%} of interval, "
+          f"spike {args.spike:.0%} every {args.spike_every} frames")
+    published, _ = asyncio.run(run_legacy(FakeClock(), args.fps, works))
+    report("legacy", published, args.fps, None)
+    published, pacer = asyncio.run(run_pacer(FakeClock(), args.fps, works))
+    report("pacer", published, args.fps, pacer)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+フレームリーダーのベンチマーク（カメラ不要）
+rpicam-vid の代わりに、ファイル（または合成データ）を fps 周期でパイプへ書き込み、
+旧方式（イベントループ内で read）と FrameReader のイベントループ遅延とカウンタを比較する
+"""
+
+import argparse
+import asyncio
+import os
+import threading
+import time
+
+
+def start_producer(source_path, frame_size, fps, count):
+    """fps 周期で frame_size バイトずつパイプに書き込むスレッドを起動し、読み込み側を返す"""
+    read_fd, write_fd = os.pipe()
+    if source_path:
+        with open(source_path, "rb") as f:
+            data = f.read()
+        frames = [data[i:i + frame_size] for i in range(0, len(data) - frame_size + 1, frame_size)]
+        if not frames:
+            raise SystemExit(f"ERROR: {source_path} is smaller than one frame")
+    else:
+        frames = [bytes([i % 256]) * frame_size for i in range(4)]
+
+    def produce():
+        interval = 1.0 / fps
+        next_time = time.monotonic()
+        with os.fdopen(write_fd, "wb", buffering=0) as out:
+            for i in range(count):
+                try:
+                    out.write(frames[i % len(frames)])
+                except BrokenPipeError:
+                    return
+                next_time += interval
+                time.sleep(max(0, next_time - time.monotonic()))
+
+    threading.Thread(target=produce, daemon=True).start()
+    return os.fdopen(read_fd, "rb")
+
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    """1ms 周期のティッカーでイベントループの遅れを計測"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        lags.append(loop.time() - start - 0.001)
+
+
+async def run_blocking(stream, frame_size, work_ms):
+    frames = 0
+    while True:
+        data = stream.read(frame_size)
+        if len(data) < frame_size:
+            break
+        frames += 1
+        time.sleep(work_ms / 1000)  # capture_frame 相当の処理
+        await asyncio.sleep(0)
+    return {"frames_published": frames}
+
+
+async def run_reader(stream, frame_size, work_ms, fps):
+    from frame_reader import FrameReader
+    reader = FrameReader(stream, frame_size, late_after=1.0 / fps)
+    reader.start()
+    frames = 0
+    while True:
+        data = await reader.get()
+        if data is None:
+            break
+        frames += 1
+        time.sleep(work_ms / 1000)
+        await asyncio.sleep(0)
+    reader.stop()
+    return {
+        "frames_published": frames,
+        "frames_read": reader.frames_read,
+        "frames_dropped": reader.frames_dropped,
+        "frames_late": reader.frames_late,
+    }
+
+
+async def bench(mode, args, frame_size):
+    stream = start_producer(args.file, frame_size, args.fps, args.count)
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, lags))
+    start = time.perf_counter()
+    if mode == "blocking":
+        result = await run_blocking(stream, frame_size, args.work_ms)
+    else:
+        result = await run_reader(stream, frame_size, args.work_ms, args.fps)
+    result["seconds"] = time.perf_counter() - start
+    stop.set()
+    await ticker
+    stream.close()
+    lags_ms = sorted(l * 1000 for l in lags)
+    result["loop_lag_p50_ms"] = lags_ms[len(lags_ms) // 2]
+    result["loop_lag_max_ms"] = lags_ms[-1]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FrameReader benchmark")
+    parser.add_argument("--file", help="YUV420 の生フレームファイル（省略時は合成データ）")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--count", type=int, default=90)
+    parser.add_argument("--work-ms", type=float, default=5.0, help="1フレームあたりの配信処理時間")
+    args = parser.parse_args()
+
+    frame_size = args.width * args.height * 3 // 2
+    print(f"{args.count} frames x {frame_size / 1e6:.2f} MB @ {args.fps}fps")
+    for mode in ("blocking", "reader"):
+        result = asyncio.run(bench(mode, args, frame_size))
+        counters = " | ".join(f"{k} {v}" for k, v in result.items()
+                              if k.startswith("frames_"))
+        print(f"  {mode:8s} loop lag p50 {result['loop_lag_p50_ms']:5.2f} ms, "
+              f"max {result['loop_lag_max_ms']:6.2f} ms | {counters}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+raw 配信と H.264 配信の CPU 比較（オフライン、LiveKit サーバー不要）
+録画したフレーム（rpicam-vid --codec yuv420 の左右2ファイル）または合成パターンを
+StereoComposerI420 で Side-by-Side にし、fps に合わせて H264WhipSource へ渡す。
+出力は WHIP ではなく一時ファイル。1フレームあたりの CPU（このプロセス + ffmpeg）と実ビットレートを表示する
+
+raw 経路は Python SDK 内のソフトウェアエンコード（既定 VP8）なので、libvpx のリアルタイム設定で代用する
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from h264_publish import H264_ENCODERS, SOFTWARE_H264_ENCODERS, H264WhipSource, ffmpeg_capabilities
+from stereo_compose import StereoComposerI420
+
+
+def load_frames(path, width, height, count):
+    """録画した YUV420 ファイルから count フレーム（足りなければ繰り返す）"""
+    size = width * height * 3 // 2
+    data = np.fromfile(path, dtype=np.uint8)
+    n = len(data) // size
+    if n == 0:
+        raise ValueError(f"{path}: no complete {width}x{height} YUV420 frame")
+    frames = data[:n * size].reshape(n, height * 3 // 2, width)
+    return [frames[i % n] for i in range(count)]
+
+
+def synthetic_frames(width, height, count, seed):
+    """横に流れる模様 + ノイズ（動きのある映像の代わり）"""
+    rng = np.random.default_rng(seed)
+    xx = np.arange(width)
+    yy = np.arange(height)[:, None]
+    frames = []
+    for i in range(count):
+        frame = np.empty((height * 3 // 2, width), dtype=np.uint8)
+        y = 128 + 60 * np.sin((xx + i * 8) / 37.0) * np.cos(yy / 23.0) + rng.normal(0, 4, (height, width))
+        frame[:height] = np.clip(y, 0, 255)
+        frame[height:] = 128
+        frames.append(frame)
+    return frames
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    child = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime, child.ru_utime + child.ru_stime
+
+
+def run(encoder, fmt, suffix, left, right, args):
+    composer = StereoComposerI420(args.width, args.height)
+    frame = SimpleNamespace(data=composer.view)
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, f"out.{suffix}")
+        own0, child0 = cpu_seconds()
+        source = H264WhipSource(composer.stereo_width, args.height, args.fps, output,
+                                encoder=encoder, bitrate=args.bitrate, fmt=fmt)
+        interval = 1.0 / args.fps
+        start = time.monotonic()
+        for i, (frame_left, frame_right) in enumerate(zip(left, right)):
+            composer.compose(frame_left, frame_right)
+            source.capture_frame(frame)
+            delay = start + (i + 1) * interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        source.close(timeout=30)
+        own1, child1 = cpu_seconds()
+        size = os.path.getsize(output) if os.path.exists(output) else 0
+    frames = len(left)
+    return {
+        "python_ms": (own1 - own0) / frames * 1000,
+        "encoder_ms": (child1 - child0) / frames * 1000,
+        "kbps": size * 8 / (frames / args.fps) / 1000,
+        "written": source.frames,
+        "dropped": source.dropped,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Raw vs H.264 publishing CPU benchmark (offline)")
+    parser.add_argument("--width", type=int, default=1280, help="片目の幅")
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--frames", type=int, default=240)
+    parser.add_argument("--bitrate", type=int, default=6_000_000)
+    parser.add_argument("--left", help="左カメラの録画（YUV420 raw）")
+    parser.add_argument("--right", help="右カメラの録画（YUV420 raw）")
+    args = parser.parse_args()
+
+    if args.left and args.right:
+        left = load_frames(args.left, args.width, args.height, args.frames)
+        right = load_frames(args.right, args.width, args.height, args.frames)
+        origin = f"recorded ({args.left}, {args.right})"
+    else:
+        left = synthetic_frames(args.width, args.height, args.frames, 1)
+        right = synthetic_frames(args.width, args.height, args.frames, 2)
+        origin = "synthetic"
+
+    encoders, _ = ffmpeg_capabilities()
+    print(f"{args.frames} frames {args.width * 2}x{args.height} @ {args.fps}fps ({origin}), "
+          f"{args.bitrate / 1e6:g} Mbps, {os.cpu_count()} cores")
+    paths = [("raw (SDK VP8 equivalent)", "libvpx", "ivf", "ivf")]
+    paths += [(f"h264 {name}", name, "h264", "h264") for name in H264_ENCODERS + SOFTWARE_H264_ENCODERS]
+    for label, encoder, fmt, suffix in paths:
+        if encoder not in encoders:
+            print(f"  {label:26s} skipped ({encoder} not available in ffmpeg)")
+            continue
+        r = run(encoder, fmt, suffix, left, right, args)
+        print(f"  {label:26s} cpu {r['python_ms'] + r['encoder_ms']:6.1f} ms/frame "
+              f"(python {r['python_ms']:5.1f} + encoder {r['encoder_ms']:5.1f}) | "
+              f"{r['kbps']:6.0f} kbps | written {r['written']}, dropped {r['dropped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+メトリクス（metrics.py）のスクレイプ時間のベンチマーク
+配信と同程度の項目（遅延6区間 × 1000件、カウンタ、ゲージ）を登録し、render() と HTTP 経由の取得時間を測る。
+値はスクレイプ時に読むだけなので、フレームごとのコストは増えない（ここで測るのは 15 秒ごとなどの取得1回分）
+"""
+
+import argparse
+import time
+import urllib.request
+
+import numpy as np
+
+from latency import LatencyStats
+from metrics import MetricsRegistry, MetricsServer
+from runtime_log import Counters
+
+
+def build_registry():
+    reg = MetricsRegistry()
+    stats = LatencyStats()
+    rng = np.random.default_rng(0)
+    for stage in ("capture_to_publish", "compose", "encode", "control_rx", "command_age", "control_apply"):
+        for ms in rng.gamma(2.0, 5.0, 1000):
+            stats.record(stage, float(ms))
+    counters = Counters()
+    for key in ("rx", "rx_data", "mic_overrun", "rx_invalid"):
+        counters.incr(key, 100)
+    reg.add_counters("bench_events_total", counters)
+    reg.add_latency("bench_latency_ms", stats)
+    for n in range(20):
+        reg.gauge(f"bench_gauge_{n}", "gauge", lambda n=n: n * 1.5)
+    return reg
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics scrape cost")
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    reg = build_registry()
+    samples = []
+    for _ in range(args.iterations):
+        start = time.perf_counter()
+        text = reg.render()
+        samples.append(time.perf_counter() - start)
+    p50, p95 = np.percentile(np.asarray(samples) * 1000, (50, 95))
+    print(f"render     p50 {p50:6.3f} ms | p95 {p95:6.3f} ms ({len(text.splitlines())} lines, {len(text)} bytes)")
+
+    server = MetricsServer(reg, 0).start()
+    url = f"http://127.0.0.1:{server.port}/metrics"
+    samples = []
+    for _ in range(args.iterations // 4):
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        samples.append(time.perf_counter() - start)
+    server.stop()
+    p50, p95 = np.percentile(np.asarray(samples) * 1000, (50, 95))
+    print(f"http GET   p50 {p50:6.3f} ms | p95 {p95:6.3f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+MQTT 送受信層（mqtt_transport.py）の確認用ベンチマーク（ローカルの Mosquitto、PiCar-X 不要）
+pi_picarx_mqtt.create_transport() を擬似 Picarx で動かし、ソケットを強制的に切ってネットワーク断を模擬する。
+別の購読者で TOPIC_TELE / TOPIC_STATUS を受け、次を表示する:
+    再接続までの時間（バックオフ）、切断前後のスレッド数（再接続でスレッドが増えないこと）、
+    テレメトリの受信レートと間隔、LWT（offline → online）の順序
+
+ブローカー（server/mosquitto/mosquitto.conf をそのまま使う）:
+    docker run --rm -p 1883:1883 -p 9001:9001 \\
+        -v $PWD/server/mosquitto/mosquitto.conf:/mosquitto/config/mosquitto.conf eclipse-mosquitto:2
+    python3 bench_mqtt_transport.py --broker localhost:1883 --flaps 5
+"""
+
+import argparse
+import json
+import socket
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+import pi_picarx_mqtt
+from replay_backend import Picarx
+from runtime_log import setup_logging
+
+
+class Monitor:
+    """テレメトリと状態トピックを受ける別クライアント"""
+    def __init__(self, host, port):
+        self.telemetry = []   # (受信時刻, payload)
+        self.status = []
+        self._lock = threading.Lock()
+        self.client = mqtt.Client(client_id="bench-mqtt-monitor", protocol=mqtt.MQTTv311)
+        self.client.on_connect = lambda c, *a: c.subscribe(
+            [(pi_picarx_mqtt.TOPIC_TELE, 0), (pi_picarx_mqtt.TOPIC_STATUS, 1)])
+        self.client.on_message = self._on_message
+        self.client.connect(host, port, keepalive=30)
+        self.client.loop_start()
+
+    def _on_message(self, client, userdata, msg):
+        with self._lock:
+            if msg.topic == pi_picarx_mqtt.TOPIC_TELE:
+                self.telemetry.append((time.monotonic(), json.loads(msg.payload)))
+            else:
+                self.status.append(msg.payload.decode())
+
+    def close(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="MQTT transport check against a local Mosquitto")
+    parser.add_argument("--broker", default="localhost:1883")
+    parser.add_argument("--flaps", type=int, default=3, help="強制切断の回数")
+    parser.add_argument("--hold", type=float, default=4.0, help="切断の間隔（秒）")
+    args = parser.parse_args()
+    setup_logging("WARNING")
+    host, _, port = args.broker.partition(":")
+    port = int(port or 1883)
+
+    monitor = Monitor(host, port)
+    pi_picarx_mqtt.setup_control(Picarx())
+    transport = pi_picarx_mqtt.create_transport(host, port)
+    transport.start()
+    if not transport.connected.wait(5.0):
+        raise SystemExit(f"could not connect to {args.broker}")
+    time.sleep(args.hold)
+    threads_before = threading.active_count()
+
+    reconnect_ms = []
+    for _ in range(args.flaps):
+        # DISCONNECT を送らずにソケットを切る（ブローカーは LWT を出し、paho はバックオフして再接続する）
+        start = time.monotonic()
+        transport.client.socket().shutdown(socket.SHUT_RDWR)
+        while transport.connected.is_set() and time.monotonic() - start < 5.0:
+            time.sleep(0.01)
+        if not transport.connected.wait(60.0):
+            raise SystemExit("did not reconnect")
+        reconnect_ms.append((time.monotonic() - start) * 1000)
+        time.sleep(args.hold)
+    threads_after = threading.active_count()
+
+    transport.stop()
+    pi_picarx_mqtt.actuator.stop()
+    time.sleep(0.5)
+    monitor.close()
+
+    times = [t for t, _ in monitor.telemetry]
+    gaps = [(b - a) * 1000 for a, b in zip(times, times[1:])]
+    rate = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 else 0.0
+    print(f"MQTT transport @ {args.broker} | {args.flaps} flaps, connects {transport.connects}")
+    print(f"  reconnect      {', '.join(f'{ms:.0f}' for ms in reconnect_ms)} ms")
+    print(f"  threads        {threads_before} before flaps -> {threads_after} after")
+    print(f"  telemetry      {len(times)} msgs, {rate:.2f}/s "
+          f"(interval {pi_picarx_mqtt.TELEMETRY_INTERVAL:g} s), max gap {max(gaps, default=0):.0f} ms")
+    if monitor.telemetry:
+        print(f"  last payload   {json.dumps(monitor.telemetry[-1][1])}")
+    print(f"  status         {' -> '.join(monitor.status)}")
+    print(f"  counters       {pi_picarx_mqtt.counters.snapshot()}")
+    return 0 if threads_after <= threads_before else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+on_message スループットのベンチマーク（PiCar-X / ブローカー不要、paho-mqtt は必要）
+旧方式（毎メッセージ print + 同期 I2C 書き込み）と現在の pi_picarx_mqtt.on_message を比較する
+--check でバイナリ制御プロトコル（control_protocol.py）の変換と seq フィルタの期待値を検証する
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import control_protocol
+import pi_picarx_mqtt
+from replay_backend import Picarx as FakePicarx
+from runtime_log import setup_logging
+
+
+def make_legacy_on_message(px):
+    """ベースライン版 on_message / drive / camera_move の再現（比較用）"""
+    def drive(throttle, steer):
+        print(f"[DRIVE] throttle={throttle:.2f}, steer={steer:.2f}")
+        steer_angle = max(-30, min(30, int(steer * 30)))
+        print(f"  -> set_dir_servo_angle({steer_angle})")
+        px.set_dir_servo_angle(steer_angle)
+        speed = max(0, min(100, int(abs(throttle) * 100)))
+        if throttle > 0.01:
+            print(f"  -> forward({speed})")
+            px.forward(speed)
+        elif throttle < -0.01:
+            print(f"  -> backward({speed})")
+            px.backward(speed)
+        else:
+            print(f"  -> stop()")
+            px.stop()
+
+    def camera_move(pan_deg, tilt_deg):
+        print(f"[CAMERA] pan={pan_deg:.1f}°, tilt={tilt_deg:.1f}°")
+        pan_deg = max(-90, min(90, pan_deg))
+        print(f"  -> set_cam_pan_angle({pan_deg})")
+        px.set_cam_pan_angle(pan_deg)
+        tilt_deg = max(-35, min(65, tilt_deg))
+        print(f"  -> set_cam_tilt_angle({tilt_deg})")
+        px.set_cam_tilt_angle(tilt_deg)
+
+    def on_message(client, userdata, msg):
+        print("RX", msg.topic, msg.payload.decode(errors="ignore"))
+        payload = json.loads(msg.payload.decode("utf-8"))
+        if msg.topic == pi_picarx_mqtt.TOPIC_CMD:
+            drive(max(-1.0, min(1.0, float(payload.get("throttle", 0)))),
+                  max(-1.0, min(1.0, float(payload.get("steer", 0)))))
+        elif msg.topic == pi_picarx_mqtt.TOPIC_PT:
+            camera_move(float(payload.get("pan", 0)), float(payload.get("tilt", 0)))
+
+    return on_message
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        if i % 2:
+            payload = {"pan": (i % 90) - 45, "tilt": (i % 60) - 30}
+            messages.append(SimpleNamespace(topic=pi_picarx_mqtt.TOPIC_PT,
+                                            payload=json.dumps(payload).encode()))
+        else:
+            payload = {"throttle": ((i % 200) - 100) / 100, "steer": ((i % 50) - 25) / 25}
+            messages.append(SimpleNamespace(topic=pi_picarx_mqtt.TOPIC_CMD,
+                                            payload=json.dumps(payload).encode()))
+    return messages
+
+
+def make_binary_messages(count):
+    """make_messages と同じ内容をバイナリ制御トピックで送る"""
+    messages = []
+    for i in range(count):
+        if i % 2:
+            payload = control_protocol.encode(i, control_protocol.FLAG_CAMERA,
+                                              pan=(i % 90) - 45, tilt=(i % 60) - 30)
+        else:
+            payload = control_protocol.encode(i, control_protocol.FLAG_DRIVE,
+                                              throttle=((i % 200) - 100) / 100,
+                                              steer=((i % 50) - 25) / 25)
+        messages.append(SimpleNamespace(topic=pi_picarx_mqtt.TOPIC_BIN, payload=payload))
+    return messages
+
+
+def measure(on_message, messages):
+    start = time.perf_counter()
+    for msg in messages:
+        on_message(None, None, msg)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def check():
+    """control_protocol の往復変換と、順序入れ替わり・重複・折り返し・送信側の再読み込みの扱いを検証する"""
+    msg = control_protocol.decode(control_protocol.encode(7, control_protocol.FLAG_DRIVE, 0.5, -1.5, 12.34, -5,
+                                                          sent_ms=1000.0))
+    assert (msg.seq, msg.sent_ms, msg.throttle, msg.steer, msg.pan, msg.tilt) == (7, 1000.0, 0.5, -1.0, 12.34, -5.0)
+    stop = control_protocol.decode(control_protocol.encode(8, control_protocol.FLAG_STOP, 1.0, 1.0))
+    assert (stop.throttle, stop.steer) == (0, 0)
+
+    now = [0.0]
+
+    def tick(seconds=1 / 30):
+        now[0] += seconds
+
+    f = control_protocol.SequenceFilter(clock=lambda: now[0])
+    assert f.accept(10) and f.accept(12)
+    assert not f.accept(11) and not f.accept(12), "reordered/duplicate accepted"
+    f = control_protocol.SequenceFilter(clock=lambda: now[0])
+    assert f.accept(0xFFFFFFFF) and f.accept(0), "wrap-around dropped"
+
+    # 再読み込み（seq が 0 から数え直し）: 直前の seq が REORDER_WINDOW 以内でも、間が空けば受け付ける
+    f = control_protocol.SequenceFilter(clock=lambda: now[0])
+    for seq in range(1, 51):
+        assert f.accept(seq)
+        tick()
+    tick(1.0)
+    for seq in range(0, 51):
+        assert f.accept(seq), f"new sender after reload dropped at seq {seq}"
+        tick()
+    assert f.restarts == 1, f.restarts
+    # すぐ後の古い seq（入れ替わり）は破棄のまま
+    assert not f.accept(49)
+
+    # ブラウザ側の乱数の初期値（viewer.vr.html）: 間が空かなくても逆行が窓より大きければ再起動
+    f = control_protocol.SequenceFilter(clock=lambda: now[0])
+    assert f.accept(123456789) and f.accept(3000000000) and f.accept(4000)
+    print("check ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="on_message throughput benchmark")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--i2c-ms", type=float, default=0.3, help="1回の I2C 書き込み時間")
+    parser.add_argument("--check", action="store_true", help="制御プロトコルと seq フィルタの期待値を検証して終了")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return 0
+
+    messages = make_messages(args.count)
+    setup_logging(pi_picarx_mqtt.LOG_LEVEL)
+
+    # stdout は行バッファの /dev/null（journald へのパイプ出力を模擬）
+    real_stdout = sys.stdout
+    results = {}
+    with open(os.devnull, "w", buffering=1) as sink:
+        sys.stdout = sink
+        try:
+            legacy_px = FakePicarx(args.i2c_ms)
+            results["legacy"] = measure(make_legacy_on_message(legacy_px), messages)
+
+            px = FakePicarx(args.i2c_ms)
+            pi_picarx_mqtt.setup_control(px)
+            results["current"] = measure(pi_picarx_mqtt.on_message, messages)
+            results["binary"] = measure(pi_picarx_mqtt.on_message, make_binary_messages(args.count))
+            pi_picarx_mqtt.actuator.stop()
+            pi_picarx_mqtt.actuator.tick()  # 保留中の最新値を反映
+        finally:
+            sys.stdout = real_stdout
+
+    print(f"on_message throughput ({args.count} msgs, I2C {args.i2c_ms} ms/write)")
+    for name, rate in results.items():
+        print(f"  {name:8s} {rate:10.0f} msgs/s")
+    print(f"  I2C writes: legacy {legacy_px.writes}, current {px.writes}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
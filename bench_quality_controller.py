@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+解像度・fps 自動切り替えのシミュレーション（擬似時計、カメラ・LiveKit 不要）
+Pi を単純なコストモデル（合成: ms/Mpx、エンコード: ms/Mpx を別スレッド、cores 個のコア）で模擬し、
+途中で外部負荷（他プロセスとの競合）を掛けて QualityController のプロファイル推移を表示する
+--check で「持続可能な最上位の段に収束する」「切り替え回数が有限（往復し続けない）」
+「切り替えに失敗する段は間隔を空けて試し直す」を検証する
+"""
+
+import argparse
+import asyncio
+import sys
+
+import numpy as np
+
+from bench_frame_pacer import FakeClock
+from frame_pacer import FramePacer
+from quality_controller import DEFAULT_PROFILES, EncoderStats, QualityController
+
+
+class PiModel:
+    """1フレームあたりのコストと CPU 使用量を返すモデル"""
+    def __init__(self, compose_ms_per_mpx=6.0, encode_ms_per_mpx=20.0, cores=4, seed=0):
+        self.compose_ms_per_mpx = compose_ms_per_mpx
+        self.encode_ms_per_mpx = encode_ms_per_mpx
+        self.cores = cores
+        self.contention = 1.0   # 外部負荷による処理時間の倍率
+        self.rng = np.random.default_rng(seed)
+
+    def load(self, profile) -> float:
+        """このプロファイルを続けたときのプロセス CPU 使用率（全コア比）"""
+        mpx = profile.width * profile.height * 2 / 1e6
+        per_frame = (self.compose_ms_per_mpx + self.encode_ms_per_mpx) * mpx * self.contention
+        return per_frame * profile.fps / 1000 / self.cores
+
+    def frame(self, profile):
+        """(合成の処理時間 s, CPU 時間 s)。CPU が足りなければ合成も引き延ばされる"""
+        mpx = profile.width * profile.height * 2 / 1e6
+        stretch = max(1.0, self.load(profile))
+        compose = self.compose_ms_per_mpx * mpx * self.contention * stretch / 1000
+        compose *= self.rng.uniform(0.9, 1.15)
+        encode = self.encode_ms_per_mpx * mpx * self.contention / 1000
+        return compose, compose + encode
+
+    def encoder(self, profile) -> EncoderStats:
+        load = self.load(profile)
+        fps = profile.fps / max(1.0, load)
+        return EncoderStats(fps, profile.width * 2, profile.height, load > 0.95, self.encode_ms_per_mpx)
+
+
+async def simulate(model, seconds, start, spike=None, controller_args=None, broken=()):
+    """spike=(開始 s, 終了 s, 倍率)、broken は切り替え（カメラの再設定）に失敗するプロファイル名。
+    戻り値: (controller, [(時刻, プロファイル名, 理由)], 遅延率)"""
+    clock = FakeClock()
+    cpu = [0.0]
+    controller = QualityController(DEFAULT_PROFILES, start=start, clock=clock,
+                                   cpu_clock=lambda: cpu[0], cpu_count=model.cores,
+                                   **(controller_args or {}))
+    timeline = [(0.0, controller.profile.name, "start")]
+    pacer = FramePacer(controller.profile.fps, clock=clock, sleep=clock.sleep)
+    pacer.start()
+    next_encoder = 2.0
+    frames = overruns = 0
+    while clock() < seconds:
+        if spike is not None:
+            model.contention = spike[2] if spike[0] <= clock() < spike[1] else 1.0
+        profile = controller.profile
+        compose, cpu_time = model.frame(profile)
+        clock.work(compose)
+        cpu[0] += cpu_time
+
+        late, skipped = pacer.late, pacer.skipped
+        await pacer.wait()
+        late, skipped = pacer.late - late, pacer.skipped - skipped
+        frames += 1 + skipped
+        overruns += late + skipped
+        controller.observe_frame(compose, late, skipped)
+
+        if clock() >= next_encoder:
+            controller.observe_encoder(model.encoder(profile))
+            next_encoder += 2.0
+        new_profile = controller.update()
+        if new_profile is not None and new_profile.name in broken:
+            timeline.append((clock(), new_profile.name, "failed"))
+            clock.work(0.6)  # 再設定に失敗して元の設定で再開
+            controller.switch_failed(profile, "configure failed")
+            pacer = FramePacer(profile.fps, clock=clock, sleep=clock.sleep)
+            pacer.start()
+        elif new_profile is not None:
+            timeline.append((clock(), new_profile.name, controller.last_reason))
+            clock.work(0.3)  # カメラの停止・再設定・再開
+            pacer = FramePacer(new_profile.fps, clock=clock, sleep=clock.sleep)
+            pacer.start()
+            controller.reset_window()
+    return controller, timeline, overruns / max(1, frames)
+
+
+def sustainable(model, max_cpu=0.85):
+    """外部負荷なしで max_cpu を超えない最上位のプロファイル"""
+    best = DEFAULT_PROFILES[0]
+    for profile in DEFAULT_PROFILES:
+        if model.load(profile) <= max_cpu:
+            best = profile
+    return best
+
+
+def check():
+    # 1. 最下段から始めて、持続可能な最上位（mid）に上がり、それ以上は試さない
+    model = PiModel()
+    target = sustainable(model)
+    assert target.name == "mid", target
+    controller, timeline, overrun = asyncio.run(simulate(model, 300, DEFAULT_PROFILES[0]))
+    assert controller.profile == target, timeline
+    assert controller.switches == DEFAULT_PROFILES.index(target), timeline
+
+    # 2. 最上段から始めると下がって収束する（上げ直しは backoff で間隔が伸びる）
+    model = PiModel()
+    controller, timeline, overrun = asyncio.run(simulate(model, 600, DEFAULT_PROFILES[-1]))
+    assert controller.profile == target, timeline
+    assert controller.switches <= 3, timeline
+
+    # 3. 外部負荷の間は下げ、終われば戻る。往復回数は有限
+    model = PiModel()
+    controller, timeline, overrun = asyncio.run(
+        simulate(model, 600, target, spike=(120, 240, 1.6)))
+    names = [name for _, name, _ in timeline]
+    assert DEFAULT_PROFILES.index(controller.profile) == DEFAULT_PROFILES.index(target), timeline
+    assert min(DEFAULT_PROFILES.index(p) for p in DEFAULT_PROFILES if p.name in names) \
+        < DEFAULT_PROFILES.index(target), timeline
+    assert controller.switches <= 6, timeline
+    assert overrun < 0.05, overrun
+
+    # 4. 切り替えに失敗する段（mid）には上がらず、試し直しの間隔は backoff で伸びる
+    model = PiModel()
+    controller, timeline, overrun = asyncio.run(simulate(model, 600, DEFAULT_PROFILES[0], broken=("mid",)))
+    attempts = [t for t, name, reason in timeline if reason == "failed"]
+    assert controller.profile.name == "low-30", timeline
+    assert 1 <= len(attempts) <= 5, timeline
+    assert all(b - a >= 30 for a, b in zip(attempts, attempts[1:])), timeline
+    print("check ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive quality simulation (fake clock)")
+    parser.add_argument("--seconds", type=float, default=600)
+    parser.add_argument("--cores", type=int, default=4)
+    parser.add_argument("--compose-ms", type=float, default=6.0, help="合成の処理時間（ms/Mpx）")
+    parser.add_argument("--encode-ms", type=float, default=20.0, help="エンコードの処理時間（ms/Mpx）")
+    parser.add_argument("--spike", type=float, nargs=3, default=[120, 240, 1.6],
+                        metavar=("START", "END", "FACTOR"), help="外部負荷の区間と処理時間の倍率")
+    parser.add_argument("--start", default="low", help="開始プロファイル名")
+    parser.add_argument("--check", action="store_true", help="期待する収束を検証して終了")
+    args = parser.parse_args()
+
+    if args.check:
+        check()
+        return 0
+
+    model = PiModel(args.compose_ms, args.encode_ms, args.cores)
+    print(f"{args.cores} cores, compose {args.compose_ms} ms/Mpx, encode {args.encode_ms} ms/Mpx, "
+          f"spike ×{args.spike[2]} from {args.spike[0]:.0f}s to {args.spike[1]:.0f}s")
+    for profile in DEFAULT_PROFILES:
+        print(f"  {profile.name:7s} {profile.width}x{profile.height}@{profile.fps:2d}: "
+              f"cpu {model.load(profile):4.0%}")
+
+    start = next(p for p in DEFAULT_PROFILES if p.name == args.start)
+    controller, timeline, overrun = asyncio.run(
+        simulate(model, args.seconds, start, spike=tuple(args.spike)))
+    print("timeline:")
+    for t, name, reason in timeline:
+        print(f"  {t:6.1f}s  {name:7s} ({reason})")
+    print(f"final {controller.profile.name}, {controller.switches} switches, "
+          f"overrun {overrun:.2%} of frames")
+
+    # 固定プロファイルとの比較（外部負荷ありで、切り替えなしの場合の遅延率）
+    for profile in DEFAULT_PROFILES:
+        _, _, fixed = asyncio.run(simulate(PiModel(args.compose_ms, args.encode_ms, args.cores),
+                                           args.seconds, profile, spike=tuple(args.spike),
+                                           controller_args=dict(window_s=1e9)))
+        print(f"  fixed {profile.name:7s} overrun {fixed:6.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+切断からの復帰（session_supervisor.py）のベンチマーク（録画の再生と擬似ルームで、実機・サーバーなしで測る）
+stream_stereo_livekit.py の main() を子プロセスで動かし、replay_backend の PICARX_REPLAY_OUTAGES でルームを切断する。
+切断から映像・音声の再 publish までの時間、接続の失敗回数、切断中に送ったフレーム数（0 のはず）、
+接続中・切断中のプロセスの CPU 使用率（切断中は合成・送信を止めるので下がる）を表示する
+
+    blip    切断してすぐ接続できる（再接続の最小コスト）
+    down    サーバーが 3 秒止まる（バックオフで再試行）
+
+接続・publish にかかる時間は PICARX_REPLAY_DELAYS で模擬する。
+--check では SessionSupervisor を仮想時計と擬似の接続で動かし、attach() の前後に届く切断・再接続中の通知の
+扱い（attach() 前の切断では接続済みにせず作り直す）を検証する。
+
+例:
+    python3 record_session.py synth/ --synthetic --duration 12
+    python3 bench_reconnect.py synth/
+    python3 bench_reconnect.py --check
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+from session_supervisor import SessionSupervisor
+
+DEFAULT_DELAYS = "connect=0.3,publish=0.1"
+SCENARIOS = {"blip": "3:0", "down": "3:3"}
+
+
+def child(directory: str, duration: float):
+    """子プロセス側: 接続状態を 20ms ごとに見て、状態ごとの CPU 時間・送信フレーム数を JSON で出す"""
+    os.environ["PICARX_BACKEND"] = "replay"
+    os.environ["PICARX_REPLAY_DIR"] = directory
+    import metrics
+    import replay_backend
+    import stream_stereo_livekit as module
+    session = replay_backend.get_session()
+    module.METRICS_PORT = 0
+    module.LOG_LEVEL = "WARNING"
+
+    def connected():
+        for line in metrics.registry.render().splitlines():
+            if line.startswith("picarx_stream_connected "):
+                return line.endswith(" 1")
+        return None
+
+    async def run():
+        task = asyncio.create_task(module.main())
+        totals = {True: [0.0, 0.0, 0], False: [0.0, 0.0, 0]}   # 状態 -> [壁時計秒, CPU 秒, フレーム数]
+        outages = []
+        state = None
+        last = (time.monotonic(), time.process_time(), 0)
+        down_since = None
+        end = time.monotonic() + duration
+        while time.monotonic() < end and not task.done() and not session.finished.is_set():
+            await asyncio.sleep(0.02)
+            now = (time.monotonic(), time.process_time(), replay_backend.stats["video_frames"])
+            if state is not None:
+                for i in range(3):
+                    totals[state][i] += now[i] - last[i]
+            last = now
+            current = connected()
+            if current is None:
+                continue   # 起動中
+            if state is True and current is False:
+                down_since = now[0]
+            elif state is False and current is True and down_since is not None:
+                outages.append(now[0] - down_since)
+            state = current
+        session.stop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return totals, outages
+
+    totals, outages = asyncio.run(run())
+    reconnect = module.latency_stats.snapshot().get("reconnect", {})
+    print(json.dumps({
+        "outages_s": outages,
+        "reconnect_ms": reconnect.get("max"),
+        "connect_failed": module.counters.snapshot().get("room_connect_failed", 0),
+        "connected": totals[True],
+        "paused": totals[False],
+    }))
+
+
+class FakeSession:
+    """仮想時計と、connect_s 秒かかる擬似の接続（作ったルームを rooms に残す）"""
+    def __init__(self, connect_s=0.3):
+        self.now = 0.0
+        self.connect_s = connect_s
+        self.rooms = []
+        self.republished = []
+
+    def clock(self) -> float:
+        return self.now
+
+    async def connect(self, token):
+        await asyncio.sleep(0)
+        self.now += self.connect_s
+        self.rooms.append(f"room{len(self.rooms) + 1}")
+        return self.rooms[-1]
+
+    async def republish(self, room):
+        self.republished.append(room)
+
+    def supervisor(self) -> SessionSupervisor:
+        return SessionSupervisor(self.connect, lambda: "token", min_delay=0.0, clock=self.clock)
+
+
+async def settle(supervisor: SessionSupervisor):
+    """作り直しのタスクが終わるまで待つ"""
+    for _ in range(100):
+        if supervisor._task is None:
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("reconnect did not finish")
+
+
+async def check_supervisor():
+    # (1) 通常: attach() で接続済み、切断で作り直して republish する
+    fake = FakeSession()
+    supervisor = fake.supervisor()
+    supervisor.attach("room0", fake.republish)
+    assert supervisor.connected.is_set()
+    fake.now = 1.0
+    supervisor.lost("server restart")
+    assert not supervisor.connected.is_set()
+    await settle(supervisor)
+    assert supervisor.connected.is_set() and supervisor.room == "room1" and fake.republished == ["room1"]
+    assert supervisor.reconnects == 1 and abs(supervisor.last_outage_s - 0.3) < 1e-9, supervisor.last_outage_s
+
+    # (2) attach() 前の切断: 接続済みにせず、attach() で作り直しを始める（切断からの時間を数える）
+    fake = FakeSession()
+    supervisor = fake.supervisor()
+    fake.now = 1.0
+    supervisor.lost("dropped while publishing")
+    fake.now = 1.5
+    supervisor.attach("room0", fake.republish)
+    assert not supervisor.connected.is_set(), "connected on a dead room"
+    assert supervisor._task is not None, "reconnect not started"
+    await settle(supervisor)
+    assert supervisor.connected.is_set() and supervisor.room == "room1" and fake.republished == ["room1"]
+    assert supervisor.reconnects == 1 and abs(supervisor.last_outage_s - 0.8) < 1e-9, supervisor.last_outage_s
+
+    # (3) attach() 前に SDK が再接続中: 再接続の完了までは接続済みにしない
+    fake = FakeSession()
+    supervisor = fake.supervisor()
+    supervisor.reconnecting()
+    supervisor.attach("room0", fake.republish)
+    assert not supervisor.connected.is_set()
+    fake.now = 2.0
+    supervisor.reconnected()
+    assert supervisor.connected.is_set() and supervisor.reconnects == 0 and fake.rooms == []
+
+    # (4) attach() 前に再接続中 → 再接続済みなら、attach() で普通に接続済み
+    fake = FakeSession()
+    supervisor = fake.supervisor()
+    supervisor.reconnecting()
+    supervisor.reconnected()
+    supervisor.attach("room0", fake.republish)
+    assert supervisor.connected.is_set() and supervisor._task is None
+    await supervisor.stop()
+    print("check ok")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session reconnect benchmark (replay outages)")
+    parser.add_argument("directory", nargs="?", help="record_session.py の録画（10 秒以上）")
+    parser.add_argument("--duration", type=float, default=9.0)
+    parser.add_argument("--delays", default=DEFAULT_DELAYS, help="PICARX_REPLAY_DELAYS（秒）")
+    parser.add_argument("--check", action="store_true", help="attach() 前後の切断の扱いを仮想時計で検証して終了")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.check:
+        asyncio.run(check_supervisor())
+        return 0
+    if args.directory is None:
+        parser.error("directory is required")
+
+    if args.child:
+        child(args.directory, args.duration)
+        return 0
+
+    print(f"delays: {args.delays}")
+    print(f"{'scenario':8s} {'outage':>8s} {'failed':>6s} {'cpu connected':>14s} {'cpu paused':>11s} "
+          f"{'frames paused':>13s}")
+    for name, outage in SCENARIOS.items():
+        env = dict(os.environ, PICARX_REPLAY_DELAYS=args.delays, PICARX_REPLAY_OUTAGES=outage)
+        out = subprocess.run([sys.executable, __file__, args.directory, "--child", "--duration", str(args.duration)],
+                             env=env, capture_output=True, text=True, timeout=120, check=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        if not r["outages_s"]:
+            print(f"{name:8s} no reconnect observed (recording too short?)")
+            continue
+        wall, cpu, _ = r["connected"]
+        paused_wall, paused_cpu, paused_frames = r["paused"]
+        print(f"{name:8s} {r['outages_s'][0] * 1000:6.0f} ms {r['connect_failed']:6d} "
+              f"{cpu / wall * 100:12.0f} % {paused_cpu / max(paused_wall, 1e-9) * 100:9.0f} % {paused_frames:13d}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
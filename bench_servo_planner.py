@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+サーボ軌道計画（servo_planner.py）のベンチマーク（擬似 Picarx が書き込みを記録、実時間は待たない）
+ActuatorScheduler を仮想時計で 50Hz に tick し、擬似ビューアの pan/tilt 指令を届いた時刻に set_camera() する。
+直接書き込み（従来）と軌道計画ありで、カメラの I2C 書き込み数、1回の書き込みの最大の飛び、
+角加速度の RMS（ぎくしゃく度）、意図した角度との平均誤差を比べる
+
+    thumbstick  VR Viewer の右スティック（100ms ごとに currentPan += x*3 を整数で送信、到着に揺らぎ）
+    slider      viewer.combined のスライダー（数秒ごとに大きく飛ぶ）
+    head        ヘッドトラッキング相当（30Hz、±0.4 度の揺れ、100ms ごとにまとめて届く）
+    hold        同じく頭を止めている間（揺れだけ）
+
+--check で連続した操作（thumbstick / head / hold）の最大の飛び・角加速度の RMS が直接書き込み以下であること、
+頭を止めている間（hold）の書き込み数が直接書き込み以下であることを検証する
+（動いている間は tick ごとに書くので、書き込み数は直接書き込みより増える）
+"""
+
+import argparse
+
+import numpy as np
+
+from actuator import ActuatorScheduler
+from replay_backend import Picarx
+from servo_planner import ServoPlanner
+
+RATE_HZ = 50
+
+
+def thumbstick(duration, rng):
+    """(到着時刻, pan, tilt) の列と、意図した角度の関数"""
+    # (開始秒, スティック x, y)。x*3 度 / 100ms = x*30 度/秒
+    segments = [(0.0, 1.0, 0.0), (1.5, 0.0, 0.0), (2.5, -0.5, 0.6), (4.5, 0.0, 0.0), (5.5, 0.8, -0.4),
+                (7.0, 0.0, 0.0)]
+
+    def stick(t):
+        x = y = 0.0
+        for start, sx, sy in segments:
+            if t >= start:
+                x, y = sx, sy
+        return x, y
+
+    commands = []
+    pan = tilt = 0.0
+    for n in range(int(duration * 10)):
+        t = n * 0.1
+        x, y = stick(t)
+        if x or y:
+            pan = max(-90, min(90, pan + x * 3))
+            tilt = max(-35, min(65, tilt + y * 2))
+            commands.append((t + 0.03 + rng.uniform(-0.015, 0.015), round(pan), round(tilt)))
+
+    def intended(t):
+        p = q = 0.0
+        for n in range(int(t * 10) + 1):
+            x, y = stick(n * 0.1)
+            p = max(-90, min(90, p + x * 3))
+            q = max(-35, min(65, q + y * 2))
+        return p, q
+    return commands, intended
+
+
+def slider(duration, rng):
+    steps = [(0.5, 60, 20), (2.5, -30, -10), (4.5, 0, 40), (6.5, 0, 0)]
+    commands = [(t, pan, tilt) for t, pan, tilt in steps if t < duration]
+
+    def intended(t):
+        pan = tilt = 0
+        for start, p, q in steps:
+            if t >= start:
+                pan, tilt = p, q
+        return pan, tilt
+    return commands, intended
+
+
+def head(duration, rng):
+    def intended(t):
+        return 40 * np.sin(2 * np.pi * 0.3 * t), 15 * np.sin(2 * np.pi * 0.2 * t)
+    commands = []
+    for n in range(int(duration * 30)):
+        t = n / 30
+        pan, tilt = intended(t)
+        # 100ms ごとにまとめて届く（Wi-Fi の送信バッファ・ブローカー経由のまとまり）
+        arrive = (int(t * 10) + 1) / 10 + 0.02
+        commands.append((arrive, round(pan + rng.normal(0, 0.4)), round(tilt + rng.normal(0, 0.4))))
+    return commands, intended
+
+
+def hold(duration, rng):
+    commands = []
+    for n in range(int(duration * 30)):
+        t = n / 30
+        arrive = (int(t * 10) + 1) / 10 + 0.02
+        commands.append((arrive, round(20 + rng.normal(0, 0.5)), round(10 + rng.normal(0, 0.5))))
+    return commands, lambda t: (20, 10)
+
+
+SCENARIOS = {"thumbstick": thumbstick, "slider": slider, "head": head, "hold": hold}
+# 動きが直接書き込みより滑らかであるべき場面と、書き込み数が直接書き込み以下であるべき場面（--check）
+CONTINUOUS = ("thumbstick", "head", "hold")
+STILL = ("hold",)
+
+
+def simulate(commands, intended, duration, planner):
+    now = [0.0]
+    log = []
+    px = Picarx(i2c_ms=0, log=log, clock=lambda: now[0])
+    actuator = ActuatorScheduler(px, rate_hz=RATE_HZ, clock=lambda: now[0], planner=planner)
+    pending = sorted(commands)
+    applied, target = [], []
+    for n in range(int(duration * RATE_HZ)):
+        now[0] = n / RATE_HZ
+        while pending and pending[0][0] <= now[0]:
+            _, pan, tilt = pending.pop(0)
+            actuator.set_camera(pan, tilt)
+        actuator.tick()
+        applied.append((actuator.applied_pan or 0, actuator.applied_tilt or 0))
+        target.append(intended(now[0]))
+
+    applied = np.asarray(applied, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    writes = [entry for entry in log if entry[1] in ("set_cam_pan_angle", "set_cam_tilt_angle")]
+    jumps = np.abs(np.diff(applied, axis=0)).max(initial=0)
+    accel = np.diff(applied, n=2, axis=0) * RATE_HZ ** 2
+    return {
+        "writes_per_s": len(writes) / duration,
+        "max_jump": float(jumps),
+        "accel_rms": float(np.sqrt(np.mean(accel ** 2))),
+        "error": float(np.mean(np.abs(applied - target))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servo trajectory planner benchmark")
+    parser.add_argument("--duration", type=float, default=8.0)
+    parser.add_argument("--speed", type=float, default=120.0, help="カメラの最大角速度（度/秒）")
+    parser.add_argument("--accel", type=float, default=600.0, help="カメラの最大角加速度（度/秒²）")
+    parser.add_argument("--deadband", type=float, default=1.5)
+    parser.add_argument("--check", action="store_true", help="連続した操作で滑らかさ・書き込み数が直接書き込み以下か検証する")
+    args = parser.parse_args()
+
+    failures = []
+
+    print(f"{'scenario':10s} {'mode':9s} {'writes/s':>8s} {'max jump':>9s} {'accel rms':>10s} {'error':>7s}")
+    for name, make in SCENARIOS.items():
+        commands, intended = make(args.duration, np.random.default_rng(0))
+        modes = {
+            "direct": None,
+            "smooth": ServoPlanner(args.speed, args.accel, args.deadband, predict=False),
+            "predict": ServoPlanner(args.speed, args.accel, args.deadband, predict=True),
+        }
+        direct = None
+        for mode, planner in modes.items():
+            r = simulate(commands, intended, args.duration, planner)
+            print(f"{name:10s} {mode:9s} {r['writes_per_s']:8.1f} {r['max_jump']:7.0f} deg "
+                  f"{r['accel_rms']:6.0f} d/s2 {r['error']:5.1f} deg")
+            if direct is None:
+                direct = r
+                continue
+            checked = ("max_jump", "accel_rms") if name in CONTINUOUS else ()
+            checked += ("writes_per_s",) if name in STILL else ()
+            for key in checked:
+                if r[key] > direct[key]:
+                    failures.append(f"{name}/{mode}: {key} {r[key]:.1f} > direct {direct[key]:.1f}")
+    if args.check:
+        if failures:
+            print("check failed: " + "; ".join(failures))
+            return 1
+        print("check ok")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+プロセス分割パイプライン（shm_pipeline.py）のベンチマーク（擬似カメラ、Picamera2 / LiveKit 不要）
+従来の1プロセス（キャプチャスレッド + 合成 + 公開を同じプロセス）と StereoPipeline を同じ条件で動かし、
+持続 fps と区間ごとの遅延 p50/p95 を表示する。公開は VideoFrame 相当のバッファへのコピーで代用し、
+--load-ms でメインプロセスの他の Python 処理（イベントループ・音声など、GIL を持つ）を模擬する
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from latency import LatencyHistogram, sensor_clock_ns
+from shm_pipeline import StereoPipeline, SyntheticCamera
+from stereo_capture import StereoCapture
+from stereo_compose import StereoComposerI420
+
+
+def busy(ms):
+    """GIL を持ったまま ms だけ CPU を使う"""
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+
+class Recorder:
+    """公開したフレームを数え、区間ごとの遅延を記録する（最初の warmup 秒は除く）"""
+    def __init__(self, warmup):
+        self.start = time.monotonic() + warmup
+        self.frames = 0
+        self.stages = {}
+
+    @property
+    def active(self):
+        return time.monotonic() >= self.start
+
+    def record(self, **stages_ms):
+        if not self.active:
+            return
+        self.frames += 1
+        for name, ms in stages_ms.items():
+            self.stages.setdefault(name, LatencyHistogram(window=100000)).record(ms)
+
+    def result(self, end):
+        return self.frames / (end - self.start), self.stages
+
+
+def run_single(args, out):
+    """従来方式: キャプチャスレッド + 同じプロセスで合成・公開"""
+    cams = [SyntheticCamera(args.width, args.height, args.fps, phase_ms=i * 3.0, seed=i) for i in range(2)]
+    stereo = StereoCapture(*cams, tolerance_ms=1000 / args.fps / 2)
+    composer = StereoComposerI420(args.width, args.height)
+    recorder = Recorder(args.warmup)
+    stereo.start()
+    end = time.monotonic() + args.warmup + args.duration
+    while time.monotonic() < end:
+        pair = stereo.get_pair(timeout=1.0)
+        if pair is None:
+            continue
+        got = sensor_clock_ns()
+        sensor_ns = min(stereo.last_timestamps)
+        composer.compose(pair[0], pair[1])
+        composed = sensor_clock_ns()
+        out[:] = composer.view
+        busy(args.load_ms)
+        published = sensor_clock_ns()
+        recorder.record(capture=(got - sensor_ns) / 1e6, compose=(composed - got) / 1e6,
+                        publish=(published - composed) / 1e6, total=(published - sensor_ns) / 1e6)
+    stereo.stop()
+    return recorder.result(end)
+
+
+def run_pipeline(args, out):
+    """StereoPipeline: capture / compose を別プロセス、公開はこのプロセス"""
+    pipeline = StereoPipeline(args.width, args.height, args.fps, camera="synthetic",
+                              slots=args.slots, log_level="WARNING")
+    pipeline.start()
+    dst = np.frombuffer(out, dtype=np.uint8)
+    recorder = Recorder(args.warmup + 1.0)   # プロセス起動分を待つ
+    end = time.monotonic() + args.warmup + 1.0 + args.duration
+    while time.monotonic() < end:
+        index = pipeline.get(timeout=1.0)
+        if index is None:
+            continue
+        got = sensor_clock_ns()
+        meta = pipeline.meta(index)
+        np.copyto(dst, pipeline.frame(index))
+        pipeline.release(index)
+        busy(args.load_ms)
+        published = sensor_clock_ns()
+        recorder.record(capture=(meta["captured_ns"] - meta["sensor_ns"]) / 1e6,
+                        queue=(meta["compose_start_ns"] - meta["captured_ns"]) / 1e6,
+                        compose=(meta["composed_ns"] - meta["compose_start_ns"]) / 1e6,
+                        handoff=(got - meta["composed_ns"]) / 1e6,
+                        publish=(published - got) / 1e6,
+                        total=(published - meta["sensor_ns"]) / 1e6)
+    stats = pipeline.stats_line()
+    pipeline.stop()
+    fps, stages = recorder.result(end)
+    return fps, stages, stats
+
+
+def print_result(label, fps, stages, target):
+    print(f"  {label:14s} {fps:6.1f} fps sustained ({fps / target:.0%} of {target})")
+    for name, hist in stages.items():
+        p = hist.percentiles((50, 95))
+        print(f"    {name:9s} p50 {p[50]:7.2f} ms | p95 {p[95]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-process shared-memory pipeline benchmark")
+    parser.add_argument("--width", type=int, default=1280, help="片目の幅")
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--slots", type=int, default=3, help="リングのスロット数")
+    parser.add_argument("--load-ms", type=float, default=0.0,
+                        help="1フレームごとのメインプロセスの他の処理（GIL を持つ）")
+    parser.add_argument("--mode", choices=("both", "single", "pipeline"), default="both")
+    args = parser.parse_args()
+
+    out = bytearray(args.width * 2 * args.height * 3 // 2)
+    print(f"{args.width * 2}x{args.height} I420 @ {args.fps}fps, {args.duration:g} s, "
+          f"load {args.load_ms:g} ms/frame, {os.cpu_count()} cores")
+    if args.mode in ("both", "single"):
+        fps, stages = run_single(args, out)
+        print_result("single process", fps, stages, args.fps)
+    if args.mode in ("both", "pipeline"):
+        fps, stages, stats = run_pipeline(args, out)
+        print_result("pipeline", fps, stages, args.fps)
+        print(f"    {stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+起動時間（FAST_START）のベンチマーク（録画の再生と擬似ルームで、実機・サーバーなしで測る）
+stream_stereo_livekit.py の main() を子プロセスで起動し、最初のフレームを送った時点で打ち切って
+段ごとの起動の時系列（startup.py）を集める。FAST_START の有無で最初のフレームまでの時間を比べる。
+インタプリタの起動・import も含めるため毎回新しいプロセスで測る
+
+実機・サーバーの初期化時間は replay_backend の PICARX_REPLAY_DELAYS で模擬する（既定は Pi 5 + 2 カメラ・
+リモートの LiveKit での目安）。
+
+例:
+    python3 record_session.py synth/ --synthetic --duration 5
+    python3 bench_startup.py synth/ --runs 5
+    python3 bench_startup.py synth/ --delays camera_open=0,connect=0,publish=0 --json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+DEFAULT_DELAYS = "camera_open=0.4,camera_configure=0.15,connect=0.6,publish=0.15"
+
+
+def child(directory: str, fast_start: bool):
+    """子プロセス側: 最初のフレームまで起動して時系列を JSON で出す"""
+    import asyncio
+
+    os.environ["PICARX_BACKEND"] = "replay"
+    os.environ["PICARX_REPLAY_DIR"] = directory
+    import replay_backend
+    import stream_stereo_livekit as module
+    session = replay_backend.get_session()
+    module.FAST_START = fast_start
+    module.METRICS_PORT = 0
+    module.LOG_LEVEL = "WARNING"
+
+    async def run():
+        task = asyncio.create_task(module.main())
+        while "first_frame" not in module.startup_timeline.phases and not task.done():
+            await asyncio.sleep(0.005)
+        session.stop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(run())
+    print(json.dumps(module.startup_timeline.as_dict()))
+
+
+def measure(directory: str, fast_start: bool, delays: str) -> dict:
+    env = dict(os.environ, PICARX_REPLAY_DELAYS=delays)
+    out = subprocess.run([sys.executable, __file__, directory, "--child", "fast" if fast_start else "sequential"],
+                         env=env, capture_output=True, text=True, timeout=60, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time benchmark (FAST_START on/off)")
+    parser.add_argument("directory", help="record_session.py の録画")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--delays", default=DEFAULT_DELAYS, help="PICARX_REPLAY_DELAYS（秒）")
+    parser.add_argument("--json", action="store_true", help="最後の1回の時系列を JSON で出す")
+    parser.add_argument("--child", choices=("fast", "sequential"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.directory, args.child == "fast")
+        return 0
+
+    print(f"delays: {args.delays}")
+    timelines = {}
+    for mode, fast_start in (("sequential", False), ("fast", True)):
+        runs = [measure(args.directory, fast_start, args.delays) for _ in range(args.runs)]
+        timelines[mode] = runs[-1]
+        phases = {}
+        for timeline in runs:
+            for name, v in timeline.items():
+                phases.setdefault(name, []).append(((v["end_ms"] or v["start_ms"]) - v["start_ms"], v["start_ms"]))
+        print(f"{mode} (median of {args.runs})")
+        for name, values in phases.items():
+            duration, start = np.median(np.asarray(values), axis=0)
+            print(f"  {name:16s} start {start:7.0f} ms | {duration:6.0f} ms")
+        first = np.median([t["first_frame"]["start_ms"] for t in runs])
+        print(f"  => first frame {first:.0f} ms after process start")
+    if args.json:
+        print(json.dumps(timelines, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
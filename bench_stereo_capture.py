@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+デュアルカメラキャプチャのベンチマーク（擬似カメラ使用）
+旧方式（capture_array を左→右の順に呼ぶ）と StereoCapture の
+待ち時間・フレーム鮮度（取得時点での古い方の目の経過時間）・左右ずれを比較する
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from stereo_capture import StereoCapture
+
+
+class FakeRequest:
+    def __init__(self, frame, ts):
+        self._frame = frame
+        self._ts = ts
+
+    def make_array(self, name):
+        return self._frame.copy()
+
+    def get_metadata(self):
+        return {"SensorTimestamp": self._ts}
+
+    def release(self):
+        pass
+
+
+class FakeCamera:
+    """fps 周期でフレームを出す擬似カメラ
+
+    phase_ms で左右のセンサー位相をずらし、readout_ms でフレーム取り出し（コピー等）の時間を模擬する
+    """
+    def __init__(self, fps, phase_ms=0.0, readout_ms=0.0, shape=(720, 1280, 3)):
+        self.period_ns = int(1e9 / fps)
+        self.phase_ns = int(phase_ms * 1e6)
+        self.readout = readout_ms / 1000
+        self.frame = np.zeros(shape, dtype=np.uint8)
+
+    def _wait_next(self):
+        now = time.monotonic_ns()
+        n = (now - self.phase_ns) // self.period_ns + 1
+        ts = n * self.period_ns + self.phase_ns
+        time.sleep(max(0, ts - time.monotonic_ns()) / 1e9 + self.readout)
+        return ts
+
+    def capture_request(self):
+        ts = self._wait_next()
+        return FakeRequest(self.frame, ts)
+
+    def capture_array(self):
+        ts = self._wait_next()
+        self.last_ts = ts
+        return self.frame.copy()
+
+
+def bench_sequential(cam_left, cam_right, count):
+    waits, ages, skews = [], [], []
+    for _ in range(count):
+        start = time.perf_counter()
+        cam_left.capture_array()
+        cam_right.capture_array()
+        waits.append(time.perf_counter() - start)
+        ages.append(time.monotonic_ns() - min(cam_left.last_ts, cam_right.last_ts))
+        skews.append(abs(cam_right.last_ts - cam_left.last_ts))
+    return waits, ages, skews
+
+
+def bench_parallel(cam_left, cam_right, count, tolerance_ms):
+    stereo = StereoCapture(cam_left, cam_right, tolerance_ms=tolerance_ms)
+    stereo.start()
+    waits, ages, skews = [], [], []
+    try:
+        stereo.get_pair()  # ウォームアップ
+        for _ in range(count):
+            start = time.perf_counter()
+            pair = stereo.get_pair()
+            waits.append(time.perf_counter() - start)
+            if pair is not None:
+                ages.append(time.monotonic_ns() - min(stereo.last_timestamps))
+                skews.append(pair[2])
+    finally:
+        stereo.stop()
+    return waits, ages, skews
+
+
+def report(name, waits, ages, skews):
+    waits_ms = np.array(waits) * 1000
+    ages_ms = np.array(ages) / 1e6
+    skews_ms = np.array(skews) / 1e6
+    print(f"  {name:10s} wait {waits_ms.mean():6.2f} ms | "
+          f"age {ages_ms.mean():6.2f} ms | "
+          f"skew mean {skews_ms.mean():6.2f} ms, max {skews_ms.max():6.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stereo capture benchmark (fake cameras)")
+    parser.add_argument("--fps", type=float, default=24)
+    parser.add_argument("--phase-ms", type=float, default=7.0, help="右カメラのセンサー位相ずれ")
+    parser.add_argument("--readout-ms", type=float, default=15.0, help="1回の取り出し時間")
+    parser.add_argument("--count", type=int, default=48)
+    parser.add_argument("--tolerance-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(f"Fake cameras @ {args.fps}fps, right phase +{args.phase_ms}ms, "
+          f"readout {args.readout_ms}ms, {args.count} pairs")
+
+    def cameras():
+        return (FakeCamera(args.fps, 0.0, args.readout_ms),
+                FakeCamera(args.fps, args.phase_ms, args.readout_ms))
+
+    report("sequential", *bench_sequential(*cameras(), args.count))
+    report("parallel", *bench_parallel(*cameras(), args.count, args.tolerance_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+ステレオ合成のマイクロベンチマーク
+旧方式（flip → rotate → hstack → dstack → tobytes）と StereoComposer / StereoComposerI420 を比較する
+I420 経路が RGBA 経路と画素単位で等価であることも合成フレームで確認する
+Picamera2 / LiveKit 不要（x86 Linux でも実行可）
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from stereo_compose import StereoComposer, StereoComposerI420
+
+
+def legacy_compose(frame_left, frame_right, height, stereo_width):
+    """旧 main() ループと同じ処理（比較用）"""
+    frame_left = frame_left[:, :, ::-1]
+    frame_right = frame_right[:, :, ::-1]
+    frame_left = frame_left[::-1, ::-1]
+    frame_right = frame_right[::-1, ::-1]
+    stereo_frame = np.hstack([frame_left, frame_right])
+    stereo_rgba = np.dstack([stereo_frame, np.full((height, stereo_width), 255, dtype=np.uint8)])
+    # rtc.VideoFrame は受け取った bytes を bytearray にコピーする
+    return bytearray(stereo_rgba.tobytes())
+
+
+def rgb_to_i420(rgb):
+    """RGB (H, W, 3) → Picamera2 の YUV420 配列と同じ (H*3/2, W) レイアウト（BT.601 整数近似）"""
+    h, w = rgb.shape[:2]
+    r, g, b = (rgb[:, :, i].astype(np.int32) for i in range(3))
+    y = ((66 * r + 129 * g + 25 * b + 128) >> 8) + 16
+    # 2x2 ブロック平均でクロマをサブサンプリング
+    def sub(c):
+        return (c.reshape(h // 2, 2, w // 2, 2).sum(axis=(1, 3)) + 2) >> 2
+    rs, gs, bs = sub(r), sub(g), sub(b)
+    u = ((-38 * rs - 74 * gs + 112 * bs + 128) >> 8) + 128
+    v = ((112 * rs - 94 * gs - 18 * bs + 128) >> 8) + 128
+    planes = [p.astype(np.uint8).reshape(-1) for p in (y, u, v)]
+    return np.concatenate(planes).reshape(h * 3 // 2, w)
+
+
+def check_i420_equivalence(w, h, rng):
+    """I420 合成 == (RGBA 合成 → I420 変換) を確認"""
+    rgb_left = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    rgb_right = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+    # RGBA 経路: Picamera2 の RGB888 は BGR 順で届く
+    rgba = StereoComposer(w, h).compose(rgb_left[:, :, ::-1], rgb_right[:, :, ::-1])
+    rgba = np.frombuffer(rgba, dtype=np.uint8).reshape(h, w * 2, 4)
+    expected = rgb_to_i420(rgba[:, :, :3]).tobytes()
+
+    # I420 経路: カメラが YUV420 で出力した場合
+    actual = bytes(StereoComposerI420(w, h).compose(rgb_to_i420(rgb_left), rgb_to_i420(rgb_right)))
+    if actual != expected:
+        diff = np.count_nonzero(np.frombuffer(actual, np.uint8) != np.frombuffer(expected, np.uint8))
+        raise SystemExit(f"ERROR: I420 output differs from RGBA path ({diff} bytes)")
+
+
+def measure(fn, frames, iterations):
+    """1フレームあたりの時間(ms)と一時確保量(bytes)を計測"""
+    # ウォームアップ
+    for i in range(3):
+        fn(*frames[i % len(frames)])
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(*frames[i % len(frames)])
+    ms = (time.perf_counter() - start) * 1000 / iterations
+
+    # フレーム毎の一時確保量（tracemalloc のピーク）を平均する
+    tracemalloc.start()
+    total_peak = 0
+    for i in range(iterations):
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        fn(*frames[i % len(frames)])
+        _, peak = tracemalloc.get_traced_memory()
+        total_peak += peak - base
+    tracemalloc.stop()
+
+    return {
+        "ms_per_frame": ms,
+        "alloc_bytes_per_frame": total_peak / iterations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stereo compose microbenchmark")
+    parser.add_argument("--width", type=int, default=1280, help="片目の幅")
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    w, h = args.width, args.height
+    stereo_width = w * 2
+    rng = np.random.default_rng(0)
+    frames = [
+        (rng.integers(0, 256, (h, w, 3), dtype=np.uint8),
+         rng.integers(0, 256, (h, w, 3), dtype=np.uint8))
+        for _ in range(4)
+    ]
+
+    composer = StereoComposer(w, h)
+    composer_i420 = StereoComposerI420(w, h)
+    frames_i420 = [(rgb_to_i420(l), rgb_to_i420(r)) for l, r in frames]
+
+    # 出力が一致することを確認
+    expected = legacy_compose(*frames[0], h, stereo_width)
+    if bytes(composer.compose(*frames[0])) != bytes(expected):
+        raise SystemExit("ERROR: composer output differs from legacy path")
+    check_i420_equivalence(w, h, rng)
+
+    print(f"Stereo compose {stereo_width}x{h}, {args.iterations} iterations")
+    results = {
+        "legacy": measure(lambda l, r: legacy_compose(l, r, h, stereo_width), frames, args.iterations),
+        "composer": measure(composer.compose, frames, args.iterations),
+        "composer_i420": measure(composer_i420.compose, frames_i420, args.iterations),
+    }
+    sizes = {
+        "legacy": len(expected),
+        "composer": len(composer.view),
+        "composer_i420": len(composer_i420.view),
+    }
+    for name, r in results.items():
+        r["bytes_per_frame"] = sizes[name]
+        print(f"  {name:14s} {r['ms_per_frame']:7.2f} ms/frame | "
+              f"alloc {r['alloc_bytes_per_frame'] / 1e6:6.2f} MB/frame | "
+              f"frame {r['bytes_per_frame'] / 1e6:4.1f} MB")
+    for name in ("composer", "composer_i420"):
+        speedup = results["legacy"]["ms_per_frame"] / results[name]["ms_per_frame"]
+        print(f"  speedup ({name}): x{speedup:.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+ベンチマークスイート（x86 Linux / Pi 共通。カメラ・PiCar-X・LiveKit・ブローカー不要）
+
+    compose  解像度段（QUALITY_PROFILES）ごとのステレオ合成時間（I420 / RGBA / 注視点）と、段の fps での周期に対する割合
+    audio    MicrophoneCapture（AudioRing の push → get → release）と AudioPlayer（JitterBuffer の push / pull）の
+             10ms フレームあたりの処理時間
+    control  pi_picarx_mqtt.on_message のスループット（直接呼び出し、ネットワークスレッド相当の擬似ブローカー経由、
+             --broker でローカルの Mosquitto 経由）
+
+結果はコミット・マシン情報付きの JSON（値は平坦な "区分.項目.単位" キー）で保存し、--compare で以前の結果と比べる
+
+例:
+    python3 bench_suite.py                                # bench-results/<commit>.json に保存
+    python3 bench_suite.py --compare bench-results/abc1234.json --max-regression 15
+    python3 bench_suite.py --only control --broker localhost:1883
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+import pi_picarx_mqtt
+from audio_jitter import JitterBuffer
+from audio_ring import AudioRing
+from bench_on_message import make_binary_messages, make_messages
+from foveated_packing import FoveatedComposerI420
+from quality_controller import DEFAULT_PROFILES
+from replay_backend import Picarx
+from runtime_log import setup_logging
+from stereo_compose import StereoComposer, StereoComposerI420
+
+# stream_stereo_livekit.py と同じ音声設定
+SAMPLE_RATE = 48000
+FRAME = 480
+MIC_RING_SLOTS = 16
+MIC_MAX_BACKLOG = 5
+
+
+def percentiles(samples_s):
+    p50, p95 = np.percentile(np.asarray(samples_s) * 1000, (50, 95))
+    return float(p50), float(p95)
+
+
+def time_calls(fn, iterations, warmup=3):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ==== compose ====
+
+def bench_compose(args):
+    results = {}
+    rng = np.random.default_rng(0)
+    for width, height in sorted({(p.width, p.height) for p in DEFAULT_PROFILES}):
+        yuv = [rng.integers(0, 256, (height * 3 // 2, width), dtype=np.uint8) for _ in range(2)]
+        rgb = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(2)]
+        cases = {
+            "i420": (StereoComposerI420(width, height), yuv),
+            "rgba": (StereoComposer(width, height), rgb),
+            "foveated": (FoveatedComposerI420(width, height), yuv),
+        }
+        for name, (composer, frames) in cases.items():
+            p50, p95 = percentiles(time_calls(lambda: composer.compose(*frames), args.iterations))
+            key = f"compose.{width}x{height}.{name}"
+            results[f"{key}.p50_ms"] = p50
+            results[f"{key}.p95_ms"] = p95
+            print(f"  compose {f'{width}x{height}':9s} {name:8s} p50 {p50:6.2f} ms | p95 {p95:6.2f} ms")
+    # 段ごと: 既定の I420 合成が1フレーム周期のどれだけを使うか
+    for p in DEFAULT_PROFILES:
+        budget = results[f"compose.{p.width}x{p.height}.i420.p95_ms"] / (1000 / p.fps) * 100
+        results[f"compose.{p.name}.budget_pct"] = budget
+        print(f"  compose {p.name:8s} ({p.width}x{p.height}@{p.fps}) p95 = {budget:4.1f}% of the frame period")
+    return results
+
+
+# ==== audio ====
+
+def bench_audio(args, rounds=5):
+    count = args.iterations * 40
+    block = np.random.default_rng(0).integers(-3000, 3000, (FRAME, 1), dtype=np.int16)
+
+    async def mic_path():
+        # MicrophoneCapture: コールバックでスロットへコピー → 送信タスクが取り出して返す
+        ring = AudioRing.allocate(MIC_RING_SLOTS, FRAME, 1, max_backlog=MIC_MAX_BACKLOG)
+        ring.attach()
+        start = time.perf_counter()
+        for _ in range(count):
+            ring.push(block)
+            await ring.get()
+            ring.release()
+        return (time.perf_counter() - start) / count
+
+    def player_path():
+        # AudioPlayer: 受信フレーム（int16 のバイト列）をジッタバッファへ → 出力コールバックが取り出す
+        jitter = JitterBuffer(SAMPLE_RATE, 1)
+        data = block.tobytes()
+        out = np.zeros((FRAME, 1), dtype=np.int16)
+        start = time.perf_counter()
+        for _ in range(count):
+            jitter.push(np.frombuffer(data, dtype=np.int16))
+            jitter.pull(out)
+        return (time.perf_counter() - start) / count
+
+    # 1回が短いので数回測って中央値
+    mic_us = float(np.median([asyncio.run(mic_path()) for _ in range(rounds)])) * 1e6
+    player_us = float(np.median([player_path() for _ in range(rounds)])) * 1e6
+
+    print(f"  audio mic    {mic_us:6.1f} us/frame ({mic_us / 100:.2f}% of 10 ms)")
+    print(f"  audio player {player_us:6.1f} us/frame ({player_us / 100:.2f}% of 10 ms)")
+    return {"audio.mic.frame_us": mic_us, "audio.player.frame_us": player_us}
+
+
+# ==== control ====
+
+class LoopbackBroker:
+    """プロセス内の擬似ブローカー: publish をキューに積み、別スレッド（paho のネットワークスレッド相当）が
+    購読者の on_message を呼ぶ"""
+    def __init__(self, on_message):
+        self.on_message = on_message
+        self._queue = queue.SimpleQueue()
+        self.delivered = 0
+        self._thread = threading.Thread(target=self._run, name="loopback-broker", daemon=True)
+        self._thread.start()
+
+    def publish(self, msg):
+        self._queue.put(msg)
+
+    def _run(self):
+        while True:
+            msg = self._queue.get()
+            if msg is None:
+                return
+            self.on_message(None, None, msg)
+            self.delivered += 1
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def rate(messages, deliver):
+    start = time.perf_counter()
+    deliver(messages)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def via_loopback(messages):
+    broker = LoopbackBroker(pi_picarx_mqtt.on_message)
+    for msg in messages:
+        broker.publish(msg)
+    broker.close()
+
+
+def via_mosquitto(address, messages, timeout=30.0):
+    """ローカルの Mosquitto 経由（pi_picarx_mqtt.create_transport の購読者へ publish する）"""
+    import paho.mqtt.client as mqtt
+    host, _, port = address.partition(":")
+    received = threading.Event()
+    count = [0]
+    on_message = pi_picarx_mqtt.on_message
+
+    def counting(client, userdata, msg):
+        on_message(client, userdata, msg)
+        count[0] += 1
+        if count[0] == len(messages):
+            received.set()
+
+    subscriber = pi_picarx_mqtt.create_transport(host, int(port or 1883), on_message=counting)
+    subscriber.start()
+    publisher = mqtt.Client(client_id="bench-suite-publisher", protocol=mqtt.MQTTv311)
+    publisher.connect(host, int(port or 1883), keepalive=30)
+    publisher.loop_start()
+    try:
+        if not subscriber.connected.wait(5.0):
+            raise RuntimeError(f"could not subscribe on {address}")
+        time.sleep(0.2)
+        start = time.perf_counter()
+        for msg in messages:
+            publisher.publish(msg.topic, msg.payload, qos=0)
+        if not received.wait(timeout):
+            raise RuntimeError(f"received {count[0]} of {len(messages)} messages")
+        return len(messages) / (time.perf_counter() - start)
+    finally:
+        publisher.loop_stop()
+        publisher.disconnect()
+        subscriber.stop()
+
+
+def bench_control(args):
+    results = {}
+    count = args.iterations * 40
+    px = Picarx(args.i2c_ms)
+    pi_picarx_mqtt.setup_control(px)
+    on_message = pi_picarx_mqtt.on_message
+    try:
+        for kind, messages in (("json", make_messages(count)), ("binary", make_binary_messages(count))):
+            results[f"control.direct.{kind}.msgs_per_s"] = rate(
+                messages, lambda ms: [on_message(None, None, m) for m in ms])
+            results[f"control.loopback.{kind}.msgs_per_s"] = rate(messages, via_loopback)
+            if args.broker:
+                try:
+                    results[f"control.mosquitto.{kind}.msgs_per_s"] = via_mosquitto(args.broker, messages)
+                except Exception as e:
+                    print(f"  control mosquitto {kind}: skipped ({e})")
+    finally:
+        pi_picarx_mqtt.actuator.stop()
+    for key, value in results.items():
+        print(f"  control {key[len('control.'):-len('.msgs_per_s')]:17s} {value:10.0f} msgs/s")
+    return results
+
+
+# ==== 保存・比較 ====
+
+def environment():
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], capture_output=True, text=True, timeout=10,
+                                  cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {
+        "commit": git("rev-parse", "--short", "HEAD") or "unknown",
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+    }
+
+
+def lower_is_better(key: str) -> bool:
+    return not key.endswith("_per_s")
+
+
+def compare(old, new, max_regression):
+    """共通のキーの変化を表示し、max_regression % を超えて悪化したキーを返す"""
+    print(f"Compared with {old['environment']['commit']} ({old['environment']['machine']}, "
+          f"{old['environment']['created']})")
+    regressions = []
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][key], new["results"][key]
+        if not a:
+            continue
+        change = (b - a) / a * 100
+        worse = change if lower_is_better(key) else -change
+        mark = ""
+        if max_regression is not None and worse > max_regression:
+            mark = "  REGRESSION"
+            regressions.append(key)
+        print(f"  {key:42s} {a:12.2f} -> {b:12.2f} ({change:+6.1f}%){mark}")
+    return regressions
+
+
+SUITES = {"compose": bench_compose, "audio": bench_audio, "control": bench_control}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite (compose, audio, control)")
+    parser.add_argument("--only", choices=sorted(SUITES), action="append", help="実行する区分（複数可）")
+    parser.add_argument("--iterations", type=int, default=50, help="合成の反復回数（音声・制御はこの 40 倍）")
+    parser.add_argument("--i2c-ms", type=float, default=0.3, help="擬似 Picarx の1回の I2C 書き込み時間")
+    parser.add_argument("--broker", help="ローカルの Mosquitto（host:port）。指定時のみ")
+    parser.add_argument("--output", help="結果の JSON（既定: bench-results/<commit>.json）")
+    parser.add_argument("--compare", help="比べる以前の結果の JSON")
+    parser.add_argument("--max-regression", type=float, default=None,
+                        help="--compare でこの % を超えて悪化したら終了コード 1")
+    args = parser.parse_args()
+    setup_logging("WARNING")
+
+    env = environment()
+    print(f"bench suite @ {env['commit']}{' (dirty)' if env['dirty'] else ''} | {env['machine']}, "
+          f"{env['cpu_count']} cores, python {env['python']}, numpy {env['numpy']}")
+    results = {}
+    for name in args.only or SUITES:
+        results.update(SUITES[name](args))
+
+    report = {"environment": env, "results": results}
+    output = args.output or os.path.join("bench-results", f"{env['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print(f"saved {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        if compare(old, report, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+制御メッセージの共通ディスパッチ
+MQTT（pi_picarx_mqtt.py）と LiveKit データチャネル（stream_stereo_livekit.py）の両方から
+同じ形式のメッセージを受け取り、ActuatorScheduler に最新値として渡す
+"""
+
+import json
+import logging
+
+import control_protocol
+from latency import LatencyStats, wall_ms
+from runtime_log import Counters, SampledLog, get_logger
+
+log = get_logger("control")
+
+
+class ControlDispatcher:
+    """JSON / バイナリの制御メッセージをデコードしてアクチュエータへ渡すクラス
+
+    seq フィルタは経路をまたいで共有するので、同じメッセージが MQTT と
+    データチャネルの両方から届いても1回だけ反映される。
+    """
+    def __init__(self, actuator, counters: Counters = None, latency: LatencyStats = None, wall_clock=wall_ms):
+        self.actuator = actuator
+        self.wall_clock = wall_clock   # 送信時刻と比べる壁時計（ms）
+        self.counters = counters or Counters()
+        # 操作側の送信→受信（"control_rx"）。送信時刻は binary の sent_ms / JSON の "t"
+        self.latency = latency or LatencyStats()
+        self._rx_latency = self.latency.histogram("control_rx")
+        self.seq_filter = control_protocol.SequenceFilter()
+        self._sampled_log = SampledLog(log, interval=1.0)
+        self._stats_log = SampledLog(log, interval=10.0)
+
+    def drive(self, throttle: float, steer: float, sent_ms=None):
+        """
+        throttle: -1.0 (後退最大) 〜 +1.0 (前進最大)
+        steer: -1.0 (左最大) 〜 +1.0 (右最大)
+        最新値として登録するだけ（I2C書き込みは制御スレッドが行う）
+        """
+        self.actuator.set_drive(throttle, steer, sent_ms)
+
+    def camera_move(self, pan_deg: float, tilt_deg: float, sent_ms=None):
+        """
+        pan_deg: カメラ水平角度 (-90〜+90度、0が正面)
+        tilt_deg: カメラ垂直角度 (-35〜+65度、0が正面)
+        最新値として登録するだけ（I2C書き込みは制御スレッドが行う）
+        """
+        self.actuator.set_camera(pan_deg, tilt_deg, sent_ms)
+
+    def _record_rx(self, sent_ms):
+        """送信→受信遅延（ms、送信側と NTP 同期している前提）"""
+        if sent_ms is not None:
+            self._rx_latency.record(self.wall_clock() - sent_ms)
+
+    def handle_json(self, kind: str, raw: bytes, source="mqtt"):
+        """kind: "cmd"（{"throttle", "steer"}）または "camera"（{"pan", "tilt"}）"""
+        try:
+            payload = json.loads(raw)
+        except Exception:
+            self.counters.incr("rx_invalid")
+            self._sampled_log.log("invalid", logging.WARNING, "invalid json (%s/%s): %r",
+                                  source, kind, raw[:64])
+            return
+        self._sampled_log.log(kind, logging.DEBUG, "RX %s/%s %s", source, kind, payload)
+        sent_ms = payload.get("t")  # 送信時刻（ms、任意）
+        if sent_ms is not None:
+            sent_ms = float(sent_ms)
+        self._record_rx(sent_ms)
+
+        if kind == "cmd":
+            throttle = float(payload.get("throttle", 0))
+            steer    = float(payload.get("steer", 0))
+            # clamp
+            throttle = max(-1.0, min(1.0, throttle))
+            steer    = max(-1.0, min(1.0, steer))
+            self.drive(throttle, steer, sent_ms)
+
+        elif kind == "camera":
+            pan  = float(payload.get("pan", 0))   # -45..45 deg 想定
+            tilt = float(payload.get("tilt", 0))  # -30..30 deg 想定
+            self.camera_move(pan, tilt, sent_ms)
+
+    def handle_binary(self, raw: bytes, source="mqtt"):
+        """バイナリ制御メッセージ（struct でデコード、JSON パースなし）"""
+        try:
+            msg = control_protocol.decode(raw)
+        except ValueError as e:
+            self.counters.incr("rx_invalid")
+            self._sampled_log.log("invalid_bin", logging.WARNING, "invalid binary control (%s): %s",
+                                  source, e)
+            return
+        if not self.seq_filter.accept(msg.seq):
+            self.counters.incr("rx_bin_dropped")
+            return
+
+        self._record_rx(msg.sent_ms)
+        # 遅延の分布は LatencyStats の周期出力（control_rx）に任せ、受信スレッドでは集計しない
+        self._stats_log.log("bin_stats", logging.INFO,
+                            "binary control (%s): seq %d | dropped %d | restarts %d",
+                            source, msg.seq, self.seq_filter.dropped, self.seq_filter.restarts)
+
+        if msg.flags & (control_protocol.FLAG_DRIVE | control_protocol.FLAG_STOP):
+            self.drive(msg.throttle, msg.steer, msg.sent_ms)
+        if msg.flags & control_protocol.FLAG_CAMERA:
+            self.camera_move(msg.pan, msg.tilt, msg.sent_ms)
+
+    def handle_status(self, status: str, source="mqtt"):
+        """操作側の生存状態。offline なら即停止ランプ"""
+        log.info("controller status (%s): %s", source, status)
+        if status == "offline":
+            self.actuator.failsafe(f"controller offline ({source})")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+バイナリ制御プロトコル（JSON トピックと並行して使う固定長メッセージ）
+
+レイアウト（リトルエンディアン、22 bytes）:
+    offset  型        内容
+    0       uint8     version (=1)
+    1       uint8     flags（FLAG_DRIVE / FLAG_CAMERA / FLAG_STOP）
+    2       uint32    seq（送信ごとに +1、2^32 で折り返し。初期値はページ読み込みごとの乱数）
+    6       float64   送信時刻（ms, Unix epoch、ブラウザの Date.now()）
+    14      int16     throttle × 1000（-1000..1000）
+    16      int16     steer × 1000（-1000..1000）
+    18      int16     pan × 100（度）
+    20      int16     tilt × 100（度）
+"""
+
+import struct
+import time
+from collections import namedtuple
+
+VERSION = 1
+
+FLAG_DRIVE = 0x01   # throttle/steer が有効
+FLAG_CAMERA = 0x02  # pan/tilt が有効
+FLAG_STOP = 0x04    # 緊急停止（throttle/steer を 0 として扱う）
+
+_FORMAT = struct.Struct("<BBIdhhhh")
+MESSAGE_SIZE = _FORMAT.size
+
+# 逆行（重複を含む）がこの範囲内で、かつ RESTART_GAP 以内に届いたら順序入れ替わり/重複として破棄
+REORDER_WINDOW = 64
+# 最後に受け付けてからこの秒数より後に届いた逆行は、範囲内でも送信側の再起動として受け付ける
+# （入れ替わり・重複は数 ms 以内に届く。seq を 0 など固定値から数え直す送信側の再読み込み向け）
+RESTART_GAP = 0.5
+
+ControlMessage = namedtuple("ControlMessage", "flags seq sent_ms throttle steer pan tilt")
+
+
+def _clamp_i16(value: float) -> int:
+    return max(-32768, min(32767, int(round(value))))
+
+
+def encode(seq: int, flags: int, throttle=0.0, steer=0.0, pan=0.0, tilt=0.0, sent_ms=None) -> bytes:
+    """制御メッセージをバイト列にする（テスト・リプレイ用。ブラウザ側は viewer.vr.html で同じ形式を生成）"""
+    if sent_ms is None:
+        sent_ms = time.time() * 1000
+    return _FORMAT.pack(
+        VERSION, flags, seq & 0xFFFFFFFF, sent_ms,
+        _clamp_i16(throttle * 1000), _clamp_i16(steer * 1000),
+        _clamp_i16(pan * 100), _clamp_i16(tilt * 100),
+    )
+
+
+def decode(payload: bytes) -> ControlMessage:
+    """バイト列を ControlMessage にする。形式が違えば ValueError"""
+    if len(payload) != MESSAGE_SIZE:
+        raise ValueError(f"invalid size: {len(payload)} != {MESSAGE_SIZE}")
+    version, flags, seq, sent_ms, throttle, steer, pan, tilt = _FORMAT.unpack(payload)
+    if version != VERSION:
+        raise ValueError(f"unsupported version: {version}")
+    if flags & FLAG_STOP:
+        throttle = steer = 0
+    return ControlMessage(
+        flags, seq, sent_ms,
+        max(-1.0, min(1.0, throttle / 1000)), max(-1.0, min(1.0, steer / 1000)),
+        pan / 100, tilt / 100,
+    )
+
+
+class SequenceFilter:
+    """seq を見て順序の入れ替わった/重複したメッセージを破棄するクラス
+
+    behind =（最後に受け付けた seq − seq）mod 2³² として:
+    - behind が 0..window、かつ最後に受け付けてから restart_gap 秒以内 → 重複・入れ替わりとして破棄
+    - それ以外は受け付ける。0 < behind < 2³¹（逆行）なら送信側の再起動として restarts を数える
+      （前に進んだ seq は飛びがあっても受け付ける）
+
+    VR Viewer は再読み込みのたびに ctlSeq を乱数（crypto.getRandomValues）から始めるので、再読み込み後の
+    seq はほぼ必ず window の外に落ちてすぐ受け付けられる。window 内に落ちた場合や 0 から数え直す送信側は、
+    restart_gap 秒の間が空けば受け付ける。
+    """
+    def __init__(self, window=REORDER_WINDOW, restart_gap=RESTART_GAP, clock=time.monotonic):
+        self.window = window
+        self.restart_gap = restart_gap
+        self.clock = clock
+        self.last_seq = None
+        self._last_time = None
+        self.accepted = 0
+        self.dropped = 0
+        self.restarts = 0
+
+    def accept(self, seq: int) -> bool:
+        now = self.clock()
+        if self.last_seq is not None:
+            behind = (self.last_seq - seq) & 0xFFFFFFFF
+            if behind <= self.window and now - self._last_time <= self.restart_gap:
+                # behind == 0 は重複、1..window は古いメッセージ
+                self.dropped += 1
+                return False
+            if 0 < behind < 0x80000000:
+                # 逆行 → 送信側（ブラウザ）の再読み込み
+                self.restarts += 1
+        self.last_seq = seq
+        self._last_time = now
+        self.accepted += 1
+        return True
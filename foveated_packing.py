@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+注視点（ROI）付きステレオフレームのパッキング（I420）
+各目を「中心 ROI の等倍切り出し」と「目全体を 1/factor に縮小した周辺」に分けて縦に並べ、
+左右を Side-by-Side にした小さいフレームにする。ROI の位置と配置は下端のメタデータ帯に焼き込む
+（視聴側 viewer.vr.html のシェーダーが読み取って元の目の画像に戻す）
+
+1目あたりの配置（既定 fovea=0.5, factor=2 で 1280x720 の目 → 640x736）:
+
+    +-----------+
+    |    ROI    |  roi_h 行（等倍）
+    +-----------+
+    |  周辺全体  |  height/factor 行（縮小）
+    +-----------+
+    |  メタ帯    |  META_ROWS 行（左目側: 遅延スタンプ、右目側: レイアウト）
+    +-----------+
+"""
+
+import numpy as np
+
+from latency import FrameStamp
+from stereo_compose import split_i420
+
+META_ROWS = 16       # メタデータ帯の行数
+LAYOUT_BLOCK = 8     # レイアウトのブロックの大きさ（ピクセル）
+
+
+def layout_word(factor, eye_width, roi_x, roi_y, roi_w, roi_h) -> int:
+    """64bit のレイアウト: factor(4) | eye_width(12) | roi_x(12) | roi_y(12) | roi_w(12) | roi_h(12)"""
+    value = factor & 0xF
+    for field in (eye_width, roi_x, roi_y, roi_w, roi_h):
+        value = (value << 12) | (field & 0xFFF)
+    return value
+
+
+def parse_layout(value: int) -> dict:
+    fields = [(value >> shift) & 0xFFF for shift in (48, 36, 24, 12, 0)]
+    return dict(zip(("eye_width", "roi_x", "roi_y", "roi_w", "roi_h"), fields), factor=value >> 60)
+
+
+class FoveatedComposerI420:
+    """左右の YUV420 フレームを ROI + 縮小周辺の I420 バッファに詰めるクラス
+
+    StereoComposerI420 と同じく compose(frame_left, frame_right) で出力バッファへ直接書き込む。
+    ROI の中心は set_roi() で変えられる（出力の向き＝視聴側で見える向きの正規化座標）。
+    周辺の縮小は factor×factor 画素の平均（ストライド付きビューの加算、フレーム毎の確保なし）。
+    """
+    def __init__(self, width: int, height: int, out=None, rotate=True, fovea=0.5, factor=2):
+        if width % (2 * factor) or height % (2 * factor):
+            raise ValueError(f"eye size {width}x{height} must be divisible by {2 * factor}")
+        self.width = width    # 片目の幅（カメラ側）
+        self.height = height
+        self.rotate = rotate
+        self.factor = factor
+        self.roi_w = int(width * fovea) & ~1
+        self.roi_h = int(height * fovea) & ~1
+        self.peri_w = width // factor
+        self.peri_h = height // factor
+
+        self.eye_width = max(self.roi_w, self.peri_w)   # 出力の片目の幅
+        self.out_width, self.out_height = self.output_size(width, height, fovea, factor)
+        if self.eye_width < 64 * LAYOUT_BLOCK:
+            raise ValueError(f"packed eye width {self.eye_width} too small for layout metadata")
+
+        y_size = self.out_width * self.out_height
+        c_size = y_size // 4
+        size = y_size + c_size * 2
+        if out is None:
+            out = bytearray(size)
+        if len(out) != size:
+            raise ValueError(f"output buffer size mismatch: {len(out)} != {size}")
+        self._out = out
+        buf = np.frombuffer(out, dtype=np.uint8)
+        self.y = buf[:y_size].reshape(self.out_height, self.out_width)
+        self.u = buf[y_size:y_size + c_size].reshape(self.out_height // 2, self.out_width // 2)
+        self.v = buf[y_size + c_size:].reshape(self.out_height // 2, self.out_width // 2)
+        self.y[:] = 0
+        self.u[:] = 128
+        self.v[:] = 128
+
+        # 各プレーン（Y, U, V）・各目の書き込み先と周辺縮小用の作業バッファ
+        self._targets = []
+        for plane, s in ((self.y, 1), (self.u, 2), (self.v, 2)):
+            eyes = []
+            for eye in range(2):
+                x0 = eye * self.eye_width // s
+                roi = plane[:self.roi_h // s, x0:x0 + self.roi_w // s]
+                top = self.roi_h // s
+                peri = plane[top:top + self.peri_h // s, x0:x0 + self.peri_w // s]
+                eyes.append((roi, peri))
+            acc = np.empty((self.peri_h // s, self.peri_w // s), dtype=np.uint16)
+            self._targets.append((s, eyes, acc))
+
+        self._layout = FrameStamp(bits=64, block=LAYOUT_BLOCK, x=self.eye_width)
+        self.set_roi(0.5, 0.5)
+
+    @staticmethod
+    def output_size(width: int, height: int, fovea=0.5, factor=2):
+        """出力フレームの (幅, 高さ)。VideoFrame を先に確保するために使う"""
+        roi_w = int(width * fovea) & ~1
+        roi_h = int(height * fovea) & ~1
+        return max(roi_w, width // factor) * 2, roi_h + height // factor + META_ROWS
+
+    @property
+    def pixel_ratio(self) -> float:
+        """Side-by-Side 等倍フレームに対する出力画素数の比"""
+        return self.out_width * self.out_height / (self.width * 2 * self.height)
+
+    def set_roi(self, cx: float, cy: float):
+        """ROI の中心（0〜1）。目の内側に収まるように丸め、原点は偶数にそろえる"""
+        x = int(round(cx * self.width - self.roi_w / 2))
+        y = int(round(cy * self.height - self.roi_h / 2))
+        self.roi_x = max(0, min(self.width - self.roi_w, x)) & ~1
+        self.roi_y = max(0, min(self.height - self.roi_h, y)) & ~1
+
+    @property
+    def layout(self) -> int:
+        return layout_word(self.factor, self.width, self.roi_x, self.roi_y, self.roi_w, self.roi_h)
+
+    def compose(self, frame_left: np.ndarray, frame_right: np.ndarray) -> memoryview:
+        """左右フレーム（Picamera2 YUV420 配列）を詰めて書き込み、出力バッファのビューを返す"""
+        rx, ry = self.roi_x, self.roi_y
+        sources = (split_i420(frame_left, self.width, self.height),
+                   split_i420(frame_right, self.width, self.height))
+        for plane, (s, eyes, acc) in enumerate(self._targets):
+            for eye, (roi, peri) in enumerate(eyes):
+                src = sources[eye][plane]
+                if self.rotate:
+                    src = src[::-1, ::-1]
+                np.copyto(roi, src[ry // s:ry // s + roi.shape[0], rx // s:rx // s + roi.shape[1]])
+                self._downsample(src, peri, acc)
+        self._layout.write(self, self.layout)
+        return self.view
+
+    def _downsample(self, src: np.ndarray, dst: np.ndarray, acc: np.ndarray):
+        f = self.factor
+        np.copyto(acc, src[::f, ::f])
+        for dy in range(f):
+            for dx in range(f):
+                if dy or dx:
+                    np.add(acc, src[dy::f, dx::f], out=acc)
+        acc += f * f // 2
+        acc //= f * f
+        np.copyto(dst, acc, casting="unsafe")
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self._out)
+
+
+def unpack_eye(y: np.ndarray, eye: int) -> np.ndarray:
+    """詰めた輝度プレーン（out_height × out_width）から片目の等倍画像を戻す（viewer のシェーダーと同じ手順）"""
+    layout = parse_layout(FrameStamp(bits=64, block=LAYOUT_BLOCK, x=y.shape[1] // 2).read(y))
+    f = layout["factor"]
+    roi_w, roi_h = layout["roi_w"], layout["roi_h"]
+    eye_width = layout["eye_width"]
+    height = (y.shape[0] - META_ROWS - roi_h) * f
+    x0 = eye * y.shape[1] // 2
+    peri = y[roi_h:roi_h + height // f, x0:x0 + eye_width // f]
+    full = np.repeat(np.repeat(peri, f, axis=0), f, axis=1)
+    rx, ry = layout["roi_x"], layout["roi_y"]
+    full[ry:ry + roi_h, rx:rx + roi_w] = y[:roi_h, x0:x0 + roi_w]
+    return full
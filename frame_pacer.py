@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+締め切りベースのフレームペーサー（stream_livekit.py / stream_stereo_livekit.py 共用）
+開始時刻からの絶対締め切り（start + n * interval）に合わせて待つため、1フレームの処理が
+遅れても以降の周期はずれない。1周期以上遅れた場合は間に合わなかった枠を飛ばして格子に戻す
+"""
+
+import asyncio
+import math
+import time
+
+
+class FramePacer:
+    """固定 fps の締め切りに合わせて待つクラス
+
+    ループの最後で await wait() を呼ぶ。clock / sleep は差し替え可能（擬似時計での検証用）。
+
+    on_time: 締め切り前に処理が終わったフレーム数
+    late:    締め切りを過ぎた（待たずに次へ進んだ）フレーム数
+    skipped: 1周期以上遅れたため飛ばした枠の数
+    """
+    def __init__(self, fps: float, clock=time.monotonic, sleep=asyncio.sleep):
+        self.interval = 1.0 / fps
+        self.clock = clock
+        self.sleep = sleep
+
+        self._start = None
+        self._index = 0   # 直近の締め切りの枠番号
+
+        self.on_time = 0
+        self.late = 0
+        self.skipped = 0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def start(self):
+        """格子の基準時刻を現在に設定する（最初の wait() で自動的に呼ばれる）"""
+        self._start = self.clock()
+        self._index = 0
+
+    @property
+    def next_deadline(self) -> float:
+        return self._start + (self._index + 1) * self.interval
+
+    async def wait(self):
+        """次の締め切りまで待つ。過ぎていれば待たずに戻り、1周期以上の遅れは枠を飛ばす"""
+        if self._start is None:
+            self.start()
+        deadline = self.next_deadline
+        now = self.clock()
+        if now < deadline:
+            self._index += 1
+            self.on_time += 1
+            self.last_lateness = 0.0
+            await self.sleep(deadline - now)
+            return
+
+        lateness = now - deadline
+        behind = math.floor(lateness / self.interval)
+        self._index += 1 + behind
+        self.skipped += behind
+        self.late += 1
+        self.last_lateness = lateness
+        self.max_lateness = max(self.max_lateness, lateness)
+        # 他のタスクに制御を渡す
+        await self.sleep(0)
+
+    def summary(self) -> str:
+        return (f"on time {self.on_time} | late {self.late} | skipped {self.skipped} | "
+                f"max lateness {self.max_lateness * 1000:.1f} ms")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+非ブロッキングのフレームリーダー
+rpicam-vid などのバイトストリームから固定長フレームを専用スレッドで readinto し、
+最新フレームのみを asyncio 側に受け渡す（古いフレームは破棄）
+"""
+
+import asyncio
+import threading
+import time
+
+from runtime_log import get_logger
+
+log = get_logger("reader")
+
+
+class FrameReader:
+    """固定長フレームを別スレッドで読み込み、latest-frame-wins で受け渡すクラス
+
+    バッファは pool_size 個を使い回す（読み込み中 / 最新 / 利用中 の3つが最小）。
+    get() で返したバッファは次の get() 呼び出しまで有効。
+    任意のバイナリストリーム（readinto を持つもの）で動作する。
+    """
+    def __init__(self, stream, frame_size: int, pool_size=3, late_after=None):
+        if pool_size < 3:
+            raise ValueError("pool_size must be >= 3")
+        self.stream = stream
+        self.frame_size = frame_size
+        self.late_after = late_after  # この秒数より古いフレームを late として数える
+
+        # カウンタ
+        self.frames_read = 0
+        self.frames_dropped = 0  # 取り出される前に新しいフレームで上書きされた数
+        self.frames_late = 0
+        self.last_age = 0.0
+
+        self._lock = threading.Lock()
+        self._free = [bytearray(frame_size) for _ in range(pool_size)]
+        self._latest = None     # (buffer, 読み込み完了時刻)
+        self._in_use = None
+        self._eof = False
+        self._event = None
+        self._loop = None
+        self._thread = None
+        self._running = False
+
+    def start(self, loop=None):
+        self._loop = loop or asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="frame-reader", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _read_full(self, buf: bytearray) -> bool:
+        """buf が埋まるまで readinto する。ストリーム終端なら False"""
+        view = memoryview(buf)
+        filled = 0
+        while filled < self.frame_size:
+            n = self.stream.readinto(view[filled:])
+            if not n:
+                return False
+            filled += n
+        return True
+
+    def _run(self):
+        try:
+            while self._running:
+                with self._lock:
+                    buf = self._free.pop()
+                if not self._read_full(buf):
+                    with self._lock:
+                        self._free.append(buf)
+                    break
+
+                with self._lock:
+                    if self._latest is not None:
+                        # 未取得のフレームは破棄してバッファを戻す
+                        self._free.append(self._latest[0])
+                        self.frames_dropped += 1
+                    self._latest = (buf, time.monotonic())
+                    self.frames_read += 1
+                self._notify()
+        except Exception as e:
+            log.error("read error: %s", e)
+        finally:
+            self._eof = True
+            self._notify()
+
+    def _notify(self):
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            pass  # ループ終了後
+
+    async def get(self):
+        """最新フレームの memoryview を返す。ストリーム終端なら None"""
+        while True:
+            with self._lock:
+                latest = self._latest
+                self._latest = None
+                if latest is not None:
+                    # 前回返したバッファをプールへ戻す
+                    if self._in_use is not None:
+                        self._free.append(self._in_use)
+                    self._in_use = latest[0]
+            if latest is not None:
+                self.last_age = time.monotonic() - latest[1]
+                if self.late_after is not None and self.last_age > self.late_after:
+                    self.frames_late += 1
+                return memoryview(latest[0])
+            if self._eof:
+                return None
+            self._event.clear()
+            # clear 後に到着した分を取りこぼさないよう再確認してから待つ
+            with self._lock:
+                ready = self._latest is not None or self._eof
+            if not ready:
+                await self._event.wait()
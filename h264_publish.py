@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+合成済み Side-by-Side フレームの H.264 配信（stream_stereo_livekit.py の VIDEO_PUBLISH = "h264"）
+I420 フレームを ffmpeg の標準入力に渡して H.264 にエンコードし（v4l2m2m のハードウェア）、
+WHIP で LiveKit Ingress へ送る。Ingress 側で再エンコードしない（パススルー）ため、
+Python SDK の VideoSource（SDK 内のソフトウェアエンコード）を通らない
+
+Pi 5 にはハードウェアの H.264 エンコーダがないため、"auto" では使えない（raw に戻る）。
+libx264 は明示したときだけ使う（ソフトウェアエンコードなので CPU は減らず、ffmpeg のプロセスが増える）。
+Side-by-Side は合成後のフレームなので、Picamera2 / rpicam-vid のエンコード済み出力をそのまま流すこともできない
+"""
+
+import subprocess
+import threading
+
+from runtime_log import get_logger
+
+log = get_logger("h264")
+
+# "auto" で選ぶハードウェアエンコーダ（v4l2m2m は Pi 4 / CM4。Pi 5 にはない）
+H264_ENCODERS = ["h264_v4l2m2m"]
+# 明示したときだけ使うソフトウェアエンコーダ（Pi 5 でも動くが CPU は raw 経路と同程度以上）
+SOFTWARE_H264_ENCODERS = ["libx264"]
+
+ENCODER_OPTIONS = {
+    "h264_v4l2m2m": ["-num_capture_buffers", "8"],
+    "libx264": ["-preset", "ultrafast", "-tune", "zerolatency", "-profile:v", "baseline"],
+    # ベンチマーク用: LiveKit SDK の既定（VP8 リアルタイム）相当
+    "libvpx": ["-deadline", "realtime", "-cpu-used", "8", "-lag-in-frames", "0", "-error-resilient", "1"],
+}
+
+
+def ffmpeg_capabilities(ffmpeg="ffmpeg"):
+    """(エンコーダ名の集合, マルチプレクサ名の集合)。ffmpeg がなければ空"""
+    def names(kind, column):
+        try:
+            out = subprocess.run([ffmpeg, "-hide_banner", f"-{kind}"], capture_output=True,
+                                 text=True, timeout=10).stdout
+        except (OSError, subprocess.SubprocessError):
+            return set()
+        return {line.split()[column] for line in out.splitlines() if len(line.split()) > column}
+    return names("encoders", 1), names("muxers", 1)
+
+
+def select_encoder(preferred="auto", ffmpeg="ffmpeg", need_whip=True):
+    """使える H.264 エンコーダ名（なければ None）。"auto" はハードウェアエンコーダだけから選ぶ"""
+    encoders, muxers = ffmpeg_capabilities(ffmpeg)
+    if need_whip and "whip" not in muxers:
+        return None
+    candidates = H264_ENCODERS if preferred == "auto" else [preferred]
+    return next((name for name in candidates if name in encoders), None)
+
+
+def encoder_command(encoder, width, height, fps, bitrate, output, fmt="whip", ffmpeg="ffmpeg"):
+    """標準入力の I420 を encoder で fmt 形式にして output へ出す ffmpeg のコマンド"""
+    gop = int(fps)  # 1秒ごとに IDR（途中から参加した視聴側がすぐ表示できる）
+    return [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-fflags", "nobuffer", "-use_wallclock_as_timestamps", "1",
+        "-f", "rawvideo", "-pix_fmt", "yuv420p", "-s", f"{width}x{height}", "-framerate", str(fps),
+        "-i", "pipe:0",
+        "-c:v", encoder, *ENCODER_OPTIONS.get(encoder, []),
+        "-b:v", str(bitrate), "-maxrate", str(bitrate), "-bufsize", str(bitrate // 2),
+        "-g", str(gop), "-bf", "0",
+        "-f", fmt, output,
+    ]
+
+
+class H264WhipSource:
+    """rtc.VideoSource と同じ capture_frame(frame, timestamp_us) で ffmpeg にフレームを渡すクラス
+
+    latency.FramePublisher の source として使う。書き込みは専用スレッドで行い、
+    エンコーダが追いつかないときは未送信のフレームを最新で上書きする（イベントループは待たない）。
+    alive が False になったら（ffmpeg の終了・WHIP 接続失敗など）呼び出し側が raw 経路に戻す。
+    """
+    def __init__(self, width, height, fps, output, encoder="libx264", bitrate=6_000_000,
+                 fmt="whip", ffmpeg="ffmpeg"):
+        self.width = width
+        self.height = height
+        size = width * height * 3 // 2
+        self._slots = [bytearray(size), bytearray(size)]
+        self._pending = None   # 書き込み待ちのスロット番号
+        self._writing = None   # 書き込み中のスロット番号
+        self._cond = threading.Condition()
+        self._running = True
+        self.frames = 0
+        self.dropped = 0
+
+        cmd = encoder_command(encoder, width, height, fps, bitrate, output, fmt, ffmpeg)
+        log.info("starting %s", " ".join(cmd))
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL)
+        self._thread = threading.Thread(target=self._writer, daemon=True)
+        self._thread.start()
+
+    @property
+    def alive(self) -> bool:
+        return self._running and self._proc.poll() is None
+
+    def capture_frame(self, frame, timestamp_us=0):
+        with self._cond:
+            index = 0 if self._writing != 0 else 1
+            if self._pending is not None:
+                self.dropped += 1
+            self._slots[index][:] = frame.data
+            self._pending = index
+            self._cond.notify()
+
+    def _writer(self):
+        stdin = self._proc.stdin
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                self._writing, self._pending = self._pending, None
+            try:
+                stdin.write(self._slots[self._writing])
+                stdin.flush()
+            except (BrokenPipeError, OSError, ValueError) as e:
+                log.warning("encoder pipe closed: %s", e)
+                self._running = False
+                return
+            self.frames += 1
+            with self._cond:
+                self._writing = None
+
+    def close(self, timeout=5.0):
+        """未送信のフレームを書き終えてから ffmpeg を終了させる"""
+        with self._cond:
+            while self._running and self._pending is not None and self._proc.poll() is None:
+                self._cond.wait(0.05)
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout)
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._proc.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self._proc.kill()
+            self._proc.wait()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+遅延計測（映像: 撮影→公開、制御: 送信→受信→サーボ反映）
+- LatencyStats に区間ごとの遅延（ms）を積み、直近 window 件の p50/p95/p99 を周期的にログ出力する
+- 映像フレームには撮影時刻（壁時計 ms の下位32bit）を白黒ブロックで焼き込める（FrameStamp）
+  ビューア側で読み取って Date.now() と比較すると glass-to-glass 遅延になる（NTP 同期前提）
+"""
+
+import collections
+import logging
+import threading
+import time
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+# libcamera の SensorTimestamp は CLOCK_BOOTTIME 基準（ns）
+_SENSOR_CLOCK = getattr(time, "CLOCK_BOOTTIME", time.CLOCK_MONOTONIC)
+
+
+def sensor_clock_ns() -> int:
+    """SensorTimestamp と比較できる現在時刻（ns）"""
+    return time.clock_gettime_ns(_SENSOR_CLOCK)
+
+
+def wall_ms() -> float:
+    """壁時計（ms, Unix epoch）。ブラウザの Date.now() と比較する値"""
+    return time.time() * 1000
+
+
+class LatencyHistogram:
+    """直近 window 件の遅延（ms）を保持してパーセンタイルを返すクラス"""
+    def __init__(self, window=1000):
+        self._samples = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+            self.count += 1
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def percentiles(self, qs=PERCENTILES) -> dict:
+        """{q: ms} を返す（サンプルがなければ空）"""
+        with self._lock:
+            if not self._samples:
+                return {}
+            samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+        return dict(zip(qs, np.percentile(samples, qs)))
+
+    def summary(self) -> str:
+        values = self.percentiles()
+        if not values:
+            return "no samples"
+        parts = " ".join(f"p{q} {ms:.1f}" for q, ms in values.items())
+        return f"{parts} max {self.max_ms:.1f} ms (n={self.count})"
+
+
+class LatencyStats:
+    """区間名ごとの LatencyHistogram をまとめるクラス（Counters と同じく別スレッドで周期出力）"""
+    def __init__(self, window=1000):
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._thread = None
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        hist = self._histograms.get(name)
+        if hist is None:
+            with self._lock:
+                hist = self._histograms.setdefault(name, LatencyHistogram(self.window))
+        return hist
+
+    def record(self, name: str, ms: float):
+        self.histogram(name).record(ms)
+
+    def totals(self) -> dict:
+        """{name: (max ms, 件数)}（パーセンタイルを計算しない軽い版）"""
+        return {name: (hist.max_ms, hist.count) for name, hist in sorted(self._histograms.items())}
+
+    def snapshot(self) -> dict:
+        """{name: {"p50": ms, ..., "max": ms, "count": n}}"""
+        result = {}
+        for name, hist in sorted(self._histograms.items()):
+            values = {f"p{q}": ms for q, ms in hist.percentiles().items()}
+            values.update(max=hist.max_ms, count=hist.count)
+            result[name] = values
+        return result
+
+    def start_reporting(self, logger: logging.Logger, interval=10.0):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._report_loop, args=(logger, interval), name="latency", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _report_loop(self, logger, interval):
+        while self._running:
+            time.sleep(interval)
+            for name, hist in sorted(self._histograms.items()):
+                if hist.count:
+                    logger.info("latency %s: %s", name, hist.summary())
+
+
+class FrameStamp:
+    """フレーム下端に bits ビット（既定 32、最大 64）の値を白黒ブロックで焼き込む/読み取るクラス
+
+    x（既定は左端、偶数）から bits 個のブロック（block×block ピクセル、MSB が左）。白=1、黒=0。
+    I420 は Y を 0/255、U/V を 128（無彩色）にしてエンコード後も読みやすくする。
+    """
+    def __init__(self, bits=32, block=16, x=0):
+        self.bits = bits
+        self.block = block
+        self.x = x
+        self._levels = np.array([0, 255], dtype=np.uint8)
+
+    @classmethod
+    def for_width(cls, width: int, bits=32):
+        """出力幅に比例したブロック（幅/160、偶数）。解像度が変わっても受信側で同じ比率で読める"""
+        return cls(bits=bits, block=max(2, width // 160 & ~1))
+
+    def _bit_array(self, value: int) -> np.ndarray:
+        shifts = np.arange(self.bits - 1, -1, -1, dtype=np.uint64)
+        return ((np.uint64(value & ((1 << self.bits) - 1)) >> shifts) & np.uint64(1)).astype(np.uint8)
+
+    def write(self, composer, value: int):
+        """合成済みの出力バッファ（StereoComposer / StereoComposerI420 等）に焼き込む"""
+        row = np.repeat(self._levels[self._bit_array(value)], self.block)
+        b = self.block
+        x = self.x
+        if hasattr(composer, "y"):
+            composer.y[-b:, x:x + row.size] = row
+            composer.u[-b // 2:, x // 2:(x + row.size) // 2] = 128
+            composer.v[-b // 2:, x // 2:(x + row.size) // 2] = 128
+        else:
+            composer.buffer[-b:, x:x + row.size, :3] = row[:, None]
+
+    def read(self, luma: np.ndarray) -> int:
+        """輝度プレーン（H×W）から値を読み取る（ブロック中心をサンプリング）"""
+        b = self.block
+        y = luma.shape[0] - b // 2
+        xs = self.x + np.arange(self.bits) * b + b // 2
+        value = 0
+        for bit in luma[y, xs] >= 128:
+            value = (value << 1) | int(bit)
+        return value
+
+
+class FramePublisher:
+    """合成済みフレームを VideoSource に渡し、撮影→公開の遅延を記録するクラス
+
+    stream_stereo_livekit.py と latency_replay.py（擬似ルーム）で共用する。
+    captured_ns は左右のうち古い方の SensorTimestamp（clock_ns と同じ時計）。
+    """
+    def __init__(self, source, video_frame, composer, stats: LatencyStats,
+                 stamp: FrameStamp = None, clock_ns=sensor_clock_ns):
+        self.source = source
+        self.video_frame = video_frame
+        self.composer = composer
+        self.stats = stats
+        self.stamp = stamp
+        self.clock_ns = clock_ns
+
+    def publish(self, captured_ns: int):
+        age_ms = (self.clock_ns() - captured_ns) / 1e6
+        if self.stamp is not None:
+            # 撮影時刻を壁時計に換算して焼き込む
+            self.stamp.write(self.composer, int(wall_ms() - age_ms))
+        # SensorTimestamp を RTP タイムスタンプの元としても渡す
+        self.source.capture_frame(self.video_frame, timestamp_us=captured_ns // 1000)
+        self.stats.record("capture_to_publish", (self.clock_ns() - captured_ns) / 1e6)
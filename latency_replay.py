@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+遅延計測のローカルリプレイ（カメラ / LiveKit / PiCar-X / ブローカー不要）
+擬似カメラ → StereoCapture → 合成 → FramePublisher → 擬似ルーム（ビューアがスタンプを読む）と、
+擬似ビューア → ControlDispatcher → ActuatorScheduler → 擬似 PiCar-X を同時に動かし、
+実機と同じ区間の p50/p95/p99 を出す。--budget を超えたら終了コード 1（回帰検出用）
+
+例:
+    python3 latency_replay.py --duration 5 --budget capture_to_publish=40 --budget control_apply=80
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import control_protocol
+from actuator import ActuatorScheduler
+from bench_stereo_capture import FakeCamera
+from control_dispatch import ControlDispatcher
+from latency import FramePublisher, FrameStamp, LatencyStats, wall_ms
+from replay_backend import Picarx as FakePicarx
+from stereo_capture import StereoCapture
+from stereo_compose import StereoComposerI420
+
+
+class FakeNetwork:
+    """片道遅延（平均 + ガウス揺らぎ、負にはしない）"""
+    def __init__(self, mean_ms, jitter_ms, seed=0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay_ms(self) -> float:
+        with self._lock:
+            return max(0.0, self._random.gauss(self.mean_ms, self.jitter_ms))
+
+
+class FakeRoomSource:
+    """rtc.VideoSource の代わり。受信側ビューアとしてスタンプを読み、glass-to-glass を記録する
+
+    表示までの時間はネットワーク遅延 + decode_ms（デコード・描画）で模擬する。
+    """
+    def __init__(self, width, height, stats: LatencyStats, network: FakeNetwork, decode_ms=10.0):
+        self.width = width
+        self.height = height
+        self.stats = stats
+        self.network = network
+        self.decode_ms = decode_ms
+        self.stamp = FrameStamp.for_width(width)
+        self.frames = 0
+        self.stamp_errors = 0
+
+    def capture_frame(self, frame, timestamp_us=0):
+        self.frames += 1
+        luma = np.frombuffer(frame.data, dtype=np.uint8, count=self.width * self.height)
+        stamped = self.stamp.read(luma.reshape(self.height, self.width))
+        displayed_ms = wall_ms() + self.network.delay_ms() + self.decode_ms
+        latency = (int(displayed_ms) - stamped) % 2 ** 32
+        if latency > 10000:
+            self.stamp_errors += 1
+            return
+        self.stats.record("glass_to_glass", latency)
+
+
+def run_video(args, stats, network, stop_event):
+    """stream_stereo_livekit.py の映像ループと同じ手順（I420）"""
+    stereo_width = args.width * 2
+    shape = (args.height * 3 // 2, args.width)
+    cam_left = FakeCamera(args.fps, 0.0, args.readout_ms, shape=shape)
+    cam_right = FakeCamera(args.fps, args.phase_ms, args.readout_ms, shape=shape)
+    # 平坦でない画像にしてスタンプ読み取りを検証する
+    cam_left.frame[:] = np.arange(args.width, dtype=np.uint8)
+    cam_right.frame[:] = 255 - np.arange(args.width, dtype=np.uint8)
+
+    video_frame = SimpleNamespace(data=bytearray(stereo_width * args.height * 3 // 2))
+    composer = StereoComposerI420(args.width, args.height, out=video_frame.data)
+    source = FakeRoomSource(stereo_width, args.height, stats, network)
+    # FakeCamera のタイムスタンプは time.monotonic_ns 基準
+    publisher = FramePublisher(source, video_frame, composer, stats,
+                               stamp=FrameStamp.for_width(stereo_width), clock_ns=time.monotonic_ns)
+
+    capture = StereoCapture(cam_left, cam_right, tolerance_ms=1000 / args.fps / 2)
+    capture.start()
+    interval = 1.0 / args.fps
+    try:
+        while not stop_event.is_set():
+            start = time.monotonic()
+            pair = capture.get_pair()
+            if pair is None:
+                continue
+            compose_start = time.monotonic()
+            composer.compose(pair[0], pair[1])
+            stats.record("compose", (time.monotonic() - compose_start) * 1000)
+            publisher.publish(min(capture.last_timestamps))
+            elapsed = time.monotonic() - start
+            if elapsed < interval:
+                time.sleep(interval - elapsed)
+    finally:
+        capture.stop()
+    return source
+
+
+def run_control(args, dispatcher, network, stop_event):
+    """擬似ビューア: 走行（バイナリ）とカメラ（JSON）を交互に送る
+
+    送信時刻をネットワーク遅延分だけ過去にずらして渡す（片道遅延を sleep なしで模擬）
+    """
+    interval = 1.0 / args.control_hz
+    seq = 0
+    while not stop_event.is_set():
+        sent_ms = wall_ms() - network.delay_ms()
+        if seq % 2:
+            raw = ('{"pan": %d, "tilt": %d, "t": %.3f}'
+                   % ((seq % 90) - 45, (seq % 60) - 30, sent_ms)).encode()
+            dispatcher.handle_json("camera", raw, source="replay")
+        else:
+            raw = control_protocol.encode(seq, control_protocol.FLAG_DRIVE,
+                                          throttle=((seq % 200) - 100) / 100,
+                                          steer=((seq % 50) - 25) / 25, sent_ms=sent_ms)
+            dispatcher.handle_binary(raw, source="replay")
+        seq += 1
+        time.sleep(interval)
+
+
+def parse_budget(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"expected NAME=P95_MS: {text}")
+    return name, float(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency replay (fake room and fake car)")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=float, default=24)
+    parser.add_argument("--phase-ms", type=float, default=7.0, help="右カメラのセンサー位相ずれ")
+    parser.add_argument("--readout-ms", type=float, default=5.0, help="1回の取り出し時間")
+    parser.add_argument("--control-hz", type=float, default=20, help="操作側の送信レート")
+    parser.add_argument("--control-rate-hz", type=float, default=50, help="制御スレッドの反映周期")
+    parser.add_argument("--i2c-ms", type=float, default=0.3, help="1回の I2C 書き込み時間")
+    parser.add_argument("--net-ms", type=float, default=20.0, help="片道ネットワーク遅延（平均）")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="片道ネットワーク遅延の揺らぎ")
+    parser.add_argument("--budget", type=parse_budget, action="append", default=[],
+                        metavar="NAME=P95_MS", help="区間の p95 上限（超えたら終了コード 1）")
+    args = parser.parse_args()
+
+    stats = LatencyStats()
+    network = FakeNetwork(args.net_ms, args.jitter_ms)
+    px = FakePicarx(args.i2c_ms)
+    actuator = ActuatorScheduler(px, rate_hz=args.control_rate_hz, report_interval=3600,
+                                 latency=stats)
+    dispatcher = ControlDispatcher(actuator, latency=stats)
+    actuator.start()
+
+    stop_event = threading.Event()
+    control_thread = threading.Thread(target=run_control, name="replay-control",
+                                      args=(args, dispatcher, network, stop_event), daemon=True)
+    control_thread.start()
+    timer = threading.Timer(args.duration, stop_event.set)
+    timer.start()
+    try:
+        source = run_video(args, stats, network, stop_event)
+    finally:
+        stop_event.set()
+        timer.cancel()
+        control_thread.join()
+        actuator.stop()
+
+    print(f"Latency replay: {args.duration:.0f}s, {args.width * 2}x{args.height} @ {args.fps}fps, "
+          f"net {args.net_ms}±{args.jitter_ms} ms, control {args.control_hz} Hz → "
+          f"{args.control_rate_hz} Hz")
+    print(f"  frames published {source.frames} (stamp errors {source.stamp_errors}), "
+          f"I2C writes {px.writes}")
+    snapshot = stats.snapshot()
+    for name, values in snapshot.items():
+        print(f"  {name:20s} p50 {values.get('p50', 0):7.1f} | p95 {values.get('p95', 0):7.1f} | "
+              f"p99 {values.get('p99', 0):7.1f} | max {values['max']:7.1f} ms (n={values['count']})")
+
+    failed = False
+    for name, limit in args.budget:
+        p95 = snapshot.get(name, {}).get("p95")
+        if p95 is None:
+            print(f"  FAIL {name}: no samples")
+            failed = True
+        elif p95 > limit:
+            print(f"  FAIL {name}: p95 {p95:.1f} ms > {limit:.1f} ms")
+            failed = True
+        else:
+            print(f"  ok   {name}: p95 {p95:.1f} ms <= {limit:.1f} ms")
+    if source.stamp_errors:
+        print(f"  FAIL frame stamp: {source.stamp_errors} frames unreadable")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
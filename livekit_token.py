@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+LiveKit のアクセストークン（server/scripts/create-token-publish.js と同じ権限の HS256 JWT）
+再接続のたびに新しいトークンを作れるよう、LK_API_KEY / LK_API_SECRET があればプロセス内で発行する
+（livekit-api パッケージは使わず標準ライブラリのみ）。なければ設定の固定トークンを使う
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+
+from runtime_log import get_logger
+
+log = get_logger("token")
+
+DEFAULT_TTL = 6 * 3600
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def create_token(api_key: str, api_secret: str, identity: str, room: str, ttl=DEFAULT_TTL, now=None) -> str:
+    """roomJoin / canPublish / canSubscribe のトークン"""
+    now = int(time.time() if now is None else now)
+    header = {"alg": "HS256", "typ": "JWT"}
+    claims = {
+        "iss": api_key,
+        "sub": identity,
+        "nbf": now - 10,
+        "exp": now + ttl,
+        "video": {"roomJoin": True, "room": room, "canPublish": True, "canSubscribe": True},
+    }
+    signing_input = ".".join(_b64(json.dumps(part, separators=(",", ":")).encode()) for part in (header, claims))
+    signature = hmac.new(api_secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64(signature)}"
+
+
+def claims(token: str) -> dict:
+    """署名は確認せずにクレームを読む（有効期限・identity の確認用）"""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return {}
+
+
+def token_provider(static_token: str, ttl=DEFAULT_TTL):
+    """呼ぶたびに接続用のトークンを返す関数
+
+    LK_API_KEY / LK_API_SECRET があれば static_token と同じ identity・ルームで毎回発行し直す。
+    なければ static_token を返す（期限切れなら警告）。
+    """
+    api_key = os.environ.get("LK_API_KEY")
+    api_secret = os.environ.get("LK_API_SECRET")
+    base = claims(static_token)
+    identity = base.get("sub", "pi-camera")
+    room = base.get("video", {}).get("room", "vr-demo")
+
+    def provide() -> str:
+        if api_key and api_secret:
+            return create_token(api_key, api_secret, identity, room, ttl)
+        exp = claims(static_token).get("exp")
+        if exp and exp < time.time():
+            log.warning("LIVEKIT_TOKEN expired at %s; set LK_API_KEY / LK_API_SECRET to issue tokens",
+                        time.strftime("%Y-%m-%d %H:%M", time.localtime(exp)))
+        return static_token
+    return provide
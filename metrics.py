@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+実行時メトリクスのレジストリと Prometheus テキスト形式のエンドポイント
+（stream_stereo_livekit.py / pi_picarx_mqtt.py 共用。同じプロセスで両方動くときは1つのエンドポイントにまとまる）
+
+値は登録した関数をスクレイプ時に呼んで読むだけなので、ホットパスに追加の処理はない
+（フレーム数・遅延・カウンタは既存の Counters / LatencyStats / 各クラスの属性をそのまま読む）。
+
+    curl -s localhost:9108/metrics
+"""
+
+import http.server
+import threading
+
+from latency import LatencyStats
+from runtime_log import Counters, get_logger
+
+log = get_logger("metrics")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """名前 → (種類, 説明, 読み出し関数) の表
+
+    読み出し関数は数値（None なら出さない）か、{ラベルの dict を tuple 化したもの: 数値} を返す。
+    同じ名前で登録し直すと置き換わる（プロファイル切り替え・再接続で作り直したオブジェクトを読む）。
+    """
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, kind: str, help_text: str, fn):
+        with self._lock:
+            self._metrics[name] = (kind, help_text, fn)
+
+    def gauge(self, name: str, help_text: str, fn):
+        self.register(name, "gauge", help_text, fn)
+
+    def counter(self, name: str, help_text: str, fn):
+        self.register(name, "counter", help_text, fn)
+
+    def add_counters(self, name: str, counters: Counters, help_text="Event count"):
+        """Counters の各キーを {event="..."} ラベルの counter として出す"""
+        self.counter(name, help_text,
+                     lambda: {(("event", key),): value for key, value in counters.snapshot().items()})
+
+    def add_latency(self, name: str, stats: LatencyStats, help_text="Latency (ms)"):
+        """LatencyStats の区間ごとのパーセンタイル・最大値・件数"""
+        def quantiles():
+            result = {}
+            for stage in stats.totals():
+                for q, ms in stats.histogram(stage).percentiles().items():
+                    result[(("stage", stage), ("quantile", f"{q / 100:g}"))] = ms
+            return result
+        self.gauge(name, help_text, quantiles)
+        self.gauge(f"{name}_max", f"{help_text}, maximum",
+                   lambda: {(("stage", stage),): v[0] for stage, v in stats.totals().items()})
+        self.counter(f"{name}_samples_total", f"{help_text}, samples",
+                     lambda: {(("stage", stage),): v[1] for stage, v in stats.totals().items()})
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, (kind, help_text, fn) in metrics:
+            try:
+                value = fn()
+            except Exception as e:
+                log.debug("metric %s: %s", name, e)
+                continue
+            if value is None:
+                continue
+            samples = value.items() if isinstance(value, dict) else [((), value)]
+            body = [f"{name}{_format_labels(dict(labels))} {float(v):g}" for labels, v in samples if v is not None]
+            if not body:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(body)
+        return "\n".join(lines) + "\n"
+
+
+# プロセス内で共有するレジストリ
+registry = MetricsRegistry()
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsServer:
+    """/metrics を返す HTTP サーバー（デーモンスレッド、既定はローカルのみ）"""
+    def __init__(self, registry: MetricsRegistry, port: int, host="127.0.0.1"):
+        self.httpd = http.server.ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.registry = registry
+        self.port = self.httpd.server_address[1]
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        log.info("Metrics: http://%s:%d/metrics", self.httpd.server_address[0], self.port)
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_server = None
+
+
+def serve(port: int, host="127.0.0.1"):
+    """プロセスで1つだけエンドポイントを起動する（port 0 / None なら無効、起動済みならそれを返す）"""
+    global _server
+    if not port or _server is not None:
+        return _server
+    try:
+        _server = MetricsServer(registry, port, host).start()
+    except OSError as e:
+        log.warning("Metrics endpoint on port %d unavailable: %s", port, e)
+    return _server
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+MQTT 送受信層（pi_picarx_mqtt.py / stream_stereo_livekit.py 共用）
+- 永続セッション（clean_session=False・固定 client_id）: QoS 1 で購読したトピックは切断中もブローカーが保持する
+- 購読は QoS をトピックごとに指定（最新値だけが意味を持つ制御コマンドは QoS 0、状態通知は QoS 1）
+- 再接続は paho の指数バックオフ（reconnect_delay_set）に任せる
+- 周期送信（生存信号・テレメトリ）は1本のスケジューラスレッドで行い、接続中だけ送る（再接続ごとにスレッドを増やさない）
+- LWT: status_topic に "offline"（retain, QoS 1）。接続時に "online"、正常終了時に "offline" を送る
+"""
+
+import threading
+import time
+
+from backends import load_mqtt
+from runtime_log import Counters, get_logger
+
+log = get_logger("mqtt")
+
+
+class PeriodicJob:
+    """interval 秒ごとに build() を呼び、戻り値 (topic, payload, qos) を送る（None なら送らない）"""
+    def __init__(self, name: str, interval: float, build):
+        self.name = name
+        self.interval = interval
+        self.build = build
+        self.next_due = 0.0
+
+
+class MqttTransport:
+    """paho Client と周期送信スケジューラをまとめたクラス
+
+    subscriptions は [(topic, qos), ...]。on_message はネットワークスレッドから直接呼ばれる（間に何も挟まない）。
+    on_connect / on_disconnect は購読・状態送信の後に呼ぶ追加の処理（任意）。
+    start() はネットワークスレッドを起動し、run_forever() は呼び出し元のスレッドでループする。
+    """
+    def __init__(self, client_id: str, host: str, port: int, subscriptions, on_message,
+                 status_topic: str, on_connect=None, on_disconnect=None, keepalive=30,
+                 min_delay=1, max_delay=30, clean_session=False, counters: Counters = None):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+        self.subscriptions = list(subscriptions)
+        self.status_topic = status_topic
+        self.on_connect = on_connect
+        self.on_disconnect = on_disconnect
+        self.counters = counters or Counters()
+        self.connected = threading.Event()
+        self.connects = 0
+        self._jobs = []
+        self._stop = threading.Event()
+        self._scheduler = None
+
+        mqtt = load_mqtt()
+        self.client = mqtt.Client(client_id=client_id, protocol=mqtt.MQTTv311, clean_session=clean_session)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = on_message
+        self.client.will_set(status_topic, "offline", qos=1, retain=True)
+        self.client.reconnect_delay_set(min_delay=min_delay, max_delay=max_delay)
+
+    def add_periodic(self, name: str, interval: float, build):
+        self._jobs.append(PeriodicJob(name, interval, build))
+
+    # ---- 接続 ----
+    def _on_connect(self, client, userdata, flags, rc, props=None):
+        if rc != 0:
+            log.warning("MQTT connect refused: %s", rc)
+            return
+        self.connects += 1
+        # 永続セッションが残っていれば購読もブローカー側に残っている
+        session_present = bool(flags.get("session present")) if isinstance(flags, dict) else False
+        if not session_present:
+            client.subscribe(self.subscriptions)
+        log.info("MQTT connected to %s:%d (session %s, connect #%d): %s", self.host, self.port,
+                 "resumed" if session_present else "new", self.connects,
+                 ", ".join(f"{topic} q{qos}" for topic, qos in self.subscriptions))
+        client.publish(self.status_topic, "online", qos=1, retain=True)
+        self.connected.set()
+        if self.on_connect:
+            self.on_connect(client, userdata, flags, rc)
+
+    def _on_disconnect(self, client, userdata, rc, *args):
+        self.connected.clear()
+        if self._stop.is_set():
+            return
+        self.counters.incr("mqtt_disconnect")
+        log.warning("MQTT disconnected: %s (reconnecting with backoff)", rc)
+        if self.on_disconnect:
+            self.on_disconnect(client, userdata, rc)
+
+    def start(self):
+        """ネットワークスレッドとスケジューラを起動する（最初の接続もバックグラウンドで再試行）"""
+        self._start_scheduler()
+        self.client.connect_async(self.host, self.port, keepalive=self.keepalive)
+        self.client.loop_start()
+
+    def run_forever(self):
+        """呼び出し元のスレッドでネットワークループを回す（最初の接続失敗も再試行する）"""
+        self._start_scheduler()
+        self.client.connect_async(self.host, self.port, keepalive=self.keepalive)
+        self.client.loop_forever(retry_first_connection=True)
+
+    def stop(self):
+        """状態を offline にして切断する（正常切断では LWT は出ないため明示的に送る）"""
+        self._stop.set()
+        if self.connected.is_set():
+            try:
+                self.client.publish(self.status_topic, "offline", qos=1, retain=True)
+            except Exception as e:
+                log.warning("status publish failed: %s", e)
+        self.client.disconnect()
+        self.client.loop_stop()
+        if self._scheduler:
+            self._scheduler.join(1.0)
+
+    # ---- 送信 ----
+    def publish(self, topic: str, payload, qos=0, retain=False) -> bool:
+        """接続中のみ送る（切断中に溜めても再接続時には古いだけなので捨てる）"""
+        if not self.connected.is_set():
+            self.counters.incr("mqtt_tx_skipped")
+            return False
+        info = self.client.publish(topic, payload, qos=qos, retain=retain)
+        if info.rc != 0:
+            self.counters.incr("mqtt_tx_failed")
+            return False
+        return True
+
+    def _start_scheduler(self):
+        if self._scheduler is not None or not self._jobs:
+            return
+        self._scheduler = threading.Thread(target=self._run_scheduler, name="mqtt-scheduler", daemon=True)
+        self._scheduler.start()
+
+    def _run_scheduler(self):
+        now = time.monotonic()
+        for job in self._jobs:
+            job.next_due = now + job.interval
+        while not self._stop.is_set():
+            due = min(job.next_due for job in self._jobs)
+            if self._stop.wait(max(0.0, due - time.monotonic())):
+                return
+            now = time.monotonic()
+            for job in self._jobs:
+                if now < job.next_due:
+                    continue
+                # 固定レート。遅れた分は追いかけずに次の周期へ
+                job.next_due += job.interval
+                if job.next_due <= now:
+                    job.next_due = now + job.interval
+                if not self.connected.is_set():
+                    continue
+                try:
+                    message = job.build()
+                    if message is not None:
+                        topic, payload, qos = message
+                        self.publish(topic, payload, qos=qos)
+                except Exception as e:
+                    log.warning("periodic %s: %s", job.name, e)
@@ -1,113 +1,188 @@
 #!/usr/bin/env python3
-import json, time, threading
-import paho.mqtt.client as mqtt
-from picarx import Picarx
+import json
+import os
+import time
+
+import metrics
+from actuator import ActuatorScheduler
+from backends import load_car
+from control_dispatch import ControlDispatcher
+from latency import LatencyStats, wall_ms
+from mqtt_transport import MqttTransport
+from runtime_log import Counters, get_logger, setup_logging
+from servo_planner import ServoPlanner
 
 # ==== 設定 ====
-BROKER_HOST = "3.112.216.187"
-BROKER_PORT = 1883                # ブラウザは9001(WS)、Piは1883(TCP)が安定
+# 環境変数 PICARX_MQTT_HOST / PICARX_MQTT_PORT で上書き可（ローカルの Mosquitto での確認など）
+BROKER_HOST = os.environ.get("PICARX_MQTT_HOST", "3.112.216.187")
+BROKER_PORT = int(os.environ.get("PICARX_MQTT_PORT", "1883"))  # ブラウザは9001(WS)、Piは1883(TCP)が安定
 TOPIC_CMD   = "demo/picarx/cmd"        # { "throttle": -1..1, "steer": -1..1 }
 TOPIC_PT    = "demo/picarx/camera"     # { "pan": -45..45, "tilt": -30..30 }
+TOPIC_BIN   = "demo/picarx/ctl"        # バイナリ制御（control_protocol.py の固定長形式）
+TOPIC_CTRL_STATUS = "demo/picarx/controller/status"  # 操作側の online / offline（LWT）
+TOPIC_STATUS = "demo/picarx/status"   # この車体の online / offline（LWT、retain）
 TOPIC_PING  = "demo/picarx/ping"
-TOPIC_TELE  = "demo/picarx/telemetry"
-CLIENT_ID   = "picarx-driver-1"
+TOPIC_TELE  = "demo/picarx/telemetry"  # 反映値・コマンド経過時間・ループ時間・CPU 温度（JSON）
+CLIENT_ID   = "picarx-driver-1"        # 永続セッションのキーになるので車体ごとに固定
 
-# ステアリング角度の最大値（度）
-DIR_SERVO_MAX_ANGLE = 30
+# 購読する QoS: 制御コマンドは最新値だけが意味を持つので 0（再送・切断中の保持なし）、
+# 操作側の LWT は取りこぼすと停止できないので 1（永続セッションで切断中も保持される）
+SUBSCRIPTIONS = [(TOPIC_CMD, 0), (TOPIC_PT, 0), (TOPIC_BIN, 0), (TOPIC_CTRL_STATUS, 1)]
 
-# ==== PiCarX インスタンス ====
-px = Picarx()
+# 周期送信（秒）。テレメトリは1周期分をまとめて1メッセージにする
+TELEMETRY_INTERVAL = 1.0
+PING_INTERVAL = 5.0
 
-# ==== PiCarX 制御関数 ====
-def drive(throttle: float, steer: float):
-    """
-    throttle: -1.0 (後退最大) 〜 +1.0 (前進最大)
-    steer: -1.0 (左最大) 〜 +1.0 (右最大)
-    """
-    print(f"[DRIVE] throttle={throttle:.2f}, steer={steer:.2f}")
+# 再接続のバックオフ（秒、失敗ごとに倍）
+RECONNECT_MIN_DELAY = 1
+RECONNECT_MAX_DELAY = 30
 
-    try:
-        # ステアリング角度を設定 (-30〜+30度)
-        steer_angle = int(steer * DIR_SERVO_MAX_ANGLE)
-        steer_angle = max(-DIR_SERVO_MAX_ANGLE, min(DIR_SERVO_MAX_ANGLE, steer_angle))
-        print(f"  -> set_dir_servo_angle({steer_angle})")
-        px.set_dir_servo_angle(steer_angle)
-
-        # 速度を計算 (0〜100)
-        speed = int(abs(throttle) * 100)
-        speed = max(0, min(100, speed))
-
-        if throttle > 0.01:
-            print(f"  -> forward({speed})")
-            px.forward(speed)
-        elif throttle < -0.01:
-            print(f"  -> backward({speed})")
-            px.backward(speed)
-        else:
-            print(f"  -> stop()")
-            px.stop()
-    except Exception as e:
-        print(f"[ERROR] drive: {e}")
-
-def camera_move(pan_deg: float, tilt_deg: float):
-    """
-    pan_deg: カメラ水平角度 (-90〜+90度、0が正面)
-    tilt_deg: カメラ垂直角度 (-35〜+65度、0が正面)
-    """
-    print(f"[CAMERA] pan={pan_deg:.1f}°, tilt={tilt_deg:.1f}°")
+CPU_TEMP_PATH = "/sys/class/thermal/thermal_zone0/temp"
 
-    try:
-        # パン角度を設定 (-90〜+90度)
-        pan_deg = max(-90, min(90, pan_deg))
-        print(f"  -> set_cam_pan_angle({pan_deg})")
-        px.set_cam_pan_angle(pan_deg)
-
-        # チルト角度を設定 (-35〜+65度)
-        tilt_deg = max(-35, min(65, tilt_deg))
-        print(f"  -> set_cam_tilt_angle({tilt_deg})")
-        px.set_cam_tilt_angle(tilt_deg)
-    except Exception as e:
-        print(f"[ERROR] camera_move: {e}")
-
-def on_connect(client, userdata, flags, rc, props=None):
-    print("MQTT connected:", rc)
-    client.subscribe([(TOPIC_CMD, 0), (TOPIC_PT, 0)])
-    print("Subscribed:", TOPIC_CMD)
-    # LWT 監視用に生存信号（任意）
-    def _ping():
-        while True:
-            try:
-                client.publish(TOPIC_PING, "alive", qos=0, retain=False)
-            except Exception as e:
-                print("ping error:", e)
-            time.sleep(5)
-    threading.Thread(target=_ping, daemon=True).start()
+# メトリクスのエンドポイント（Prometheus テキスト形式、http://127.0.0.1:9109/metrics、metrics.py）。0 で無効
+METRICS_PORT = 9109
 
-def on_message(client, userdata, msg):
-    print("RX", msg.topic, msg.payload.decode(errors="ignore"))
-    try:
-        payload = json.loads(msg.payload.decode("utf-8"))
-    except Exception:
-        print("invalid json:", msg.topic, msg.payload)
-        return
-
-    if msg.topic == TOPIC_CMD:
-        throttle = float(payload.get("throttle", 0))
-        steer    = float(payload.get("steer", 0))
-        # clamp
-        throttle = max(-1.0, min(1.0, throttle))
-        steer    = max(-1.0, min(1.0, steer))
-        drive(throttle, steer)
+# 制御スレッドの反映周期（Hz）。受信レートに関係なくこの周期で最新値のみ反映
+CONTROL_RATE_HZ = 50
 
-    elif msg.topic == TOPIC_PT:
-        pan  = float(payload.get("pan", 0))   # -45..45 deg 想定
-        tilt = float(payload.get("tilt", 0))  # -30..30 deg 想定
-        camera_move(pan, tilt)
+# デッドマン監視: 走行コマンドがこの秒数途絶えたら停止（STOP_RAMP 秒かけて減速）
+COMMAND_TIMEOUT = 0.3
+STOP_RAMP = 0.2
+
+# サーボの軌道計画（servo_planner.py）: カメラ・ステアリングを速度・加速度の上限内で滑らかに動かす
+# 動いている間は tick ごとに書き込む（I2C 書き込みは増えるが、1 tick 2 軸で 1ms 未満）。False で受信した角度へ直接書き込む
+SERVO_SMOOTHING = True
+CAMERA_MAX_SPEED = 120.0   # 度/秒
+CAMERA_MAX_ACCEL = 600.0   # 度/秒²
 
-client = mqtt.Client(client_id=CLIENT_ID, protocol=mqtt.MQTTv311, clean_session=True)
-client.on_connect = on_connect
-client.on_message = on_message
-client.will_set("picarx/status", "offline", qos=0, retain=True)
+# ログレベル（DEBUG で受信ペイロードを間引いて表示）
+LOG_LEVEL = "INFO"
 
-client.connect(BROKER_HOST, BROKER_PORT, keepalive=30)
-client.loop_forever()
+log = get_logger("picarx")
+# ホットパスはカウンタのみ（10秒ごとにまとめて出力）
+counters = Counters()
+# 操作側の送信→受信→サーボ反映の遅延（p50/p95/p99 を10秒ごとに出力）
+latency_stats = LatencyStats()
+
+# ==== PiCarX インスタンス（setup_control() で生成） ====
+actuator = None
+dispatcher = None
+
+def setup_control(px=None, clock=time.monotonic, wall_clock=wall_ms, start=True) -> ControlDispatcher:
+    """PiCar-X・アクチュエータ・ディスパッチャを生成して制御スレッドを開始する
+
+    stream_stereo_livekit.py からも呼ばれる（データチャネル制御時は同一プロセスで I2C を持つ）
+    start=False なら制御スレッドを起動しない（replay_recording.py が仮想時計で tick() を呼ぶ）
+    """
+    global actuator, dispatcher
+    if px is None:
+        px = load_car()()
+    planner = ServoPlanner(CAMERA_MAX_SPEED, CAMERA_MAX_ACCEL) if SERVO_SMOOTHING else None
+    actuator = ActuatorScheduler(px, rate_hz=CONTROL_RATE_HZ, clock=clock,
+                                 command_timeout=COMMAND_TIMEOUT, stop_ramp=STOP_RAMP,
+                                 latency=latency_stats, planner=planner, wall_clock=wall_clock)
+    dispatcher = ControlDispatcher(actuator, counters, latency_stats, wall_clock=wall_clock)
+    register_metrics(actuator)
+    if start:
+        actuator.start()
+    return dispatcher
+
+def register_metrics(actuator: ActuatorScheduler):
+    """制御側のメトリクス（スクレイプ時に属性を読むだけ）"""
+    reg = metrics.registry
+    reg.add_counters("picarx_driver_events_total", counters, "Driver events (rx = control messages received)")
+    reg.add_latency("picarx_driver_latency_ms", latency_stats, "Control latency (ms)")
+    reg.gauge("picarx_driver_command_age_ms", "Receive to apply time of the last command (ms)",
+              lambda: actuator.last_command_age * 1000)
+    reg.counter("picarx_driver_commands_total", "Commands by outcome",
+                lambda: {(("outcome", "received"),): actuator.commands_received,
+                         (("outcome", "applied"),): actuator.commands_applied,
+                         (("outcome", "superseded"),): actuator.commands_superseded})
+    reg.counter("picarx_driver_i2c_writes_total", "Servo/motor writes",
+                lambda: {(("result", "written"),): actuator.writes,
+                         (("result", "skipped"),): actuator.writes_skipped})
+    reg.counter("picarx_driver_watchdog_trips_total", "Dead-man stops", lambda: actuator.watchdog_trips)
+    reg.gauge("picarx_driver_control_tick_ms", "Control loop tick time (ms)", lambda: actuator.last_tick_ms)
+    reg.counter("picarx_driver_control_overruns_total", "Control ticks that missed their period",
+                lambda: actuator.overruns)
+    reg.gauge("picarx_driver_applied", "Applied speed (-100..100) and servo angles (deg)",
+              lambda: {(("axis", "speed"),): actuator.applied_speed, (("axis", "steer"),): actuator.applied_steer,
+                       (("axis", "pan"),): actuator.applied_pan, (("axis", "tilt"),): actuator.applied_tilt})
+    reg.gauge("picarx_driver_cpu_temp_celsius", "CPU temperature", cpu_temperature)
+
+def on_disconnect(client, userdata, rc, *args):
+    actuator.failsafe("broker disconnected")
+
+def on_message(client, userdata, msg):
+    counters.incr("rx")
+    if msg.topic == TOPIC_BIN:
+        dispatcher.handle_binary(msg.payload)
+    elif msg.topic == TOPIC_CMD:
+        dispatcher.handle_json("cmd", msg.payload)
+    elif msg.topic == TOPIC_PT:
+        dispatcher.handle_json("camera", msg.payload)
+    elif msg.topic == TOPIC_CTRL_STATUS:
+        # 操作側（ブラウザ）の LWT
+        dispatcher.handle_status(msg.payload.decode(errors="ignore"))
+
+def cpu_temperature():
+    """CPU 温度（℃）。取れない環境では None"""
+    try:
+        with open(CPU_TEMP_PATH) as f:
+            return int(f.read()) / 1000
+    except (OSError, ValueError):
+        return None
+
+def telemetry():
+    """テレメトリ1件（TELEMETRY_INTERVAL ごとに1メッセージ、値はその時点の反映値と区間の最大値）"""
+    if actuator is None:
+        return None
+    latency = latency_stats.snapshot()
+    payload = {
+        "t": round(wall_ms(), 1),
+        "speed": actuator.applied_speed,
+        "steer": actuator.applied_steer,
+        "pan": actuator.applied_pan,
+        "tilt": actuator.applied_tilt,
+        "cmd_age_ms": round(actuator.last_command_age * 1000, 1),
+        "watchdog_trips": actuator.watchdog_trips,
+        "rx": counters.get("rx"),
+        "cpu_temp": cpu_temperature(),
+    }
+    payload.update({k: round(v, 2) if isinstance(v, float) else v for k, v in actuator.loop_stats().items()})
+    for name in ("control_rx", "control_apply"):
+        if name in latency:
+            payload[f"{name}_p95_ms"] = round(latency[name].get("p95", 0), 1)
+    return TOPIC_TELE, json.dumps(payload, separators=(",", ":")), 0
+
+def create_transport(host=BROKER_HOST, port=BROKER_PORT, on_message=on_message) -> MqttTransport:
+    """制御用の MQTT 送受信層（PICARX_BACKEND=replay では録画を再生する Client、backends.py）"""
+    transport = MqttTransport(CLIENT_ID, host, port, SUBSCRIPTIONS, on_message, TOPIC_STATUS,
+                              on_disconnect=on_disconnect, min_delay=RECONNECT_MIN_DELAY,
+                              max_delay=RECONNECT_MAX_DELAY, counters=counters)
+    transport.add_periodic("telemetry", TELEMETRY_INTERVAL, telemetry)
+    transport.add_periodic("ping", PING_INTERVAL, lambda: (TOPIC_PING, "alive", 0))
+    metrics.registry.gauge("picarx_driver_mqtt_connected", "Connected to the broker",
+                           lambda: int(transport.connected.is_set()))
+    metrics.registry.counter("picarx_driver_mqtt_connects_total", "Successful broker connections",
+                             lambda: transport.connects)
+    return transport
+
+def main():
+    setup_logging(LOG_LEVEL)
+    setup_control()
+    transport = create_transport()
+
+    counters.start_reporting(log)
+    latency_stats.start_reporting(log)
+    metrics.serve(METRICS_PORT)
+    try:
+        transport.run_forever()
+    finally:
+        transport.stop()
+        actuator.stop()
+        counters.stop()
+        latency_stats.stop()
+
+if __name__ == "__main__":
+    main()
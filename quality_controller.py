@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+負荷に応じた解像度・fps の自動切り替え（stream_stereo_livekit.py 用）
+フレーム処理時間・ペーサーの遅延/スキップ率・プロセスの CPU 使用率・エンコーダ統計
+（quality_limitation_reason / 実効 fps）を window 秒ごとに評価し、プロファイルを1段ずつ上下する
+"""
+
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+
+from runtime_log import get_logger
+
+log = get_logger("quality")
+
+Profile = namedtuple("Profile", "name width height fps")
+
+# コスト（画素数 × fps）の昇順に並べる
+DEFAULT_PROFILES = [
+    Profile("low-15", 1280, 720, 15),
+    Profile("low", 1280, 720, 24),
+    Profile("low-30", 1280, 720, 30),
+    Profile("mid", 1920, 1080, 24),
+    Profile("high", 2304, 1296, 24),
+]
+
+EncoderStats = namedtuple("EncoderStats", "fps width height cpu_limited encode_ms")
+
+# livekit proto の QualityLimitationReason（LIMITATION_NONE=0, CPU=1, BANDWIDTH=2, OTHER=3）
+_LIMITATION_CPU = 1
+
+
+def profile_cost(profile: Profile) -> float:
+    return profile.width * profile.height * profile.fps
+
+
+def parse_encoder_stats(stats_list, previous=None) -> EncoderStats:
+    """LocalVideoTrack.get_stats() の結果から送信側エンコーダの状態を取り出す（なければ None）
+
+    encode_ms は previous（前回の outbound_rtp.outbound）との差分から求める。
+    """
+    for stats in stats_list:
+        if stats.WhichOneof("stats") != "outbound_rtp":
+            continue
+        out = stats.outbound_rtp.outbound
+        reason = out.quality_limitation_reason
+        cpu_limited = reason.lower() == "cpu" if isinstance(reason, str) else reason == _LIMITATION_CPU
+        encode_ms = 0.0
+        if previous is not None and out.frames_encoded > previous.frames_encoded:
+            encode_ms = ((out.total_encode_time - previous.total_encode_time)
+                         / (out.frames_encoded - previous.frames_encoded) * 1000)
+        return EncoderStats(out.frames_per_second, out.frame_width, out.frame_height,
+                            cpu_limited, encode_ms), out
+    return None, previous
+
+
+class QualityController:
+    """プロファイルの上げ下げを判断するクラス（切り替え自体は呼び出し側が行う）
+
+    下げる条件（どれか1つ）: 遅延+スキップ率 > max_overrun、CPU 使用率 > max_cpu、
+    フレーム処理時間 p95 > 周期 × max_frame_load、エンコーダが CPU 制限中、エンコーダ fps < 目標 × min_encoder_fps
+    上げる条件（すべて）: 遅延+スキップ率 < 1%、次段のコスト比で換算した CPU 使用率・処理時間が
+    up_margin 未満、エンコーダ制限なし、が up_windows 回連続。
+    下げた直後の段には backoff 秒（失敗のたびに倍、最大 max_backoff）戻らない。
+    切り替え（カメラの再設定など）に失敗したら switch_failed() で元の段に戻す。失敗した段へは同じく
+    backoff 秒（失敗のたびに倍）、上げる方向にも下げる方向にも切り替えない。
+    set_ceiling() で上限の段を決められる（帯域に応じた天井、bandwidth_controller.py）。
+    """
+    def __init__(self, profiles=None, start=None, window_s=5.0, up_windows=3,
+                 max_overrun=0.05, max_cpu=0.85, max_frame_load=0.8, min_encoder_fps=0.8,
+                 up_margin=0.7, backoff=30.0, max_backoff=600.0,
+                 clock=time.monotonic, cpu_clock=time.process_time, cpu_count=None):
+        self.profiles = list(profiles or DEFAULT_PROFILES)
+        self.index = self.profiles.index(start) if start in self.profiles else 0
+        self.window_s = window_s
+        self.up_windows = up_windows
+        self.max_overrun = max_overrun
+        self.max_cpu = max_cpu
+        self.max_frame_load = max_frame_load
+        self.min_encoder_fps = min_encoder_fps
+        self.up_margin = up_margin
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.cpu_count = cpu_count or os.cpu_count() or 1
+
+        self._blocked_until = {}   # 段 → この時刻まで上げない
+        self._failures = {}        # 段 → 下げた回数
+        self._unavailable_until = {}   # 段 → この時刻まで切り替えない（切り替えに失敗した段）
+        self._switch_failures = {}     # 段 → 切り替えに失敗した回数
+        self._good_windows = 0
+        self.ceiling = len(self.profiles) - 1
+        self.switches = 0
+        self.last_reason = ""
+        self.reset_window()
+
+    @property
+    def profile(self) -> Profile:
+        return self.profiles[self.index]
+
+    def reset_window(self):
+        self._window_start = self.clock()
+        self._cpu_start = self.cpu_clock()
+        self._frame_times = []
+        self._frames = 0
+        self._overruns = 0
+        self._encoder = None
+
+    # ---- 観測 ----
+    def observe_frame(self, processing_s: float, late=0, skipped=0):
+        """1フレーム分の処理時間と、その間に増えたペーサーの遅延/スキップ数"""
+        self._frame_times.append(processing_s)
+        self._frames += 1 + skipped
+        self._overruns += late + skipped
+
+    def observe_encoder(self, stats: EncoderStats):
+        self._encoder = stats
+
+    def set_ceiling(self, index: int):
+        """上限の段。現在の段が上限を超えていれば次の update() ですぐに下げる"""
+        self.ceiling = max(0, min(index, len(self.profiles) - 1))
+
+    # ---- 判断 ----
+    def update(self):
+        """window 秒ごとに評価する。切り替えるべきなら新しい Profile、そうでなければ None"""
+        now = self.clock()
+        if self.index > self.ceiling and not self._unavailable(self.ceiling, now):
+            self._good_windows = 0
+            return self._switch(self.ceiling, "bandwidth ceiling")
+        elapsed = now - self._window_start
+        if elapsed < self.window_s or not self._frame_times:
+            return None
+
+        profile = self.profile
+        interval = 1.0 / profile.fps
+        cpu = (self.cpu_clock() - self._cpu_start) / (elapsed * self.cpu_count)
+        frame_load = float(np.percentile(self._frame_times, 95)) / interval
+        overrun = self._overruns / max(1, self._frames)
+        encoder = self._encoder
+        self.reset_window()
+
+        reason = None
+        if overrun > self.max_overrun:
+            reason = f"overrun {overrun:.0%}"
+        elif cpu > self.max_cpu:
+            reason = f"cpu {cpu:.0%}"
+        elif frame_load > self.max_frame_load:
+            reason = f"frame time {frame_load:.0%} of interval"
+        elif encoder is not None and encoder.cpu_limited:
+            reason = "encoder cpu-limited"
+        elif encoder is not None and 0 < encoder.fps < profile.fps * self.min_encoder_fps:
+            reason = f"encoder {encoder.fps:.1f} fps"
+        log.debug("%s: cpu %.0f%% | frame %.0f%% | overrun %.1f%% | encoder %s",
+                  profile.name, cpu * 100, frame_load * 100, overrun * 100, encoder)
+
+        if reason is not None:
+            self._good_windows = 0
+            if self.index == 0 or self._unavailable(self.index - 1, now):
+                return None
+            return self._switch(self.index - 1, reason, failed=self.index)
+
+        self._good_windows += 1
+        if self.index + 1 > self.ceiling or self._good_windows < self.up_windows:
+            return None
+        if now < self._blocked_until.get(self.index + 1, 0) or self._unavailable(self.index + 1, now):
+            return None
+        ratio = profile_cost(self.profiles[self.index + 1]) / profile_cost(profile)
+        if overrun < 0.01 and cpu * ratio < self.up_margin and frame_load * ratio < self.up_margin:
+            self._good_windows = 0
+            return self._switch(self.index + 1, f"headroom (cpu {cpu:.0%}, frame {frame_load:.0%})")
+        return None
+
+    def switch_failed(self, previous: Profile, reason: str):
+        """update() が返した段への切り替えに失敗した。previous の段に戻す"""
+        failed = self.index
+        count = self._switch_failures.get(failed, 0) + 1
+        self._switch_failures[failed] = count
+        wait = min(self.max_backoff, self.backoff * 2 ** (count - 1))
+        self._unavailable_until[failed] = self.clock() + wait
+        self.index = self.profiles.index(previous)
+        self._good_windows = 0
+        self.last_reason = f"switch to {self.profiles[failed].name} failed: {reason}"
+        log.warning("quality %s → %s failed (%s), retry after %.0f s",
+                    previous.name, self.profiles[failed].name, reason, wait)
+        self.reset_window()
+
+    def _unavailable(self, index: int, now: float) -> bool:
+        return now < self._unavailable_until.get(index, 0)
+
+    def _switch(self, index: int, reason: str, failed=None):
+        if failed is not None:
+            count = self._failures.get(failed, 0) + 1
+            self._failures[failed] = count
+            wait = min(self.max_backoff, self.backoff * 2 ** (count - 1))
+            self._blocked_until[failed] = self.clock() + wait
+        old = self.profile
+        self.index = index
+        self.switches += 1
+        self.last_reason = reason
+        log.info("quality %s → %s (%s)", old.name, self.profile.name, reason)
+        return self.profile
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+実機のセッション録画（左右カメラの YUV420・マイク・MQTT の制御コマンド、時刻付き）
+出力は recording.py の形式のディレクトリで、replay_recording.py で実機なしに再生できる
+配信スクリプト・pi_picarx_mqtt.py は止めてから実行する（カメラ・マイクを占有するため）
+--synthetic は実機なしで同じ形式の録画を作る（動く模様・正弦波・擬似ビューアの制御コマンド）
+
+例:
+    python3 record_session.py rec/ --duration 30
+    python3 record_session.py synth/ --synthetic --duration 5
+"""
+
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import backends
+import control_protocol
+import pi_picarx_mqtt
+from latency import sensor_clock_ns
+from recording import RecordingWriter
+from runtime_log import get_logger, setup_logging
+
+log = get_logger("record")
+
+AUDIO_RATE = 48000
+AUDIO_CHANNELS = 1
+AUDIO_BLOCK = 480   # stream_stereo_livekit.py の AUDIO_FRAME_SIZE と同じ
+
+
+def record_camera(cam, index, writer, stop):
+    while not stop.is_set():
+        request = cam.capture_request()
+        try:
+            frame = request.make_array("main")
+            ts = request.get_metadata().get("SensorTimestamp") or sensor_clock_ns()
+        finally:
+            request.release()
+        writer.write_frame(index, ts, frame)
+
+
+def synthesize(writer, args, control_hz=20, net_ms=20.0):
+    """実機なしの録画を作る（時刻は計算で並べるので実時間は待たない）"""
+    start = sensor_clock_ns()
+    period_ns = int(1e9 / args.fps)
+    rng = np.random.default_rng(0)
+    for index in range(2):
+        base = rng.integers(0, 256, (args.height * 3 // 2, args.width), dtype=np.uint8)
+        for n in range(int(args.duration * args.fps)):
+            # 右カメラはセンサー位相を 3ms ずらす
+            writer.write_frame(index, start + n * period_ns + index * 3_000_000, np.roll(base, n * 8, axis=1))
+
+    block_ns = AUDIO_BLOCK * 1_000_000_000 // AUDIO_RATE
+    t = np.arange(AUDIO_BLOCK) / AUDIO_RATE
+    for n in range(int(args.duration * 1e9 / block_ns)):
+        tone = 8000 * np.sin(2 * np.pi * 440 * (t + n * AUDIO_BLOCK / AUDIO_RATE))
+        writer.write_audio(start + n * block_ns, tone.astype(np.int16).reshape(-1, 1))
+
+    # 擬似ビューア: 走行（バイナリ）とカメラ（JSON）を交互に、片道 net_ms 遅れて届いたものとする
+    wall_offset_ms = writer.session["wall_offset_ms"]
+    interval_ns = int(1e9 / control_hz)
+    for seq in range(int(args.duration * control_hz)):
+        ts = start + seq * interval_ns
+        sent_ms = ts / 1e6 + wall_offset_ms - net_ms
+        if seq % 2:
+            payload = ('{"pan": %d, "tilt": %d, "t": %.3f}' % ((seq % 90) - 45, (seq % 60) - 30, sent_ms)).encode()
+            writer.write_mqtt(ts, pi_picarx_mqtt.TOPIC_PT, payload)
+        else:
+            payload = control_protocol.encode(seq, control_protocol.FLAG_DRIVE, throttle=((seq % 200) - 100) / 100,
+                                              steer=((seq % 50) - 25) / 25, sent_ms=sent_ms)
+            writer.write_mqtt(ts, pi_picarx_mqtt.TOPIC_BIN, payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record cameras, microphone and MQTT commands")
+    parser.add_argument("directory")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--no-audio", action="store_true")
+    parser.add_argument("--no-mqtt", action="store_true")
+    parser.add_argument("--synthetic", action="store_true", help="実機なしで擬似データの録画を作る")
+    args = parser.parse_args()
+    setup_logging("INFO")
+
+    writer = RecordingWriter(args.directory, width=args.width, height=args.height, fps=args.fps,
+                             audio_rate=AUDIO_RATE, audio_channels=AUDIO_CHANNELS, audio_block=AUDIO_BLOCK)
+    if args.synthetic:
+        synthesize(writer, args)
+        writer.close()
+        log.info("synthesized %s", writer.counts)
+        return 0
+    stop = threading.Event()
+
+    Picamera2 = backends.load_camera()
+    cams = []
+    for cam_id in (0, 1):
+        cam = Picamera2(cam_id)
+        cam.configure(cam.create_video_configuration(
+            main={"size": (args.width, args.height), "format": "YUV420"},
+            controls={"FrameRate": args.fps},
+        ))
+        cam.start()
+        cams.append(cam)
+    threads = [threading.Thread(target=record_camera, args=(cam, i, writer, stop), daemon=True)
+               for i, cam in enumerate(cams)]
+
+    stream = None
+    if not args.no_audio:
+        sd = backends.load_sounddevice()
+        stream = sd.InputStream(samplerate=AUDIO_RATE, channels=AUDIO_CHANNELS, dtype="int16",
+                                blocksize=AUDIO_BLOCK, latency="low",
+                                callback=lambda indata, frames, t, status: writer.write_audio(sensor_clock_ns(), indata))
+
+    client = None
+    if not args.no_mqtt:
+        mqtt = backends.load_mqtt()
+        topics = [pi_picarx_mqtt.TOPIC_CMD, pi_picarx_mqtt.TOPIC_PT, pi_picarx_mqtt.TOPIC_BIN,
+                  pi_picarx_mqtt.TOPIC_CTRL_STATUS]
+        client = mqtt.Client(client_id=pi_picarx_mqtt.CLIENT_ID + "-record", protocol=mqtt.MQTTv311,
+                             clean_session=True)
+        client.on_connect = lambda c, userdata, flags, rc, props=None: c.subscribe([(t, 0) for t in topics])
+        client.on_message = lambda c, userdata, msg: writer.write_mqtt(sensor_clock_ns(), msg.topic, msg.payload)
+        client.connect(pi_picarx_mqtt.BROKER_HOST, pi_picarx_mqtt.BROKER_PORT, keepalive=30)
+        client.loop_start()
+
+    for thread in threads:
+        thread.start()
+    if stream:
+        stream.start()
+    log.info("recording %dx%d @ %dfps for %.0f s into %s", args.width, args.height, args.fps,
+             args.duration, args.directory)
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(2.0)
+        if stream:
+            stream.stop()
+            stream.close()
+        if client:
+            client.loop_stop()
+            client.disconnect()
+        for cam in cams:
+            cam.stop()
+            cam.close()
+        writer.close()
+    log.info("recorded %s", writer.counts)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
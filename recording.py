@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+セッション録画の形式（record_session.py で記録し、replay_backend.py で再生する）
+1セッション = 1ディレクトリ。時刻はすべて ns（カメラは SensorTimestamp、音声・MQTT は受信時の
+sensor_clock_ns。どちらも CLOCK_BOOTTIME）:
+
+    session.json         解像度・stride・fps・音声設定・壁時計との差など
+    cam0.yuv, cam1.yuv   Picamera2 の YUV420 配列（stride 付き）をそのまま連結（np.memmap で読む）
+    cam0.ts, cam1.ts     フレームごとの int64 タイムスタンプ
+    mic.pcm, mic.ts      int16 の音声ブロック（固定サンプル数）とブロックごとのタイムスタンプ
+    mqtt.bin             (ts int64, topic 長 uint16, payload 長 uint32, topic, payload) の並び
+"""
+
+import json
+import os
+import struct
+
+import numpy as np
+
+from latency import sensor_clock_ns, wall_ms
+
+SESSION_FILE = "session.json"
+_TIMESTAMP = struct.Struct("<q")
+_MQTT_HEADER = struct.Struct("<qHI")
+
+
+class RecordingWriter:
+    """各ストリームをファイルへ追記するクラス（ストリームごとに書き込むスレッドは1つ）"""
+    def __init__(self, directory: str, **session):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.session = dict(session, wall_offset_ms=wall_ms() - sensor_clock_ns() / 1e6)
+        self._files = {}
+        self.counts = {}
+
+    def _open(self, name: str):
+        f = self._files.get(name)
+        if f is None:
+            f = self._files[name] = open(os.path.join(self.directory, name), "wb")
+        return f
+
+    def _append(self, stream: str, ext: str, ts_ns: int, array: np.ndarray):
+        self._open(stream + ext).write(memoryview(np.ascontiguousarray(array)).cast("B"))
+        self._open(stream + ".ts").write(_TIMESTAMP.pack(ts_ns))
+        self.counts[stream] = self.counts.get(stream, 0) + 1
+
+    def write_frame(self, cam_index: int, ts_ns: int, frame: np.ndarray):
+        """Picamera2 の YUV420 配列 (height*3/2, stride)"""
+        self.session.setdefault("stride", frame.shape[1])
+        self._append(f"cam{cam_index}", ".yuv", ts_ns, frame)
+
+    def write_audio(self, ts_ns: int, block: np.ndarray):
+        """int16 の (frames, channels) ブロック"""
+        self._append("mic", ".pcm", ts_ns, block)
+
+    def write_mqtt(self, ts_ns: int, topic: str, payload: bytes):
+        topic_bytes = topic.encode()
+        f = self._open("mqtt.bin")
+        f.write(_MQTT_HEADER.pack(ts_ns, len(topic_bytes), len(payload)))
+        f.write(topic_bytes)
+        f.write(payload)
+        self.counts["mqtt"] = self.counts.get("mqtt", 0) + 1
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+        with open(os.path.join(self.directory, SESSION_FILE), "w") as f:
+            json.dump(dict(self.session, counts=self.counts), f, indent=2)
+
+
+class Recording:
+    """録画ディレクトリの読み出し（フレーム・音声は memmap で、読んだ分だけページインする）"""
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, SESSION_FILE)) as f:
+            self.session = json.load(f)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _timestamps(self, stream: str) -> np.ndarray:
+        path = self._path(stream + ".ts")
+        return np.fromfile(path, dtype="<i8") if os.path.exists(path) else np.empty(0, dtype=np.int64)
+
+    def camera(self, index: int):
+        """(timestamps, frames)。frames は (N, height*3/2, stride) の読み取り専用 memmap"""
+        timestamps = self._timestamps(f"cam{index}")
+        rows = self.session["height"] * 3 // 2
+        stride = self.session.get("stride", self.session["width"])
+        if not len(timestamps):
+            return timestamps, np.empty((0, rows, stride), dtype=np.uint8)
+        frames = np.memmap(self._path(f"cam{index}.yuv"), dtype=np.uint8, mode="r",
+                           shape=(len(timestamps), rows, stride))
+        return timestamps, frames
+
+    def audio(self):
+        """(timestamps, blocks)。blocks は (N, block_size, channels) の int16 memmap"""
+        timestamps = self._timestamps("mic")
+        shape = (len(timestamps), self.session["audio_block"], self.session["audio_channels"])
+        if not len(timestamps):
+            return timestamps, np.empty(shape, dtype=np.int16)
+        return timestamps, np.memmap(self._path("mic.pcm"), dtype="<i2", mode="r", shape=shape)
+
+    def mqtt(self):
+        """[(ts_ns, topic, payload), ...]"""
+        path = self._path("mqtt.bin")
+        if not os.path.exists(path):
+            return []
+        with open(path, "rb") as f:
+            data = f.read()
+        messages = []
+        offset = 0
+        while offset + _MQTT_HEADER.size <= len(data):
+            ts, topic_len, payload_len = _MQTT_HEADER.unpack_from(data, offset)
+            offset += _MQTT_HEADER.size
+            topic = data[offset:offset + topic_len].decode()
+            offset += topic_len
+            messages.append((ts, topic, data[offset:offset + payload_len]))
+            offset += payload_len
+        return messages
+
+    @property
+    def start_ns(self) -> int:
+        """全ストリームで最も早い時刻（再生の原点）"""
+        firsts = [ts[0] for ts in (self._timestamps("cam0"), self._timestamps("cam1"),
+                                   self._timestamps("mic")) if len(ts)]
+        messages = self.mqtt()
+        if messages:
+            firsts.append(messages[0][0])
+        return min(firsts) if firsts else 0
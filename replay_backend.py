@@ -0,0 +1,658 @@
+#!/usr/bin/env python3
+"""
+録画を再生する実機・サーバーの代替（backends.py が PICARX_BACKEND=replay のときに返す）
+
+    Picamera2    cam0 / cam1 の録画を SensorTimestamp の間隔どおりに返す（解像度が違えば最近傍で拡大縮小）
+    sounddevice  InputStream は録音ブロックをコールバックへ渡し、OutputStream は一定周期で再生データを取り出して捨てる
+    rtc          Room / VideoSource / AudioSource など。接続すると擬似ビューアが入室し、録音を相手の音声として流す
+    mqtt         Client は録画した MQTT メッセージを on_message へ渡す（送信時刻は再生時の受信に合わせてずらす）
+    Picarx       I2C 書き込み時間を sleep で模擬する
+
+再生の時計は全ストリームで共有し、録画の最初の時刻を再生開始時刻に合わせる（PICARX_REPLAY_SPEED で倍速、0 で待たない）
+PICARX_REPLAY_DELAYS="camera_open=0.4,camera_configure=0.2,connect=0.6,publish=0.15" で実機・サーバーの
+初期化にかかる時間を模擬する（秒、起動時間のベンチマーク用。既定はすべて 0）
+PICARX_REPLAY_OUTAGES="3:2,10:0.5" で最初の接続から 3 秒後にルームを切断し、2 秒間は接続を失敗させる
+（再接続の確認用。"開始秒:長さ" をカンマ区切り）
+"""
+
+import asyncio
+import collections
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+import control_protocol
+from latency import sensor_clock_ns, wall_ms
+from recording import Recording
+from runtime_log import get_logger
+from stereo_compose import split_i420
+
+log = get_logger("replay")
+
+# 再生した件数（replay_recording.py が最後に表示する）
+stats = collections.Counter()
+
+_SENT_MS = struct.Struct("<d")
+_SENT_MS_OFFSET = 6   # control_protocol の送信時刻の位置
+
+
+class ReplaySession:
+    """録画と再生の時計（プロセス内で1つ。get_session() で取得）"""
+    def __init__(self, directory: str, speed=1.0):
+        self.recording = Recording(directory)
+        self.speed = speed
+        self.origin_ns = self.recording.start_ns
+        self.start_ns = None
+        self._lock = threading.Lock()
+        self.finished = threading.Event()   # どれかのストリームを最後まで出した
+        self.stopped = threading.Event()    # 再生の打ち切り（stop()）
+
+    def _started(self) -> int:
+        with self._lock:
+            if self.start_ns is None:
+                self.start_ns = sensor_clock_ns()
+            return self.start_ns
+
+    def due_ns(self, ts_ns: int) -> int:
+        """録画時刻 ts_ns を再生する時刻（sensor_clock_ns）。最大速度なら現在時刻"""
+        if self.speed <= 0:
+            return sensor_clock_ns()
+        return self._started() + int((ts_ns - self.origin_ns) / self.speed)
+
+    def wait(self, ts_ns: int, stop: threading.Event = None) -> int:
+        """ts_ns の再生時刻まで待って、その時刻を返す（stop / stopped が立てば途中で戻る）"""
+        due = self.due_ns(ts_ns)
+        while not self.stopped.is_set() and not (stop and stop.is_set()):
+            remaining = (due - sensor_clock_ns()) / 1e9
+            if remaining <= 0:
+                break
+            time.sleep(min(remaining, 0.05))
+        return due
+
+    async def wait_async(self, ts_ns: int) -> int:
+        due = self.due_ns(ts_ns)
+        await asyncio.sleep(max(0.0, (due - sensor_clock_ns()) / 1e9))
+        return due
+
+    def finish(self, stream: str):
+        if not self.finished.is_set():
+            log.info("%s: end of recording", stream)
+        self.finished.set()
+
+    def stop(self):
+        self.stopped.set()
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> ReplaySession:
+    """PICARX_REPLAY_DIR / PICARX_REPLAY_SPEED の録画を開く（2回目以降は同じもの）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            directory = os.environ.get("PICARX_REPLAY_DIR")
+            if not directory:
+                raise RuntimeError("PICARX_REPLAY_DIR is not set")
+            _session = ReplaySession(directory, float(os.environ.get("PICARX_REPLAY_SPEED", "1")))
+        return _session
+
+
+def startup_delay(name: str) -> float:
+    """PICARX_REPLAY_DELAYS の name の秒数（指定がなければ 0）"""
+    for item in os.environ.get("PICARX_REPLAY_DELAYS", "").split(","):
+        key, _, value = item.partition("=")
+        if key.strip() == name:
+            return float(value)
+    return 0.0
+
+
+def outages() -> list:
+    """PICARX_REPLAY_OUTAGES の [(開始秒, 長さ), ...]"""
+    result = []
+    for item in os.environ.get("PICARX_REPLAY_OUTAGES", "").split(","):
+        if item.strip():
+            start, _, length = item.partition(":")
+            result.append((float(start), float(length or 0)))
+    return sorted(result)
+
+
+# ==== Picamera2 ====
+
+def resize_i420(frame: np.ndarray, src_width: int, src_height: int, width: int, height: int) -> np.ndarray:
+    """YUV420 配列（stride 付き）を最近傍で width x height のコンパクトな YUV420 配列にする"""
+    out = np.empty((height * 3 // 2, width), dtype=np.uint8)
+    flat = out.reshape(-1)
+    rows = np.arange(height) * src_height // height
+    cols = np.arange(width) * src_width // width
+    y, u, v = split_i420(frame, src_width, src_height)
+    out[:height] = y[np.ix_(rows, cols)]
+    y_size = width * height
+    c_size = y_size // 4
+    for i, plane in enumerate((u, v)):
+        dst = flat[y_size + i * c_size:y_size + (i + 1) * c_size].reshape(height // 2, width // 2)
+        dst[:] = plane[np.ix_(rows[::2] // 2, cols[::2] // 2)]
+    return out
+
+
+class _CameraRequest:
+    def __init__(self, frame, ts):
+        self._frame = frame
+        self._ts = ts
+
+    def make_array(self, stream="main"):
+        return self._frame
+
+    def get_metadata(self):
+        return {"SensorTimestamp": self._ts}
+
+    def release(self):
+        pass
+
+
+class Picamera2:
+    """録画したフレームを返す Picamera2（YUV420 のみ）
+
+    設定した fps が録画より低ければ間引く。SensorTimestamp は再生時刻（sensor_clock_ns）にする。
+    """
+    def __init__(self, camera_num=0):
+        time.sleep(startup_delay("camera_open"))
+        self.session = get_session()
+        self.camera_num = camera_num
+        self.timestamps, self.frames = self.session.recording.camera(camera_num)
+        rec = self.session.recording.session
+        self.recorded_size = (rec["width"], rec["height"])
+        self.size = self.recorded_size
+        self.period_ns = 0
+        self._index = 0
+        self._last_ts = None
+        self._stop = threading.Event()
+
+    def create_video_configuration(self, main=None, controls=None, **kwargs):
+        return {"main": dict(main or {}), "controls": dict(controls or {})}
+
+    def configure(self, config):
+        time.sleep(startup_delay("camera_configure"))
+        main = config.get("main", {})
+        if main.get("format", "YUV420") != "YUV420":
+            raise ValueError(f"replay camera supports YUV420 only, not {main['format']}")
+        self.size = tuple(main.get("size", self.recorded_size))
+        fps = config.get("controls", {}).get("FrameRate")
+        self.period_ns = int(1e9 / fps) if fps else 0
+
+    def start(self):
+        self._stop.clear()
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        pass
+
+    def capture_request(self):
+        while True:
+            if self._index >= len(self.timestamps):
+                self.session.finish(f"camera {self.camera_num}")
+                raise EOFError(f"camera {self.camera_num}: end of recording")
+            ts = int(self.timestamps[self._index])
+            frame = self.frames[self._index]
+            self._index += 1
+            # 録画より低い fps に設定されていれば間引く（許容は1割）
+            if self._last_ts is None or ts - self._last_ts >= self.period_ns * 0.9:
+                break
+        self._last_ts = ts
+        due = self.session.wait(ts, self._stop)
+        if self.size == self.recorded_size:
+            array = np.array(frame)   # Picamera2 と同じくフレームごとにコピー
+        else:
+            array = resize_i420(frame, *self.recorded_size, *self.size)
+        stats[f"camera{self.camera_num}_frames"] += 1
+        return _CameraRequest(array, due)
+
+
+# ==== Picarx ====
+
+def _write(name):
+    def write(self, *args):
+        self.writes += 1
+        stats["i2c_writes"] += 1
+        if self.log is not None:
+            self.log.append((self.clock(), name, *args))
+        time.sleep(self.delay)
+    return write
+
+
+class Picarx:
+    """I2C 書き込み時間を sleep で模擬する Picarx
+
+    log（list）を渡すと書き込みを (clock(), メソッド名, 引数...) で記録する。
+    """
+    def __init__(self, i2c_ms=0.3, log=None, clock=time.monotonic):
+        self.delay = i2c_ms / 1000
+        self.writes = 0
+        self.log = log
+        self.clock = clock
+
+    set_dir_servo_angle = _write("set_dir_servo_angle")
+    set_cam_pan_angle = _write("set_cam_pan_angle")
+    set_cam_tilt_angle = _write("set_cam_tilt_angle")
+    forward = _write("forward")
+    backward = _write("backward")
+    stop = _write("stop")
+
+
+# ==== sounddevice ====
+
+class _AudioStream:
+    def __init__(self, samplerate=48000, channels=1, dtype="int16", blocksize=480, latency=None,
+                 callback=None, **kwargs):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+    def close(self):
+        pass
+
+
+class InputStream(_AudioStream):
+    """録音ブロックを記録時刻どおりにコールバックへ渡す"""
+    def start(self):
+        self.timestamps, self.blocks = get_session().recording.audio()
+        if not len(self.timestamps):
+            raise RuntimeError("no microphone audio in the recording")
+        if self.blocks.shape[1:] != (self.blocksize, self.channels):
+            raise ValueError(f"recorded audio blocks {self.blocks.shape[1:]} != "
+                             f"({self.blocksize}, {self.channels})")
+        super().start()
+
+    def _run(self):
+        session = get_session()
+        for ts, block in zip(self.timestamps, self.blocks):
+            session.wait(int(ts), self._stop)
+            if self._stop.is_set() or session.stopped.is_set():
+                return
+            self.callback(np.array(block), self.blocksize, None, None)
+            stats["mic_blocks"] += 1
+        session.finish("microphone")
+
+
+class OutputStream(_AudioStream):
+    """blocksize / samplerate 周期でコールバックから再生データを取り出して捨てる"""
+    def _run(self):
+        out = np.zeros((self.blocksize, self.channels), dtype=np.int16)
+        period = self.blocksize / self.samplerate
+        deadline = time.monotonic()
+        while not self._stop.is_set():
+            self.callback(out, self.blocksize, None, None)
+            stats["speaker_blocks"] += 1
+            deadline += period
+            self._stop.wait(max(0.0, deadline - time.monotonic()))
+
+
+sounddevice = SimpleNamespace(InputStream=InputStream, OutputStream=OutputStream)
+
+
+# ==== LiveKit rtc ====
+
+class VideoBufferType:
+    RGBA = 0
+    I420 = 11
+
+
+class TrackKind:
+    KIND_UNKNOWN = 0
+    KIND_AUDIO = 1
+    KIND_VIDEO = 2
+
+
+class TrackSource:
+    SOURCE_UNKNOWN = 0
+    SOURCE_CAMERA = 1
+    SOURCE_MICROPHONE = 2
+
+
+class ConnectionQuality:
+    QUALITY_POOR = 0
+    QUALITY_GOOD = 1
+    QUALITY_EXCELLENT = 2
+    QUALITY_LOST = 3
+
+
+class TrackPublishOptions(SimpleNamespace):
+    pass
+
+
+class VideoEncoding(SimpleNamespace):
+    pass
+
+
+class DataPacket(SimpleNamespace):
+    pass
+
+
+class RemoteTrackPublication(SimpleNamespace):
+    pass
+
+
+class VideoFrame:
+    def __init__(self, width, height, type, data):
+        self.width = width
+        self.height = height
+        self.type = type
+        self._data = bytearray(data)
+
+    @property
+    def data(self) -> memoryview:
+        return memoryview(self._data)
+
+
+class AudioFrame:
+    def __init__(self, data, sample_rate, num_channels, samples_per_channel):
+        self._data = bytearray(data)
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+        self.samples_per_channel = samples_per_channel
+
+    @classmethod
+    def create(cls, sample_rate, num_channels, samples_per_channel):
+        return cls(bytes(samples_per_channel * num_channels * 2), sample_rate, num_channels,
+                   samples_per_channel)
+
+    @property
+    def data(self) -> memoryview:
+        return memoryview(self._data).cast("h")
+
+
+class VideoSource:
+    """フレームを数えるだけの VideoSource（エンコード・送信なし）"""
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+
+    def capture_frame(self, frame, timestamp_us=0, rotation=0):
+        stats["video_frames"] += 1
+
+
+class AudioSource:
+    def __init__(self, sample_rate, num_channels, queue_size_ms=1000):
+        self.sample_rate = sample_rate
+        self.num_channels = num_channels
+
+    async def capture_frame(self, frame):
+        stats["audio_frames_sent"] += 1
+
+
+_sids = itertools.count(1)
+
+
+class Track:
+    def __init__(self, name, kind, source=None):
+        self.sid = f"TR_replay{next(_sids)}"
+        self.name = name
+        self.kind = kind
+        self.source = source
+
+    async def get_stats(self):
+        return []
+
+
+class LocalVideoTrack(Track):
+    @staticmethod
+    def create_video_track(name, source):
+        return LocalVideoTrack(name, TrackKind.KIND_VIDEO, source)
+
+
+class LocalAudioTrack(Track):
+    @staticmethod
+    def create_audio_track(name, source):
+        return LocalAudioTrack(name, TrackKind.KIND_AUDIO, source)
+
+
+class Participant:
+    def __init__(self, identity):
+        self.identity = identity
+        self.sid = f"PA_{identity}"
+        self.track_publications = {}
+
+
+class RemoteParticipant(Participant):
+    pass
+
+
+class LocalParticipant(Participant):
+    def __init__(self, identity, room=None):
+        super().__init__(identity)
+        self.room = room
+
+    async def publish_track(self, track, options=None):
+        await asyncio.sleep(startup_delay("publish"))
+        if self.room is not None and not self.room.connected:
+            raise ConnectionError("room is not connected")
+        stats["tracks_published"] += 1
+        publication = SimpleNamespace(sid=track.sid, track=track, kind=track.kind, options=options)
+        self.track_publications[track.sid] = publication
+        return publication
+
+    async def unpublish_track(self, sid):
+        self.track_publications.pop(sid, None)
+
+    async def publish_data(self, payload, reliable=True, topic="", destination_identities=None):
+        stats["data_sent"] += 1
+
+
+class AudioStream:
+    """擬似ビューアの音声（録音を記録時刻どおりに流す）"""
+    def __init__(self, track, sample_rate=48000, num_channels=1, **kwargs):
+        self.track = track
+
+    def __aiter__(self):
+        return self._frames()
+
+    async def _frames(self):
+        session = get_session()
+        rec = session.recording.session
+        timestamps, blocks = session.recording.audio()
+        for ts, block in zip(timestamps, blocks):
+            await session.wait_async(int(ts))
+            if session.stopped.is_set():
+                return
+            yield SimpleNamespace(frame=AudioFrame(np.array(block).tobytes(), rec["audio_rate"],
+                                                   rec["audio_channels"], len(block)))
+
+
+class Room:
+    """接続すると擬似ビューア（replay-viewer）が入室し、録音があれば音声トラックを購読させる
+
+    PICARX_REPLAY_OUTAGES の時刻になると "disconnected" を出し（SDK の再接続もあきらめた状態）、
+    その間の connect() は失敗する。時刻はプロセスで最初に接続した時点から数える。
+    """
+    first_connect = None
+
+    def __init__(self, loop=None):
+        self._handlers = collections.defaultdict(list)
+        self.name = ""
+        self.local_participant = LocalParticipant("replay-publisher", self)
+        self.remote_participants = {}
+        self.connected = False
+        self._outage_task = None
+
+    def on(self, event, callback=None):
+        if callback is not None:
+            self._handlers[event].append(callback)
+            return callback
+
+        def decorator(fn):
+            self._handlers[event].append(fn)
+            return fn
+        return decorator
+
+    def emit(self, event, *args):
+        for handler in list(self._handlers[event]):
+            handler(*args)
+
+    async def connect(self, url, token, options=None):
+        await asyncio.sleep(startup_delay("connect"))
+        now = time.monotonic()
+        if Room.first_connect is None:
+            Room.first_connect = now
+        elapsed = now - Room.first_connect
+        for start, length in outages():
+            if start <= elapsed < start + length:
+                stats["connect_refused"] += 1
+                raise ConnectionError(f"replay outage ({start + length - elapsed:.1f} s left)")
+        upcoming = [start for start, _ in outages() if start > elapsed]
+        if upcoming:
+            self._outage_task = asyncio.get_running_loop().create_task(self._drop_at(upcoming[0]))
+        self.connected = True
+        stats["room_connects"] += 1
+        session = get_session()
+        self.name = f"replay:{os.path.basename(os.path.normpath(session.recording.directory))}"
+        viewer = RemoteParticipant("replay-viewer")
+        self.remote_participants[viewer.identity] = viewer
+        self.emit("participant_connected", viewer)
+        if len(session.recording.audio()[0]):
+            track = Track("viewer-mic", TrackKind.KIND_AUDIO)
+            publication = RemoteTrackPublication(sid=track.sid, track=track, kind=track.kind, subscribed=True)
+            viewer.track_publications[track.sid] = publication
+            self.emit("track_subscribed", track, publication, viewer)
+
+    async def _drop_at(self, start: float):
+        await asyncio.sleep(start - (time.monotonic() - Room.first_connect))
+        if self.connected:
+            self.connected = False
+            stats["room_drops"] += 1
+            self.emit("disconnected", "replay outage")
+
+    async def disconnect(self):
+        if self._outage_task:
+            self._outage_task.cancel()
+        if self.connected:
+            self.connected = False
+            self.emit("disconnected", "client initiated")
+
+
+rtc = SimpleNamespace(
+    AudioFrame=AudioFrame, AudioSource=AudioSource, AudioStream=AudioStream,
+    ConnectionQuality=ConnectionQuality, DataPacket=DataPacket,
+    LocalAudioTrack=LocalAudioTrack, LocalParticipant=LocalParticipant, LocalVideoTrack=LocalVideoTrack,
+    Participant=Participant, RemoteParticipant=RemoteParticipant, RemoteTrackPublication=RemoteTrackPublication,
+    Room=Room, Track=Track, TrackKind=TrackKind, TrackPublishOptions=TrackPublishOptions,
+    TrackSource=TrackSource, VideoBufferType=VideoBufferType, VideoEncoding=VideoEncoding,
+    VideoFrame=VideoFrame, VideoSource=VideoSource,
+)
+
+
+# ==== paho-mqtt ====
+
+def retime_payload(payload: bytes, shift_ms: float) -> bytes:
+    """制御メッセージの送信時刻（バイナリの sent_ms / JSON の t）を shift_ms ずらす"""
+    if len(payload) == control_protocol.MESSAGE_SIZE:
+        try:
+            msg = control_protocol.decode(payload)
+        except ValueError:
+            return payload
+        buf = bytearray(payload)
+        _SENT_MS.pack_into(buf, _SENT_MS_OFFSET, msg.sent_ms + shift_ms)
+        return bytes(buf)
+    try:
+        data = json.loads(payload)
+    except (ValueError, UnicodeDecodeError):
+        return payload
+    if isinstance(data, dict) and isinstance(data.get("t"), (int, float)):
+        data["t"] += shift_ms
+        return json.dumps(data).encode()
+    return payload
+
+
+class Client:
+    """録画した MQTT メッセージを購読中のトピックだけ on_message へ渡す paho Client
+
+    loop_forever() は最後のメッセージを渡し終えると戻る。送信時刻は「録画時の受信 → 再生時の受信」の差だけ
+    ずらすので、control_rx などの遅延は録画時のネットワーク遅延のまま再現される。
+    """
+    def __init__(self, client_id="", protocol=4, clean_session=True, **kwargs):
+        self.client_id = client_id
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.will = None
+        self.topics = set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def will_set(self, topic, payload=None, qos=0, retain=False):
+        self.will = (topic, payload)
+
+    def connect(self, host, port=1883, keepalive=60, **kwargs):
+        return 0
+
+    connect_async = connect
+
+    def reconnect_delay_set(self, min_delay=1, max_delay=120):
+        pass
+
+    def subscribe(self, topic, qos=0):
+        topics = topic if isinstance(topic, list) else [(topic, qos)]
+        self.topics.update(name for name, _ in topics)
+        return 0, 1
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        stats["mqtt_published"] += 1
+        return SimpleNamespace(rc=0, mid=0)
+
+    def loop_start(self):
+        self._thread = threading.Thread(target=self._run, name="replay-mqtt", daemon=True)
+        self._thread.start()
+
+    def loop_forever(self, **kwargs):
+        self._run()
+
+    def loop_stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(1.0)
+
+    def disconnect(self):
+        self._stop.set()
+        if self.on_disconnect:
+            self.on_disconnect(self, None, 0)
+
+    def _run(self):
+        session = get_session()
+        if self.on_connect:
+            self.on_connect(self, None, {}, 0)
+        wall_offset_ms = session.recording.session["wall_offset_ms"]
+        for ts, topic, payload in session.recording.mqtt():
+            session.wait(ts, self._stop)
+            if self._stop.is_set() or session.stopped.is_set():
+                return
+            if topic not in self.topics:
+                continue
+            shift_ms = wall_ms() - (ts / 1e6 + wall_offset_ms)
+            self.on_message(self, None, SimpleNamespace(topic=topic, payload=retime_payload(payload, shift_ms),
+                                                        qos=0, retain=False))
+            stats["mqtt_delivered"] += 1
+        session.finish("mqtt")
+
+
+mqtt = SimpleNamespace(Client=Client, MQTTv311=4, MQTTv5=5)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+録画（record_session.py）を実機・サーバーなしで再生し、stream_stereo_livekit.py / pi_picarx_mqtt.py の
+main() をそのまま動かす（backends.py の replay 代替: カメラ・マイク・MQTT は録画、ルーム・PiCar-X は擬似）
+終了時に区間ごとの遅延（各スクリプトの latency_stats）と再生件数を表示する。性能の再現テスト用
+
+例:
+    python3 record_session.py synth/ --synthetic --duration 5
+    python3 replay_recording.py synth/ --target stereo
+    python3 replay_recording.py synth/ --target picarx --speed 0    # MQTT を待たずに on_message へ
+
+--speed 0 はカメラ・音声・MQTT を待たずに出す（映像ループ自体は FramePacer が fps で刻む）。
+--target picarx --speed 0 は制御スレッドを使わず、仮想時計で録画の受信時刻どおりにメッセージを渡し、
+その間のアクチュエータの tick（CONTROL_RATE_HZ）を呼ぶ（反映・デッドマン監視の経路も録画の間隔で動く）
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+
+def run_stereo(module, session, duration):
+    async def run():
+        task = asyncio.create_task(module.main())
+        finished = asyncio.get_running_loop().run_in_executor(None, session.finished.wait, duration)
+        await asyncio.wait({task, finished}, return_when=asyncio.FIRST_COMPLETED)
+        session.stop()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    asyncio.run(run())
+
+
+def run_picarx(module, session, duration):
+    # loop_forever は録画の MQTT を出し終えると戻る
+    timer = threading.Timer(duration, session.stop) if duration else None
+    if timer:
+        timer.start()
+    try:
+        module.main()
+    finally:
+        if timer:
+            timer.cancel()
+
+
+class VirtualClock:
+    """再生用の仮想時計（秒）と、それに合わせて進む壁時計（ms）"""
+    def __init__(self):
+        self.now = 0.0
+        self._wall_origin_ms = time.time() * 1000
+
+    def __call__(self) -> float:
+        return self.now
+
+    def wall_ms(self) -> float:
+        return self._wall_origin_ms + self.now * 1000
+
+
+def run_picarx_virtual(module, session, duration):
+    """録画の MQTT を仮想時計で受信時刻どおりに on_message へ渡し、間の制御 tick を呼ぶ
+
+    bench_servo_planner.py の simulate と同じく、メッセージの間は 1 / CONTROL_RATE_HZ 秒ごとに tick() する。
+    最後のメッセージの後も、デッドマン監視の停止ランプが終わるまで tick を続ける。
+    """
+    import replay_backend
+    clock = VirtualClock()
+    module.setup_logging(module.LOG_LEVEL)
+    module.setup_control(replay_backend.Picarx(i2c_ms=0, clock=clock), clock=clock, wall_clock=clock.wall_ms,
+                         start=False)
+    actuator = module.actuator
+    topics = {topic for topic, _ in module.SUBSCRIPTIONS}
+    wall_offset_ms = session.recording.session["wall_offset_ms"]
+    origin_ns = session.recording.start_ns
+    next_tick = 0.0
+
+    def advance(until):
+        nonlocal next_tick
+        while next_tick <= until:
+            clock.now = next_tick
+            actuator.tick()
+            next_tick += actuator.interval
+
+    end = None
+    for ts, topic, payload in session.recording.mqtt():
+        t = (ts - origin_ns) / 1e9
+        if duration and t > duration:
+            end = duration
+            break
+        advance(t)
+        clock.now = t
+        if topic not in topics:
+            continue
+        # 受信時刻の差だけ送信時刻をずらす（録画時のネットワーク遅延のまま）
+        shift_ms = clock.wall_ms() - (ts / 1e6 + wall_offset_ms)
+        module.on_message(None, None, SimpleNamespace(
+            topic=topic, payload=replay_backend.retime_payload(payload, shift_ms), qos=0, retain=False))
+        replay_backend.stats["mqtt_delivered"] += 1
+    if end is None:
+        end = clock.now + actuator.command_timeout + actuator.stop_ramp + 0.5
+    advance(end)
+    replay_backend.stats["control_ticks"] = round(next_tick / actuator.interval)
+    session.finish("mqtt")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session through the streamer / controller")
+    parser.add_argument("directory")
+    parser.add_argument("--target", choices=("stereo", "picarx"), default="stereo")
+    parser.add_argument("--speed", type=float, default=1.0, help="再生速度（1 = 実時間、0 = 待たない）")
+    parser.add_argument("--duration", type=float, default=None, help="打ち切る秒数（既定: 録画の終わりまで）")
+    args = parser.parse_args()
+
+    # backends.py は import 時に環境変数を読むので、対象スクリプトより先に設定する
+    os.environ["PICARX_BACKEND"] = "replay"
+    os.environ["PICARX_REPLAY_DIR"] = args.directory
+    os.environ["PICARX_REPLAY_SPEED"] = str(args.speed)
+    import replay_backend
+    session = replay_backend.get_session()
+
+    if args.target == "stereo":
+        import stream_stereo_livekit as module
+        run_stereo(module, session, args.duration)
+    else:
+        import pi_picarx_mqtt as module
+        if args.speed <= 0:
+            run_picarx_virtual(module, session, args.duration)
+        else:
+            run_picarx(module, session, args.duration)
+
+    print(f"Replay {args.directory} ({args.target}, speed {args.speed:g})")
+    print("  " + ", ".join(f"{name} {count}" for name, count in sorted(replay_backend.stats.items())))
+    counters = module.counters.snapshot()
+    if counters:
+        print("  counters: " + ", ".join(f"{name} {count}" for name, count in sorted(counters.items())))
+    for name, values in module.latency_stats.snapshot().items():
+        print(f"  {name:20s} p50 {values.get('p50', 0):7.1f} | p95 {values.get('p95', 0):7.1f} | "
+              f"p99 {values.get('p99', 0):7.1f} | max {values['max']:7.1f} ms (n={values['count']})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+共通ログ層（pi_picarx_mqtt.py / stream_stereo_livekit.py 共用）
+- 標準 logging を QueueHandler 経由にし、実際の出力は別スレッド（QueueListener）で行う
+- ホットパスのイベントは Counters に積み、一定周期で「件数 / 秒」をまとめて出力する
+- 同種のメッセージは SampledLog で間引く（抑制した件数を次の出力に付ける）
+"""
+
+import atexit
+import collections
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)-5s %(name)s | %(message)s"
+
+_listener = None
+
+
+def setup_logging(level="INFO"):
+    """ルートロガーを非同期出力に設定（複数回呼んでも1度だけ）"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt="%H:%M:%S"))
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """出力スレッドを止め、キューに残ったログを書き出す"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+class Counters:
+    """ホットパス用のイベントカウンタ
+
+    incr() は dict の加算のみ。start_reporting() で別スレッドから周期的に
+    前回からの差分と毎秒レートをログに出す。
+    """
+    def __init__(self):
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def incr(self, key: str, n=1):
+        with self._lock:
+            self._counts[key] += n
+
+    def get(self, key: str) -> int:
+        return self._counts[key]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counts)
+
+    def start_reporting(self, logger: logging.Logger, interval=10.0):
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._report_loop, args=(logger, interval), name="counters", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _report_loop(self, logger, interval):
+        prev = self.snapshot()
+        prev_time = time.monotonic()
+        while self._running:
+            time.sleep(interval)
+            now = time.monotonic()
+            current = self.snapshot()
+            elapsed = now - prev_time
+            parts = []
+            for key in sorted(current):
+                delta = current[key] - prev.get(key, 0)
+                if delta:
+                    parts.append(f"{key}={delta} ({delta / elapsed:.1f}/s)")
+            if parts:
+                logger.info("counters %s", " ".join(parts))
+            prev, prev_time = current, now
+
+
+class SampledLog:
+    """キーごとに interval 秒に1回だけ出力するロガー"""
+    def __init__(self, logger: logging.Logger, interval=1.0):
+        self.logger = logger
+        self.interval = interval
+        self._last = {}
+        self._suppressed = collections.Counter()
+
+    def log(self, key: str, level: int, msg: str, *args):
+        if not self.logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] += 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            msg += f" (+{suppressed} suppressed)"
+        self.logger.log(level, msg, *args)
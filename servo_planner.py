@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+サーボの軌道計画（カメラのパン・チルト、ステアリング）
+受信した角度へ直接飛ばず、制御スレッドの1tickごとに速度・加速度の上限内で目標へ近づける。
+操作側は角度を一定間隔（VR Viewer は 100ms ごと）に送るので、直近の指令から角速度を推定し、
+次の指令が届くまでその速度で先読みして進める（階段状に止まっては動く動きをなくす）。
+ActuatorScheduler(planner=ServoPlanner(...)) で使う。動いている間は tick ごとに書き込み（同じ整数角度は書かない）、
+止まっている間の揺れは deadband で書かない
+"""
+
+import math
+
+from actuator import DIR_SERVO_MAX_ANGLE, PAN_MAX, PAN_MIN, TILT_MAX, TILT_MIN
+
+
+class AxisPlanner:
+    """1軸の軌道（台形速度: max_speed 度/秒、max_accel 度/秒²）
+
+    command() で指令値を受け、step(now) が now 時点の角度を返す。
+    先読み: 指令間隔と角速度を指数平均で推定し、目標を「最後の指令 + 角速度 × 経過時間」とする
+    （経過時間は推定間隔まで。次の指令が stale 倍の間隔で来なければ最後の指令値に戻す）。
+    max_interval より間が空いた指令（スライダーの単発の移動など）は連続した指令とみなさず先読みしない。
+    deadband 未満の指令の変化は、止まっている間は無視する（ヘッドトラッキングの揺れで書き込まない）。
+    """
+    MAX_STEP = 0.1  # step() の間隔の上限（秒）
+
+    def __init__(self, lo: float, hi: float, max_speed: float, max_accel: float,
+                 deadband=0.0, predict=True, smoothing=0.5, stale=2.0, max_interval=0.3, position=0.0):
+        self.lo = lo
+        self.hi = hi
+        self.max_speed = max_speed
+        self.max_accel = max_accel
+        self.deadband = deadband
+        self.predict = predict
+        self.smoothing = smoothing
+        self.stale = stale
+        self.max_interval = max_interval
+
+        self.position = position
+        self.velocity = 0.0
+        self.commanded = position
+        self.rate = 0.0          # 指令値の角速度の推定（度/秒）
+        self.interval = None     # 指令間隔の推定（秒）
+        self._command_time = None
+        self._last_step = None
+
+    def command(self, value: float, now: float):
+        value = max(self.lo, min(self.hi, value))
+        if self._command_time is not None:
+            dt = now - self._command_time
+            if dt <= 0 or dt > self.max_interval:
+                # 同時刻に重なった・久しぶりの指令は速度推定に使わない
+                self.rate = 0.0
+                if dt > self.max_interval:
+                    self.interval = None
+            else:
+                a = self.smoothing
+                self.interval = dt if self.interval is None else a * dt + (1 - a) * self.interval
+                # deadband 未満の変化は揺れとみなして速度 0 の標本にする
+                delta = value - self.commanded if abs(value - self.commanded) >= self.deadband else 0.0
+                self.rate = a * delta / dt + (1 - a) * self.rate
+        if (self.velocity == 0 and self.position == self.commanded
+                and abs(value - self.commanded) < self.deadband):
+            return
+        self.commanded = value
+        self._command_time = now
+
+    def target(self, now: float) -> float:
+        if not self.predict or self._command_time is None or self.interval is None:
+            return self.commanded
+        elapsed = now - self._command_time
+        if elapsed > self.interval * self.stale:
+            return self.commanded
+        ahead = self.commanded + self.rate * min(elapsed, self.interval)
+        return max(self.lo, min(self.hi, ahead))
+
+    def step(self, now: float) -> float:
+        # 止まっている間も呼ばれる前提（間が空いたら1tick分として扱う）
+        dt = 0.0 if self._last_step is None else min(now - self._last_step, self.MAX_STEP)
+        self._last_step = now
+        if dt <= 0:
+            return self.position
+        error = self.target(now) - self.position
+        if error == 0 and self.velocity == 0:
+            return self.position
+        # 残り距離で止まりきれる速度まで（v² = 2aΔ）
+        desired = math.copysign(min(self.max_speed, math.sqrt(2 * self.max_accel * abs(error))), error)
+        dv = max(-self.max_accel * dt, min(self.max_accel * dt, desired - self.velocity))
+        self.velocity += dv
+        moved = self.velocity * dt
+        if abs(moved) >= abs(error) and (moved >= 0) == (error >= 0):
+            # 目標に到達（行き過ぎない）
+            self.position += error
+            self.velocity = 0.0
+        else:
+            self.position += moved
+        return self.position
+
+    def reset(self, position: float):
+        self.position = self.commanded = position
+        self.velocity = self.rate = 0.0
+        self.interval = self._command_time = None
+
+
+class ServoPlanner:
+    """パン・チルト・ステアリングの軌道計画（角度の単位は度、上限は actuator.py の範囲）
+
+    既定値は SG90 系のサーボで視点が揺れない程度（カメラ 120 度/秒、ステアリング 300 度/秒）。
+    カメラは軸ごとに、動いている間は tick ごとの角度（整数度）を返し、前回書いた角度と同じなら返さない。
+    止まっている間の書き込みを減らすのは camera_deadband だけ（間引くと階段状の動きに戻るため）。
+    """
+    def __init__(self, camera_speed=120.0, camera_accel=600.0, camera_deadband=1.5,
+                 steer_speed=300.0, steer_accel=3000.0, predict=True):
+        self.pan = AxisPlanner(PAN_MIN, PAN_MAX, camera_speed, camera_accel,
+                               deadband=camera_deadband, predict=predict)
+        self.tilt = AxisPlanner(TILT_MIN, TILT_MAX, camera_speed, camera_accel,
+                                deadband=camera_deadband, predict=predict)
+        # ステアリングは先読みしない（走行コマンドは同じ値の再送が多く、行き過ぎると危ない）
+        self.steer = AxisPlanner(-DIR_SERVO_MAX_ANGLE, DIR_SERVO_MAX_ANGLE, steer_speed, steer_accel,
+                                 predict=False)
+        self._written = {}   # 軸 -> 書いた角度
+
+    def command_camera(self, pan: float, tilt: float, now: float):
+        self.pan.command(pan, now)
+        self.tilt.command(tilt, now)
+
+    def _output(self, axis: AxisPlanner, now: float):
+        """axis の書き込む角度（整数度）。前回書いた角度と同じなら None"""
+        value = int(round(axis.step(now)))
+        if self._written.get(axis) == value:
+            return None
+        self._written[axis] = value
+        return value
+
+    def step_camera(self, now: float):
+        """1tick分進めた (pan, tilt)。書き込まない軸は None、どちらも書かなければ None"""
+        pan, tilt = self._output(self.pan, now), self._output(self.tilt, now)
+        if pan is None and tilt is None:
+            return None
+        return pan, tilt
+
+    def command_steer(self, angle: float, now: float):
+        self.steer.command(angle, now)
+
+    def step_steer(self, now: float):
+        """1tick分進めたステアリング角度。動いていなければ None"""
+        before = self.steer.position
+        after = self.steer.step(now)
+        return None if after == before else after
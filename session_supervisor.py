@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+LiveKit ルームの接続を見張り、切断されたらプロセスを再起動せずに復帰する（stream_stereo_livekit.py / stream_livekit.py 共用）
+
+- SDK が自前で再接続している間（"reconnecting" → "reconnected"）は配信を止めるだけ
+- SDK があきらめて "disconnected" になったら、新しいトークンでルームを作り直して接続し、映像・音声トラックを publish し直す
+  （カメラ・マイク・VideoSource / AudioSource はそのまま使い続けるので、起動時のカメラ初期化は繰り返さない）
+- 接続に失敗したら指数バックオフ（揺らぎ付き）で再試行する
+- connected が立っていない間は配信ループ側が合成・送信を止める（wait_connected()）
+
+切断から再 publish 完了までの時間は latency_stats の "reconnect" 区間（ms）と last_outage_s に残す。
+attach() より前（起動中の publish の間など）に届いた切断・再接続中の通知は覚えておき、attach() で
+接続済みにせず作り直し（または SDK の再接続の完了待ち）から始める。
+"""
+
+import asyncio
+import random
+import time
+
+from latency import LatencyStats
+from runtime_log import Counters, get_logger
+
+log = get_logger("session")
+
+
+class SessionSupervisor:
+    """connect(token) → 接続した新しいルーム（失敗は例外）、token() → 接続用トークン
+
+    接続・publish 済みのルームと、作り直したルームへ publish し直す republish(room) を attach() で渡してから使う。
+    ルームのイベントハンドラから lost() / reconnecting() / reconnected() を呼ぶ（イベントループ上で）。
+    """
+    def __init__(self, connect, token, min_delay=0.5, max_delay=30.0, connect_timeout=15.0,
+                 counters: Counters = None, latency_stats: LatencyStats = None, clock=time.monotonic):
+        self._connect = connect
+        self._republish = None
+        self._token = token
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.connect_timeout = connect_timeout
+        self.counters = counters or Counters()
+        self.latency_stats = latency_stats
+        self.clock = clock
+        self.room = None
+        self.connected = asyncio.Event()
+        self.reconnects = 0          # 作り直して復帰した回数
+        self.failures = 0            # 失敗した接続の試行
+        self.last_outage_s = 0.0     # 直近の切断から復帰までの秒数
+        self.outage_total_s = 0.0    # 切断していた時間の合計（進行中の分を含まない）
+        self._down_since = None
+        self._lost_before_attach = False
+        self._task = None
+        self._stopped = False
+
+    def attach(self, room, republish):
+        self.room = room
+        self._republish = republish
+        if self._lost_before_attach:
+            self._lost_before_attach = False
+            self._task = asyncio.get_running_loop().create_task(self._reconnect())
+        elif self._down_since is None:
+            self.connected.set()
+
+    @property
+    def outage_s(self) -> float:
+        """進行中の切断の経過秒（接続中は 0）"""
+        return 0.0 if self._down_since is None else self.clock() - self._down_since
+
+    def _pause(self, reason: str):
+        if self.connected.is_set():
+            self.connected.clear()
+            self._down_since = self.clock()
+            log.warning("Session paused: %s", reason)
+
+    def _resume(self):
+        outage = self.outage_s
+        self._down_since = None
+        self.last_outage_s = outage
+        self.outage_total_s += outage
+        if self.latency_stats is not None:
+            self.latency_stats.record("reconnect", outage * 1000)
+        self.connected.set()
+        return outage
+
+    def _pause_before_attach(self, reason: str):
+        if self._down_since is None:
+            self._down_since = self.clock()
+        log.warning("Session paused before attach: %s", reason)
+
+    def reconnecting(self):
+        """SDK が再接続中（同じルームのまま復帰を待つ）"""
+        self.counters.incr("room_reconnecting")
+        if self.room is None:
+            self._pause_before_attach("room reconnecting")
+            return
+        self._pause("room reconnecting")
+
+    def reconnected(self):
+        if self.room is None:
+            if not self._lost_before_attach:
+                self._down_since = None
+            return
+        if not self.connected.is_set() and self._task is None:
+            outage = self._resume()
+            log.info("Session resumed by the SDK after %.1f s", outage)
+
+    def lost(self, reason=None):
+        """ルームが切断された（SDK の再接続も失敗した）。作り直しを始める"""
+        if self._stopped:
+            return
+        self.counters.incr("room_disconnected")
+        text = f"room disconnected ({reason})" if reason is not None else "room disconnected"
+        if self.room is None:
+            # attach() で作り直しを始める
+            self._lost_before_attach = True
+            self._pause_before_attach(text)
+            return
+        self._pause(text)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._reconnect())
+
+    async def wait_connected(self):
+        await self.connected.wait()
+
+    async def _reconnect(self):
+        delay = self.min_delay
+        attempt = 0
+        try:
+            while True:
+                attempt += 1
+                try:
+                    room = await asyncio.wait_for(self._connect(self._token()), self.connect_timeout)
+                    self.room = room
+                    await asyncio.wait_for(self._republish(room), self.connect_timeout)
+                    break
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.failures += 1
+                    self.counters.incr("room_connect_failed")
+                    wait = delay * random.uniform(0.8, 1.2)
+                    log.warning("Reconnect attempt %d failed: %s (retry in %.1f s)", attempt,
+                                str(e) or type(e).__name__, wait)
+                    await asyncio.sleep(wait)
+                    delay = min(delay * 2, self.max_delay)
+            self.reconnects += 1
+            outage = self._resume()
+            log.info("Session restored in %.1f s (attempt %d)", outage, attempt)
+        finally:
+            self._task = None
+
+    async def stop(self):
+        """終了時（この後のルームの切断では作り直さない）"""
+        self._stopped = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+キャプチャ・合成を別プロセスに分けるステレオパイプライン（stream_stereo_livekit.py の PIPELINE_MODE）
+プロセス間は multiprocessing.shared_memory 上の固定長スロットのリング（SharedFrameRing）でつなぎ、
+フレームは pickle せず、スロット番号だけをセマフォで受け渡す（GIL・イベントループを分けて複数コアを使う）
+
+    capture プロセス     左右カメラ（StereoCapture）→ 組をリング A のスロットへ（コンパクトな YUV420 x2）
+    compose プロセス     リング A → StereoComposerI420 がリング B のスロットへ直接 Side-by-Side を書く
+    publish（メイン）    リング B → VideoFrame → VideoSource / H.264（音声・ルーム接続もこちら）
+
+各スロットのメタデータに撮影時刻と段ごとの時刻（sensor_clock_ns）を残し、区間ごとの遅延を測れるようにする
+"""
+
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from latency import sensor_clock_ns
+from runtime_log import get_logger, setup_logging
+from stereo_capture import StereoCapture
+from stereo_compose import StereoComposerI420, split_i420
+
+log = get_logger("pipeline")
+
+# スロットごとのメタデータ（時刻はすべて sensor_clock_ns と同じ時計）
+SLOT_META = np.dtype([
+    ("seq", np.int64),
+    ("sensor_ns", np.int64),      # 左右のうち古い方の SensorTimestamp
+    ("captured_ns", np.int64),    # capture プロセスがスロットへ書き終えた時刻
+    ("compose_start_ns", np.int64),
+    ("composed_ns", np.int64),
+])
+
+
+class SharedFrameRing:
+    """共有メモリ上の固定長スロットの SPSC リング（1プロデューサー・1コンシューマー、プロセス間）
+
+    free / filled の2つのセマフォでスロット数を数え、スロットの中身は共有メモリに直接読み書きする。
+    書き込み側: claim() → buffer() に書く → commit()、読み出し側: get() → buffer() を読む → release()。
+    書き込み側が追いつかれた（空きスロットがない）ときは claim() が None を返し、dropped に数える。
+    子プロセスへは Process の引数として渡す（共有メモリは名前で開き直す）。
+    """
+    def __init__(self, slots: int, slot_bytes: int, ctx=None):
+        ctx = ctx or mp.get_context("spawn")
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        size = slots * slot_bytes + slots * SLOT_META.itemsize + 2 * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        self._free = ctx.Semaphore(slots)
+        self._filled = ctx.Semaphore(0)
+        self._attach()
+
+    def __getstate__(self):
+        return {"name": self._shm.name, "slots": self.slots, "slot_bytes": self.slot_bytes,
+                "free": self._free, "filled": self._filled}
+
+    def __setstate__(self, state):
+        self.slots = state["slots"]
+        self.slot_bytes = state["slot_bytes"]
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._free = state["free"]
+        self._filled = state["filled"]
+        self._attach()
+
+    def _attach(self):
+        buf = self._shm.buf
+        data_bytes = self.slots * self.slot_bytes
+        meta_bytes = self.slots * SLOT_META.itemsize
+        self._data = np.ndarray((self.slots, self.slot_bytes), dtype=np.uint8, buffer=buf)
+        self.meta = np.ndarray((self.slots,), dtype=SLOT_META, buffer=buf, offset=data_bytes)
+        # [dropped（書き込み側だけが更新）, skipped（読み出し側だけが更新）]
+        self._counters = np.ndarray((2,), dtype=np.int64, buffer=buf, offset=data_bytes + meta_bytes)
+        self._head = 0   # 書き込み側のみ使う
+        self._tail = 0   # 読み出し側のみ使う
+
+    @property
+    def dropped(self) -> int:
+        """空きスロットがなく書けなかったフレーム数"""
+        return int(self._counters[0])
+
+    @property
+    def skipped(self) -> int:
+        """get_latest() で読み飛ばした古いフレーム数"""
+        return int(self._counters[1])
+
+    def buffer(self, index: int) -> np.ndarray:
+        """スロットの中身（uint8 の1次元ビュー、コピーなし）"""
+        return self._data[index]
+
+    def claim(self, timeout=0.0):
+        """書き込み先のスロット番号。timeout 秒以内に空かなければ None"""
+        if not self._free.acquire(timeout=timeout):
+            self._counters[0] += 1
+            return None
+        index = self._head
+        self._head = (self._head + 1) % self.slots
+        return index
+
+    def commit(self, index: int):
+        self._filled.release()
+
+    def get(self, timeout=1.0):
+        """読み出すスロット番号（古い順）。timeout 秒以内に来なければ None"""
+        if not self._filled.acquire(timeout=timeout):
+            return None
+        index = self._tail
+        self._tail = (self._tail + 1) % self.slots
+        return index
+
+    def get_latest(self, timeout=1.0):
+        """溜まっている中で最新のスロット番号（古いものは release して読み飛ばす）"""
+        index = self.get(timeout)
+        if index is None:
+            return None
+        while True:
+            newer = self.get(timeout=0)
+            if newer is None:
+                return index
+            self.release(index)
+            self._counters[1] += 1
+            index = newer
+
+    def release(self, index: int):
+        self._free.release()
+
+    def close(self):
+        """共有メモリを閉じる（作成側は削除も）。外に出したビューが残っていれば閉じるのは終了時に任せる"""
+        self._data = self.meta = self._counters = None
+        try:
+            self._shm.close()
+        except BufferError:
+            pass
+        if self._owner:
+            self._shm.unlink()
+            self._owner = False
+
+
+class SyntheticCamera:
+    """Picamera2 互換（capture_request()）の擬似カメラ。fps 周期で YUV420 配列を返す"""
+
+    class _Request:
+        def __init__(self, frame, ts):
+            self._frame = frame
+            self._ts = ts
+
+        def make_array(self, stream="main"):
+            return self._frame.copy()   # Picamera2 と同じくフレームごとにコピー
+
+        def get_metadata(self):
+            return {"SensorTimestamp": self._ts}
+
+        def release(self):
+            pass
+
+    def __init__(self, width, height, fps, phase_ms=0.0, seed=0):
+        self.period_ns = int(1e9 / fps)
+        self.phase_ns = int(phase_ms * 1e6)
+        rng = np.random.default_rng(seed)
+        self.frame = rng.integers(0, 256, (height * 3 // 2, width), dtype=np.uint8)
+
+    def capture_request(self):
+        now = sensor_clock_ns()
+        ts = ((now - self.phase_ns) // self.period_ns + 1) * self.period_ns + self.phase_ns
+        time.sleep(max(0, ts - sensor_clock_ns()) / 1e9)
+        return self._Request(self.frame, ts)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def open_cameras(camera, width, height, fps, cam_ids):
+    """左右のカメラ（"picamera2" または "synthetic"）を YUV420 で開いて開始する"""
+    if camera == "synthetic":
+        cams = [SyntheticCamera(width, height, fps, phase_ms=i * 3.0, seed=i) for i in range(2)]
+    else:
+        from backends import load_camera
+        Picamera2 = load_camera()
+        cams = []
+        for cam_id in cam_ids:
+            cam = Picamera2(cam_id)
+            cam.configure(cam.create_video_configuration(
+                main={"size": (width, height), "format": "YUV420"},
+                controls={"FrameRate": fps},
+            ))
+            cams.append(cam)
+    for cam in cams:
+        cam.start()
+    return cams
+
+
+def write_i420(dst: np.ndarray, frame: np.ndarray, width: int, height: int):
+    """Picamera2 の YUV420 配列（stride 付き）をコンパクトな I420 として dst（1次元）へ書く"""
+    y, u, v = split_i420(frame, width, height)
+    y_size = width * height
+    c_size = y_size // 4
+    np.copyto(dst[:y_size].reshape(height, width), y)
+    np.copyto(dst[y_size:y_size + c_size].reshape(height // 2, width // 2), u)
+    np.copyto(dst[y_size + c_size:y_size + 2 * c_size].reshape(height // 2, width // 2), v)
+
+
+def capture_stage(ring: SharedFrameRing, width, height, fps, camera, cam_ids, stop, log_level):
+    """capture プロセス: 同期した左右の組をリングへ（書けなければその組は捨てる）"""
+    setup_logging(log_level)
+    eye_bytes = width * height * 3 // 2
+    cams = open_cameras(camera, width, height, fps, cam_ids)
+    stereo = StereoCapture(*cams, tolerance_ms=1000 / fps / 2)
+    stereo.start()
+    log.info("capture: %dx%d @ %dfps x2 (%s)", width, height, fps, camera)
+    seq = 0
+    try:
+        while not stop.is_set():
+            pair = stereo.get_pair(timeout=0.5)
+            if pair is None:
+                continue
+            frame_left, frame_right, _ = pair
+            index = ring.claim()
+            if index is None:
+                continue
+            slot = ring.buffer(index)
+            write_i420(slot[:eye_bytes], frame_left, width, height)
+            write_i420(slot[eye_bytes:], frame_right, width, height)
+            ring.meta[index] = (seq, min(stereo.last_timestamps), sensor_clock_ns(), 0, 0)
+            ring.commit(index)
+            seq += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stereo.stop()
+        for cam in cams:
+            cam.stop()
+            cam.close()
+        log.info("capture: stopped (%d pairs, dropped %d, mean skew %.2f ms)",
+                 seq, ring.dropped, stereo.mean_skew_ms)
+
+
+def compose_stage(ring_in: SharedFrameRing, ring_out: SharedFrameRing, width, height, stop, log_level,
+                  paused=None):
+    """compose プロセス: 最新の組を出力リングのスロットへ直接 Side-by-Side で書く（paused の間は捨てるだけ）"""
+    setup_logging(log_level)
+    eye_rows = height * 3 // 2
+    eye_bytes = width * eye_rows
+    # 出力スロットごとに合成器を事前に作る（書き込み先 = 共有メモリのスロット）
+    composers = [StereoComposerI420(width, height, out=ring_out.buffer(i)) for i in range(ring_out.slots)]
+    try:
+        while not stop.is_set():
+            index = ring_in.get_latest(timeout=0.5)
+            if index is None:
+                continue
+            out = None if paused is not None and paused.is_set() else ring_out.claim()
+            if out is not None:
+                src = ring_in.buffer(index)
+                start = sensor_clock_ns()
+                composers[out].compose(src[:eye_bytes].reshape(eye_rows, width),
+                                       src[eye_bytes:].reshape(eye_rows, width))
+                meta = ring_in.meta[index].copy()
+                meta["compose_start_ns"] = start
+                meta["composed_ns"] = sensor_clock_ns()
+                ring_out.meta[out] = meta
+                ring_out.commit(out)
+            ring_in.release(index)
+    except KeyboardInterrupt:
+        pass
+
+
+class StereoPipeline:
+    """capture / compose プロセスを起動し、合成済み Side-by-Side I420 を共有メモリで受け取るクラス
+
+    get() で最新の合成済みスロットを受け取り、frame() の中身を送ったら release() で返す。
+    プロセスは spawn で起動する（メインプロセスのスレッド・LiveKit のランタイムを引き継がない）。
+    """
+    def __init__(self, width: int, height: int, fps: int, camera="picamera2", cam_ids=(0, 1),
+                 slots=3, log_level="INFO"):
+        ctx = mp.get_context("spawn")
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_bytes = width * 2 * height * 3 // 2
+        self.captured = SharedFrameRing(slots, self.frame_bytes, ctx)
+        self.composed = SharedFrameRing(slots, self.frame_bytes, ctx)
+        self._stop = ctx.Event()
+        self._paused = ctx.Event()
+        self._procs = [
+            ctx.Process(target=capture_stage, name="pipeline-capture", daemon=True,
+                        args=(self.captured, width, height, fps, camera, tuple(cam_ids), self._stop, log_level)),
+            ctx.Process(target=compose_stage, name="pipeline-compose", daemon=True,
+                        args=(self.captured, self.composed, width, height, self._stop, log_level,
+                              self._paused)),
+        ]
+
+    def start(self):
+        for proc in self._procs:
+            proc.start()
+        log.info("started %s", ", ".join(f"{p.name} (pid {p.pid})" for p in self._procs))
+
+    def pause(self):
+        """合成を止める（capture は続け、カメラは動かしたまま。ルーム切断中など）"""
+        self._paused.set()
+
+    def resume(self):
+        self._paused.clear()
+
+    @property
+    def alive(self) -> bool:
+        return all(proc.is_alive() for proc in self._procs)
+
+    def get(self, timeout=1.0):
+        """最新の合成済みスロット番号（timeout 内に来なければ None）"""
+        return self.composed.get_latest(timeout)
+
+    def frame(self, index: int) -> np.ndarray:
+        """合成済み I420（Side-by-Side）の1次元ビュー"""
+        return self.composed.buffer(index)
+
+    def meta(self, index: int):
+        return self.composed.meta[index].copy()
+
+    def release(self, index: int):
+        self.composed.release(index)
+
+    def stats_line(self) -> str:
+        return (f"capture dropped {self.captured.dropped}, compose skipped {self.captured.skipped}, "
+                f"compose dropped {self.composed.dropped}, publish skipped {self.composed.skipped}")
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for proc in self._procs:
+            proc.join(timeout)
+            if proc.is_alive():
+                proc.terminate()
+                proc.join(timeout)
+        self.captured.close()
+        self.composed.close()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+起動の段取り（stream_stereo_livekit.py の FAST_START）
+独立した段（カメラの初期化・ルーム接続・音声デバイスの読み込みなど）を並行に走らせ、
+段ごとの開始・終了時刻をプロセス起動からの経過時間で記録して、起動の時系列として出力する
+"""
+
+import asyncio
+import contextlib
+import os
+import threading
+import time
+
+from runtime_log import get_logger
+
+log = get_logger("startup")
+
+
+def process_start() -> float:
+    """プロセス起動時刻（time.monotonic 基準。インタプリタの起動・import を含めるため /proc から求める）"""
+    now = time.monotonic()
+    try:
+        with open("/proc/self/stat") as f:
+            # comm に空白・括弧が入りうるので最後の ")" 以降を使う（starttime は 22 番目の項目）
+            fields = f.read().rpartition(")")[2].split()
+        started_s = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return now - (time.clock_gettime(time.CLOCK_BOOTTIME) - started_s)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return now
+
+
+class StartupTimeline:
+    """段ごとの (開始, 終了) をプロセス起動からの秒で記録するクラス（スレッド・タスクのどちらからでも使える）"""
+    def __init__(self, origin: float = None):
+        self.origin = process_start() if origin is None else origin
+        self.phases = {}   # name -> [開始, 終了 or None]
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.monotonic() - self.origin
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        with self._lock:
+            self.phases[name] = [self.now(), None]
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name][1] = self.now()
+
+    def mark(self, name: str):
+        """時点だけの出来事（最初のフレームなど）"""
+        t = self.now()
+        with self._lock:
+            self.phases[name] = [t, t]
+
+    def as_dict(self) -> dict:
+        """{name: {"start_ms", "end_ms"}}（開始順）"""
+        with self._lock:
+            items = sorted(self.phases.items(), key=lambda item: item[1][0])
+        return {name: {"start_ms": start * 1000, "end_ms": None if end is None else end * 1000}
+                for name, (start, end) in items}
+
+    def log_summary(self, logger=log, width=40):
+        """開始順に段を並べ、経過を棒で表示する"""
+        phases = self.as_dict()
+        if not phases:
+            return
+        total = max((v["end_ms"] or v["start_ms"]) for v in phases.values()) or 1.0
+        logger.info("Startup timeline (ms since process start):")
+        for name, v in phases.items():
+            start, end = v["start_ms"], v["end_ms"] if v["end_ms"] is not None else v["start_ms"]
+            bar_start = int(start / total * width)
+            bar = " " * bar_start + "#" * max(1, int(end / total * width) - bar_start)
+            logger.info("  %-16s %7.0f -> %7.0f (%6.0f) |%-*s|", name, start, end, end - start, width, bar)
+
+
+async def run_steps(timeline: StartupTimeline, steps: dict, parallel=True, executor=None) -> dict:
+    """steps（名前 → 関数）を実行して {名前: 戻り値} を返す
+
+    関数はコルーチン関数ならそのまま await し、それ以外はスレッドプールで呼ぶ（import・カメラ初期化など
+    ブロックする処理）。parallel=False なら順に実行する。例外はすべての段が終わってから最初のものを送出する。
+    """
+    loop = asyncio.get_running_loop()
+
+    async def run(name, fn):
+        if asyncio.iscoroutinefunction(fn):
+            with timeline.phase(name):
+                return await fn()
+
+        def call():
+            with timeline.phase(name):
+                return fn()
+        return await loop.run_in_executor(executor, call)
+
+    if parallel:
+        results = await asyncio.gather(*(run(name, fn) for name, fn in steps.items()), return_exceptions=True)
+    else:
+        results = []
+        for name, fn in steps.items():
+            try:
+                results.append(await run(name, fn))
+            except Exception as e:
+                results.append(e)
+                break
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return dict(zip(steps, results))
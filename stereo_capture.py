@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+デュアルカメラの並列キャプチャ + タイムスタンプ同期
+カメラごとに専用スレッドでキャプチャし、SensorTimestamp が最も近い左右フレームを組にする
+"""
+
+import collections
+import threading
+import time
+
+from latency import sensor_clock_ns
+from runtime_log import get_logger
+
+log = get_logger("capture")
+
+
+class CameraReader:
+    """1台のカメラを専用スレッドでキャプチャし、(timestamp_ns, frame) をリングバッファに保持する
+
+    cam は Picamera2 互換（capture_request() → make_array() / get_metadata() / release()）
+    """
+    def __init__(self, cam, name: str, cond: threading.Condition, depth=4, stream="main"):
+        self.cam = cam
+        self.name = name
+        self.stream = stream
+        self.ring = collections.deque(maxlen=depth)
+        self.frame_count = 0
+        self.error_count = 0
+        self._cond = cond
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"cam-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=1.0):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while self._running:
+            try:
+                request = self.cam.capture_request()
+                try:
+                    frame = request.make_array(self.stream)
+                    metadata = request.get_metadata()
+                finally:
+                    request.release()
+            except Exception as e:
+                self.error_count += 1
+                if self.error_count == 1:
+                    log.error("%s camera error: %s", self.name, e)
+                time.sleep(0.01)
+                continue
+
+            # SensorTimestamp がない場合は受信時刻で代用（同じ CLOCK_BOOTTIME 基準）
+            ts = metadata.get("SensorTimestamp") or sensor_clock_ns()
+            with self._cond:
+                self.ring.append((ts, frame))
+                self.frame_count += 1
+                self._cond.notify_all()
+
+
+class StereoCapture:
+    """左右の CameraReader を束ね、タイムスタンプが近いフレームを組にして返すクラス"""
+    def __init__(self, cam_left, cam_right, tolerance_ms=20.0, depth=4):
+        self.tolerance_ns = int(tolerance_ms * 1e6)
+        self._cond = threading.Condition()
+        self.left = CameraReader(cam_left, "left", self._cond, depth)
+        self.right = CameraReader(cam_right, "right", self._cond, depth)
+        self._last_left_ts = -1
+        self._last_right_ts = -1
+        self.last_timestamps = (0, 0)  # 直近の組の (left_ns, right_ns)
+
+        # 左右のずれ（skew）統計
+        self.pair_count = 0
+        self.last_skew_ns = 0
+        self.max_skew_ns = 0
+        self._skew_sum_ns = 0
+
+    def start(self):
+        self.left.start()
+        self.right.start()
+
+    def stop(self):
+        self.left.stop()
+        self.right.stop()
+
+    @property
+    def mean_skew_ms(self) -> float:
+        return self._skew_sum_ns / self.pair_count / 1e6 if self.pair_count else 0.0
+
+    def _find_pair(self):
+        """未使用フレームの中から許容範囲内で最も新しい組を探す（呼び出し側でロック済み）"""
+        best = None
+        for ts_l, frame_l in self.left.ring:
+            if ts_l <= self._last_left_ts:
+                continue
+            for ts_r, frame_r in self.right.ring:
+                if ts_r <= self._last_right_ts:
+                    continue
+                skew = abs(ts_l - ts_r)
+                if skew > self.tolerance_ns:
+                    continue
+                newest = min(ts_l, ts_r)
+                if best is None or newest > best[0] or (newest == best[0] and skew < best[1]):
+                    best = (newest, skew, ts_l, frame_l, ts_r, frame_r)
+        return best
+
+    def get_pair(self, timeout=1.0):
+        """同期した (frame_left, frame_right, skew_ns) を返す。timeout 内に揃わなければ None"""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                best = self._find_pair()
+                if best is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+            _, skew, ts_l, frame_l, ts_r, frame_r = best
+            self._last_left_ts = ts_l
+            self._last_right_ts = ts_r
+            self.last_timestamps = (ts_l, ts_r)
+
+        self.pair_count += 1
+        self.last_skew_ns = skew
+        self.max_skew_ns = max(self.max_skew_ns, skew)
+        self._skew_sum_ns += skew
+        return frame_l, frame_r, skew
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+ステレオ（Side-by-Side）フレーム合成
+左右のカメラフレームを事前確保した出力バッファに直接書き込む（フレーム毎の確保なし）
+"""
+
+import numpy as np
+
+
+class StereoComposer:
+    """左右フレームを1枚のRGBAバッファに合成するクラス
+
+    BGR→RGB の並べ替えと180度回転はストライド付きビューで表現し、
+    np.copyto で各目の領域へ1パスで書き込む。アルファは初期化時に1度だけ埋める。
+
+    out に rtc.VideoFrame.data のような書き込み可能バッファを渡すと、
+    そのバッファ自体を出力先として使う（VideoFrame を毎フレーム作り直さずに済む）。
+    """
+    def __init__(self, width: int, height: int, out=None, rotate=True, swap_rb=True):
+        self.width = width    # 片目の幅
+        self.height = height
+        self.stereo_width = width * 2
+        self.rotate = rotate
+        self.swap_rb = swap_rb
+
+        size = self.stereo_width * height * 4
+        if out is None:
+            out = bytearray(size)
+        if len(out) != size:
+            raise ValueError(f"output buffer size mismatch: {len(out)} != {size}")
+        self._out = out
+        self.buffer = np.frombuffer(out, dtype=np.uint8).reshape(height, self.stereo_width, 4)
+        self.buffer[:, :, 3] = 255
+
+        # 各目の書き込み先（RGB部分のビュー）
+        self._left = self.buffer[:, :width, :3]
+        self._right = self.buffer[:, width:, :3]
+
+    def _source_view(self, frame: np.ndarray) -> np.ndarray:
+        """入力フレームを回転・色順変換済みのビューにする（コピーなし）"""
+        # XBGR8888 等の4ch入力は先頭3chのみ使う
+        if frame.shape[2] != 3:
+            frame = frame[:, :, :3]
+        if self.rotate:
+            frame = frame[::-1, ::-1]
+        if self.swap_rb:
+            frame = frame[:, :, ::-1]
+        return frame
+
+    def compose(self, frame_left: np.ndarray, frame_right: np.ndarray) -> memoryview:
+        """左右フレームを書き込み、出力バッファのビューを返す"""
+        np.copyto(self._left, self._source_view(frame_left))
+        np.copyto(self._right, self._source_view(frame_right))
+        return self.view
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self._out)
+
+
+def split_i420(frame: np.ndarray, width: int, height: int):
+    """Picamera2 の YUV420 配列 (height*3/2, stride) を Y/U/V プレーンのビューに分割"""
+    stride = frame.shape[1]
+    flat = frame.reshape(-1)
+    y = frame[:height, :width]
+    # U/V は stride/2 幅の行が詰めて並んでいる
+    chroma_size = (height // 2) * (stride // 2)
+    u_start = height * stride
+    v_start = u_start + chroma_size
+    u = flat[u_start:v_start].reshape(height // 2, stride // 2)[:, :width // 2]
+    v = flat[v_start:v_start + chroma_size].reshape(height // 2, stride // 2)[:, :width // 2]
+    return y, u, v
+
+
+class StereoComposerI420:
+    """左右の YUV420 フレームを1枚の I420 バッファに合成するクラス
+
+    Y/U/V の各プレーンごとに180度回転したビューを各目の領域へ書き込む。
+    色変換を行わないため、出力は RGBA 経路の 4 bytes/pixel に対して 1.5 bytes/pixel。
+    """
+    def __init__(self, width: int, height: int, out=None, rotate=True):
+        if width % 2 or height % 2:
+            raise ValueError("I420 requires even width and height")
+        self.width = width    # 片目の幅
+        self.height = height
+        self.stereo_width = width * 2
+        self.rotate = rotate
+
+        y_size = self.stereo_width * height
+        c_size = y_size // 4
+        size = y_size + c_size * 2
+        if out is None:
+            out = bytearray(size)
+        if len(out) != size:
+            raise ValueError(f"output buffer size mismatch: {len(out)} != {size}")
+        self._out = out
+        buf = np.frombuffer(out, dtype=np.uint8)
+        self.y = buf[:y_size].reshape(height, self.stereo_width)
+        self.u = buf[y_size:y_size + c_size].reshape(height // 2, width)
+        self.v = buf[y_size + c_size:].reshape(height // 2, width)
+
+        # 各目・各プレーンの書き込み先 [(左, 右), ...]
+        cw = width // 2
+        self._planes = [
+            (self.y[:, :width], self.y[:, width:]),
+            (self.u[:, :cw], self.u[:, cw:]),
+            (self.v[:, :cw], self.v[:, cw:]),
+        ]
+
+    def compose(self, frame_left: np.ndarray, frame_right: np.ndarray) -> memoryview:
+        """左右フレーム（Picamera2 YUV420 配列）を書き込み、出力バッファのビューを返す"""
+        left = split_i420(frame_left, self.width, self.height)
+        right = split_i420(frame_right, self.width, self.height)
+        for (dst_l, dst_r), src_l, src_r in zip(self._planes, left, right):
+            if self.rotate:
+                src_l = src_l[::-1, ::-1]
+                src_r = src_r[::-1, ::-1]
+            np.copyto(dst_l, src_l)
+            np.copyto(dst_r, src_r)
+        return self.view
+
+    @property
+    def view(self) -> memoryview:
+        return memoryview(self._out)
@@ -9,6 +9,11 @@ import subprocess
 import numpy as np
 from livekit import rtc
 
+from frame_pacer import FramePacer
+from frame_reader import FrameReader
+from livekit_token import token_provider
+from session_supervisor import SessionSupervisor
+
 # ============ 設定 ============
 LIVEKIT_URL = "wss://relay.yuru-yuru.net"
 # canPublish: true, canSubscribe: true のトークン
@@ -17,29 +22,70 @@ LIVEKIT_TOKEN = "eyJhbGciOiJIUzI1NiJ9.eyJ2aWRlbyI6eyJyb29tSm9pbiI6dHJ1ZSwicm9vbS
 WIDTH = 1280
 HEIGHT = 720
 FPS = 30
+
+# 切断されたらルームを作り直して publish し直す（session_supervisor.py、再試行は指数バックオフ・秒）
+RECONNECT_MIN_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
 # ==============================
 
 
 async def main():
-    room = rtc.Room()
-
-    @room.on("disconnected")
-    def on_disconnected():
-        print("Disconnected from room")
-
+    token = token_provider(LIVEKIT_TOKEN)
+    room = None
+
+    def create_room():
+        new_room = rtc.Room()
+
+        @new_room.on("disconnected")
+        def on_disconnected(reason=None):
+            if new_room is room:   # 作り直す前の古いルームは無視
+                print(f"Disconnected from room ({reason})")
+                supervisor.lost(reason)
+
+        @new_room.on("reconnecting")
+        def on_reconnecting():
+            if new_room is room:
+                supervisor.reconnecting()
+
+        @new_room.on("reconnected")
+        def on_reconnected():
+            if new_room is room:
+                supervisor.reconnected()
+        return new_room
+
+    async def reconnect_room(new_token):
+        nonlocal room
+        old_room, room = room, create_room()
+        try:
+            await old_room.disconnect()
+        except Exception:
+            pass
+        print(f"Reconnecting to {LIVEKIT_URL}...")
+        await room.connect(LIVEKIT_URL, new_token)
+        print(f"Reconnected to room: {room.name}")
+        return room
+
+    supervisor = SessionSupervisor(reconnect_room, token,
+                                   min_delay=RECONNECT_MIN_DELAY, max_delay=RECONNECT_MAX_DELAY)
+
+    room = create_room()
     print(f"Connecting to {LIVEKIT_URL}...")
-    await room.connect(LIVEKIT_URL, LIVEKIT_TOKEN)
+    await room.connect(LIVEKIT_URL, token())
     print(f"Connected to room: {room.name}")
 
-    # ビデオソース作成
+    # ビデオソース作成（再接続後も同じソースを使う）
     source = rtc.VideoSource(WIDTH, HEIGHT)
-    track = rtc.LocalVideoTrack.create_video_track("camera", source)
 
-    # トラックをPublish
-    options = rtc.TrackPublishOptions()
-    options.source = rtc.TrackSource.SOURCE_CAMERA
-    publication = await room.local_participant.publish_track(track, options)
-    print(f"Published track: {publication.sid}")
+    async def publish(target_room):
+        """トラックをPublish（再接続時は作り直したルームへ）"""
+        track = rtc.LocalVideoTrack.create_video_track("camera", source)
+        options = rtc.TrackPublishOptions()
+        options.source = rtc.TrackSource.SOURCE_CAMERA
+        publication = await target_room.local_participant.publish_track(track, options)
+        print(f"Published track: {publication.sid}")
+
+    await publish(room)
+    supervisor.attach(room, publish)
 
     # rpicam-vid からフレームを取得
     # YUV420 (I420) で出力し、RGBに変換
@@ -61,16 +107,30 @@ async def main():
     frame_size = WIDTH * HEIGHT * 3 // 2  # YUV420
     interval = 1.0 / FPS
 
+    # パイプの読み込みは専用スレッドで行い、イベントループをブロックしない
+    # （古いフレームは破棄し、常に最新フレームを配信）
+    reader = FrameReader(process.stdout, frame_size, late_after=interval)
+    reader.start()
+    # 絶対締め切りで周期を刻む（遅れは引きずらず、1周期以上の遅れは枠を飛ばす）
+    pacer = FramePacer(FPS, clock=asyncio.get_running_loop().time)
+    frame_count = 0
+
     try:
+        pacer.start()
         while True:
-            start = asyncio.get_event_loop().time()
-
-            # YUV420フレーム読み取り
-            yuv_data = process.stdout.read(frame_size)
-            if len(yuv_data) < frame_size:
+            # YUV420フレーム取得（最新のみ）
+            yuv_data = await reader.get()
+            if yuv_data is None:
                 print("Camera stream ended")
                 break
 
+            # 切断中は送らずに復帰を待つ（rpicam-vid と読み込みスレッドは動かしたまま）
+            if not supervisor.connected.is_set():
+                await supervisor.wait_connected()
+                print(f"[Video] Resumed after {supervisor.last_outage_s:.1f} s")
+                pacer.start()
+                continue
+
             # YUV420 → I420 VideoFrame
             video_frame = rtc.VideoFrame(
                 WIDTH, HEIGHT,
@@ -79,15 +139,20 @@ async def main():
             )
             source.capture_frame(video_frame)
 
+            frame_count += 1
+            if frame_count % (FPS * 10) == 0:  # 10秒ごとにログ
+                print(f"[Video] Read {reader.frames_read} | dropped {reader.frames_dropped} | late {reader.frames_late}")
+                print(f"[Video] Pacing: {pacer.summary()}")
+
             # フレームレート維持
-            elapsed = asyncio.get_event_loop().time() - start
-            if elapsed < interval:
-                await asyncio.sleep(interval - elapsed)
+            await pacer.wait()
 
     except KeyboardInterrupt:
         print("\nStopping...")
     finally:
         process.terminate()
+        reader.stop()
+        await supervisor.stop()
         await room.disconnect()
 
 